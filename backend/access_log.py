@@ -0,0 +1,472 @@
+"""
+메시지 접근 로그 지연 기록 (write-behind)
+요청 처리 중에는 메모리 버퍼에 적재만 하고, 백그라운드 스레드가 일정 건수/주기마다 일괄 INSERT
+
+기록에 실패한 배치는 버퍼 앞에 되돌려 점점 긴 간격으로 다시 시도하고,
+버퍼에 자리가 없거나 종료 시에도 기록하지 못하면 ACCESS_LOG_SPILL_PATH 파일에 내보낸 뒤 다음 시작 때 다시 기록한다.
+여러 워커가 같은 파일을 쓰므로 파일 잠금(fcntl)으로 쓰기와 다시 기록하기를 나눈다.
+"""
+
+import os
+import json
+import asyncio
+import shutil
+import itertools
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import IO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from database_config import SessionLocal
+from models_messages import MessageHistory
+from stats_rollup import record_history_rollups
+from history_partitions import ensure_partitions
+
+try:
+    import fcntl
+except ImportError:
+    # 파일 잠금이 없는 환경 (Windows) 에서는 워커 하나로 실행한다고 가정한다
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 한 번에 기록할 최대 건수
+ACCESS_LOG_BATCH_SIZE = int(os.getenv("ACCESS_LOG_BATCH_SIZE", "500"))
+# 버퍼가 다 차지 않아도 기록하는 주기 (초)
+ACCESS_LOG_FLUSH_INTERVAL = float(os.getenv("ACCESS_LOG_FLUSH_INTERVAL", "2.0"))
+# 버퍼 최대 크기 (메모리 상한)
+ACCESS_LOG_MAX_QUEUE = int(os.getenv("ACCESS_LOG_MAX_QUEUE", "50000"))
+# 버퍼가 가득 찼을 때 정책: drop_newest, drop_oldest, block
+ACCESS_LOG_OVERFLOW_POLICY = os.getenv("ACCESS_LOG_OVERFLOW_POLICY", "drop_newest")
+# block 정책에서 빈 자리를 기다리는 최대 시간 (초), 초과하면 새 이벤트를 버린다
+ACCESS_LOG_BLOCK_TIMEOUT = float(os.getenv("ACCESS_LOG_BLOCK_TIMEOUT", "0.05"))
+# 기록 실패 후 다시 시도하기까지의 최대 대기 시간 (초)
+ACCESS_LOG_MAX_BACKOFF = float(os.getenv("ACCESS_LOG_MAX_BACKOFF", "60"))
+# 기록하지 못한 행을 내보내는 파일 (NDJSON)
+ACCESS_LOG_SPILL_PATH = os.getenv("ACCESS_LOG_SPILL_PATH", "access_log_spill.ndjson")
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+HISTORY_COLUMNS = ("message_id", "user_ip", "user_agent", "reaction", "accessed_at")
+
+
+def write_history_rows(db: Session, rows: List[dict]):
+    """히스토리 행 일괄 INSERT 및 일간 집계 갱신 (커밋은 호출자가 담당)"""
+    if not rows:
+        return
+    for row in rows:
+        # SQLite 는 시간대를 버리고 저장하므로 UTC 로 맞춘다 (집계일 계산과 같은 기준)
+        if row["accessed_at"].tzinfo is not None:
+            row["accessed_at"] = row["accessed_at"].astimezone(timezone.utc)
+    db.execute(
+        insert(MessageHistory),
+        [{column: row[column] for column in HISTORY_COLUMNS} for row in rows]
+    )
+    record_history_rollups(db, rows)
+
+
+def _dump_row(row: dict) -> str:
+    return json.dumps({**row, "accessed_at": row["accessed_at"].isoformat()}, ensure_ascii=False) + "\n"
+
+
+def _load_row(line: str) -> dict:
+    row = json.loads(line)
+    row["accessed_at"] = datetime.fromisoformat(row["accessed_at"])
+    return row
+
+
+@contextmanager
+def _locked_file(path: str, mode: str, blocking: bool = True) -> Iterator[Optional[IO[str]]]:
+    """다른 프로세스와 공유하는 파일을 잠그고 연다
+
+    잠금을 기다리는 사이 다른 워커가 파일을 옮겼으면 같은 경로로 다시 연다.
+    blocking=False 에서 이미 잠겨 있거나, 읽기 모드에서 파일이 없으면 None 을 돌려준다.
+    """
+    while True:
+        try:
+            file = open(path, mode, encoding="utf-8")
+        except FileNotFoundError:
+            if not mode.startswith("r"):
+                raise
+            yield None
+            return
+        if fcntl is None:
+            break
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            yield None
+            return
+        try:
+            if os.fstat(file.fileno()).st_ino == os.stat(path).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        file.close()
+    try:
+        yield file
+    finally:
+        file.close()
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _resolve(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AccessLogWriter:
+    """접근 로그 버퍼와 백그라운드 기록 스레드"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int = ACCESS_LOG_BATCH_SIZE,
+        flush_interval: float = ACCESS_LOG_FLUSH_INTERVAL,
+        max_queue: int = ACCESS_LOG_MAX_QUEUE,
+        overflow_policy: str = ACCESS_LOG_OVERFLOW_POLICY,
+        block_timeout: float = ACCESS_LOG_BLOCK_TIMEOUT,
+        spill_path: Optional[str] = ACCESS_LOG_SPILL_PATH,
+        max_backoff: float = ACCESS_LOG_MAX_BACKOFF
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.spill_path = spill_path
+        self.max_backoff = max_backoff
+
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        # block 정책에서 빈 자리를 기다리는 이벤트 루프 요청
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._flush_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        # 월이 바뀌기 전에 다음 파티션이 준비되도록 하루 한 번 확인
+        self._partitions_checked_on: Optional[date] = None
+
+        self.stats = {"enqueued": 0, "dropped": 0, "flushed": 0, "failed": 0, "requeued": 0, "spilled": 0, "corrupt": 0}
+
+    # ==================== 수명 주기 ====================
+
+    def start(self):
+        """백그라운드 기록 스레드 시작"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+
+        self._thread = threading.Thread(target=self._run, name="access-log-writer", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Access log writer started (batch={self.batch_size}, interval={self.flush_interval}s, "
+            f"max_queue={self.max_queue}, policy={self.overflow_policy})"
+        )
+
+    def stop(self, timeout: float = 10.0):
+        """스레드를 멈추고 남은 버퍼를 모두 기록 (기록하지 못한 행은 파일로 내보낸다)"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+        if not self.flush():
+            with self._condition:
+                rows = list(self._buffer)
+                self._buffer.clear()
+            self._spill(rows)
+        logger.info(f"Access log writer stopped: {self.stats}")
+
+    # ==================== 적재 ====================
+
+    def _row(
+        self,
+        message_id: int,
+        user_ip: Optional[str],
+        user_agent: Optional[str],
+        category: Optional[str],
+        reaction: Optional[str]
+    ) -> dict:
+        return {
+            "message_id": message_id,
+            "user_ip": user_ip,
+            "user_agent": user_agent,
+            "reaction": reaction,
+            "accessed_at": datetime.now(timezone.utc),
+            "category": category
+        }
+
+    def _append(self, row: dict) -> Optional[bool]:
+        """버퍼에 적재 (버리면 False, block 정책에서 자리가 없으면 None), 호출자가 잠금을 잡고 있어야 한다"""
+        if len(self._buffer) >= self.max_queue:
+            if self.overflow_policy == "block":
+                return None
+            self.stats["dropped"] += 1
+            if self.overflow_policy == "drop_newest":
+                return False
+            self._buffer.popleft()
+
+        self._buffer.append(row)
+        self.stats["enqueued"] += 1
+
+        if len(self._buffer) >= self.batch_size:
+            self._condition.notify_all()
+        return True
+
+    def record(
+        self,
+        message_id: int,
+        user_ip: Optional[str],
+        user_agent: Optional[str],
+        category: Optional[str] = None,
+        reaction: Optional[str] = None
+    ) -> bool:
+        """접근 이벤트를 버퍼에 적재 (버려진 경우 False)
+
+        block 정책의 대기는 스레드에서 호출할 때만 한다. 이벤트 루프에서는 기다리지 않고 버리므로 record_async 를 쓴다.
+        """
+        row = self._row(message_id, user_ip, user_agent, category, reaction)
+
+        with self._condition:
+            added = self._append(row)
+            if added is None and not _in_event_loop():
+                self._condition.wait_for(
+                    lambda: len(self._buffer) < self.max_queue,
+                    timeout=self.block_timeout
+                )
+                added = self._append(row)
+            if added is None:
+                self.stats["dropped"] += 1
+                return False
+        return added
+
+    async def record_async(
+        self,
+        message_id: int,
+        user_ip: Optional[str],
+        user_agent: Optional[str],
+        category: Optional[str] = None,
+        reaction: Optional[str] = None
+    ) -> bool:
+        """이벤트 루프용 record (block 정책에서 루프를 막지 않고 빈 자리를 기다린다)"""
+        row = self._row(message_id, user_ip, user_agent, category, reaction)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.block_timeout
+
+        while True:
+            with self._condition:
+                added = self._append(row)
+                if added is not None:
+                    return added
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self.stats["dropped"] += 1
+                    return False
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+
+            try:
+                await asyncio.wait_for(waiter[1], remaining)
+            except asyncio.TimeoutError:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def pending(self) -> int:
+        """기록 대기 중인 건수"""
+        return len(self._buffer)
+
+    # ==================== 기록 ====================
+
+    def _take_batch(self) -> List[dict]:
+        batch = []
+        while self._buffer and len(batch) < self.batch_size:
+            batch.append(self._buffer.popleft())
+        # block 정책으로 대기 중인 요청을 깨운다
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:
+                # 이미 닫힌 루프
+                pass
+        return batch
+
+    def _run(self):
+        try:
+            self._replay_spill()
+        except Exception as e:
+            # 남은 파일은 다음 시작 때 다시 기록한다
+            logger.error(f"Failed to replay spilled access log rows: {e}")
+        failures = 0
+        while True:
+            with self._condition:
+                if failures:
+                    # 실패가 이어지면 점점 길게 기다린다 (버퍼가 가득 차도 바로 다시 시도하지 않는다)
+                    backoff = min(self.flush_interval * 2 ** failures, self.max_backoff)
+                    self._condition.wait_for(lambda: not self._running, timeout=backoff)
+                else:
+                    self._condition.wait_for(
+                        lambda: not self._running or len(self._buffer) >= self.batch_size,
+                        timeout=self.flush_interval
+                    )
+                running = self._running
+                batch = self._take_batch()
+
+            if batch:
+                if self._write(batch):
+                    failures = 0
+                else:
+                    failures += 1
+                    self._requeue(batch)
+
+            if not running:
+                break
+
+    def flush(self) -> bool:
+        """버퍼에 남은 이벤트를 즉시 모두 기록 (실패하면 남은 행을 버퍼에 두고 False)"""
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+            if not batch:
+                return True
+            if not self._write(batch):
+                self._requeue(batch)
+                return False
+
+    def _ensure_partitions(self, db: Session):
+        today = date.today()
+        if self._partitions_checked_on == today:
+            return
+        try:
+            ensure_partitions(db, today)
+            db.commit()
+            self._partitions_checked_on = today
+        except Exception as e:
+            # 파티션이 없어도 기본 파티션에 기록되므로 로그만 남긴다
+            db.rollback()
+            logger.error(f"Failed to ensure history partitions: {e}")
+
+    def _write(self, batch: List[dict]) -> bool:
+        with self._flush_lock:
+            db = self.session_factory()
+            try:
+                self._ensure_partitions(db)
+                write_history_rows(db, batch)
+                db.commit()
+                self.stats["flushed"] += len(batch)
+                return True
+            except Exception as e:
+                db.rollback()
+                self.stats["failed"] += len(batch)
+                logger.error(f"Failed to flush {len(batch)} access log rows: {e}")
+                return False
+            finally:
+                db.close()
+
+    # ==================== 실패 처리 ====================
+
+    def _requeue(self, batch: List[dict]):
+        """기록하지 못한 배치를 버퍼 앞에 되돌린다 (자리가 모자라면 나머지는 파일로 내보낸다)"""
+        with self._condition:
+            room = max(self.max_queue - len(self._buffer), 0)
+            kept, overflow = batch[:room], batch[room:]
+            self._buffer.extendleft(reversed(kept))
+            self.stats["requeued"] += len(kept)
+        self._spill(overflow)
+
+    def _spill(self, rows: List[dict]):
+        """행을 NDJSON 파일 끝에 추가 (파일 경로가 없으면 버린다)"""
+        if rows:
+            self._spill_lines(_dump_row(row) for row in rows)
+
+    def _spill_lines(self, lines: Iterable[str]):
+        if not self.spill_path:
+            self.stats["dropped"] += sum(1 for _ in lines)
+            return
+        count = 0
+        try:
+            with self._spill_lock, _locked_file(self.spill_path, "a") as file:
+                for line in lines:
+                    file.write(line)
+                    count += 1
+        except OSError as e:
+            logger.error(f"Failed to spill access log rows to {self.spill_path}: {e}")
+        self.stats["spilled"] += count
+        if count:
+            logger.warning(f"Spilled {count} access log rows to {self.spill_path}")
+
+    def _load_line(self, line: str) -> Optional[dict]:
+        try:
+            return _load_row(line)
+        except (ValueError, KeyError, TypeError) as e:
+            # 쓰다 끊긴 마지막 줄 등 읽을 수 없는 줄은 건너뛴다
+            self.stats["corrupt"] += 1
+            logger.warning(f"Skipping corrupt spilled access log row: {e}")
+            return None
+
+    def _replay_spill(self):
+        """이전에 파일로 내보낸 행을 다시 기록 (실패하면 남은 행을 다시 파일에 둔다)
+
+        다시 기록할 행은 .replay 파일 뒤에 옮겨 붙이므로 중단된 이전 재기록분도 함께 기록된다.
+        다른 워커가 이미 다시 기록하고 있으면 건너뛴다.
+        """
+        if not self.spill_path:
+            return
+        replay_path = f"{self.spill_path}.replay"
+        with _locked_file(replay_path, "a+", blocking=False) as replay:
+            if replay is None:
+                return
+            with self._spill_lock, _locked_file(self.spill_path, "r") as spill:
+                if spill is not None:
+                    # 이전 재기록 파일이 줄 중간에서 끊겼어도 새 행과 섞이지 않게 줄을 바꾼다 (빈 줄은 건너뛴다)
+                    replay.write("\n")
+                    shutil.copyfileobj(spill, replay)
+                    replay.flush()
+                    os.remove(self.spill_path)
+
+            replay.seek(0)
+            lines = filter(str.strip, replay)
+            rows = (row for row in map(self._load_line, lines) if row is not None)
+            replayed = 0
+            while True:
+                batch = list(itertools.islice(rows, self.batch_size))
+                if not batch:
+                    break
+                if not self._write(batch):
+                    self._spill(batch)
+                    self._spill(list(rows))
+                    break
+                replayed += len(batch)
+            os.remove(replay_path)
+
+        if replayed:
+            logger.info(f"Replayed {replayed} spilled access log rows")
+
+
+access_log_writer = AccessLogWriter(SessionLocal)
@@ -3,23 +3,43 @@ Daily Start Messages API
 PostgreSQL 데이터베이스 연동 API 서버
 """
 
-from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, tuple_, select, distinct
 from typing import List, Optional
+import asyncio
 import logging
-from datetime import datetime, time
+import json
+import base64
+import hmac
+from datetime import datetime, date, time, timezone
 import random
 
-from database_config import get_db, create_tables, ENVIRONMENT
-from models_messages import DailyMessage, MessageHistory, MessageCategory, AdminUser
+from database_config import get_db, create_tables, ENVIRONMENT, SessionLocal
+from models_messages import DailyMessage, MessageHistory, MessageCategory, AdminUser, MessageTag, DailyMessageTag, split_tags
+from message_catalog import message_catalog
+from search_index import MessageSearchIndex, SearchIndexBuilder
+from no_repeat import recent_messages, client_key
+from access_log import access_log_writer, write_history_rows
+from stats_rollup import get_stats_summary, stats_today
+from history_partitions import ensure_partitions
+from message_changes import get_changes, backfill_updated_at
+from data_export import (
+    EXPORT_API_TOKEN, MEDIA_TYPES, MESSAGE_EXPORT_COLUMNS, HISTORY_EXPORT_COLUMNS,
+    message_export_query, history_export_query, stream_export, export_filename
+)
+from http_cache import make_etag, cache_headers, is_not_modified, not_modified_response
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 필터 값 검증 (빈 값은 필터 없음으로 취급)
+TIME_OF_DAY_PATTERN = "^(morning|afternoon|evening|night|all|)$"
+SEASON_PATTERN = "^(spring|summer|autumn|winter|all|)$"
+
 # FastAPI 앱 생성
 app = FastAPI(
     title="Daily Start Messages API",
@@ -49,10 +69,32 @@ async def startup_event():
     """서버 시작 시 실행"""
     try:
         create_tables()
+
+        db = SessionLocal()
+        try:
+            # 접근 로그 파티션 미리 생성
+            ensure_partitions(db)
+            # 변경 동기화 기준 시각이 없는 기존 메시지 보정
+            backfill_updated_at(db)
+            db.commit()
+            
+            # 메시지 카탈로그 미리 적재
+            message_catalog.ensure_fresh(db)
+            search_index_builder.refresh(message_catalog.version, message_catalog.snapshot)
+        finally:
+            db.close()
+
+        access_log_writer.start()
         logger.info(f"API server started in {ENVIRONMENT} mode")
     except Exception as e:
         logger.error(f"Startup error: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """서버 종료 시 실행"""
+    # 버퍼에 남은 접근 로그 기록
+    access_log_writer.stop()
+
 def get_current_time_period() -> str:
     """현재 시간대 반환"""
     current_hour = datetime.now().hour
@@ -66,22 +108,56 @@ def get_current_time_period() -> str:
     else:
         return "night"
 
-def log_message_access(db: Session, message_id: int, request: Request):
-    """메시지 접근 로그 기록"""
+def get_current_season() -> str:
+    """현재 계절 반환"""
+    current_month = datetime.now().month
+    
+    if 3 <= current_month <= 5:
+        return "spring"
+    elif 6 <= current_month <= 8:
+        return "summer"
+    elif 9 <= current_month <= 11:
+        return "autumn"
+    else:
+        return "winter"
+
+async def log_message_access(message: dict, request: Request):
+    """메시지 접근 로그 기록 (버퍼에 적재 후 백그라운드에서 일괄 기록)"""
     try:
-        user_ip = request.client.host
-        user_agent = request.headers.get("user-agent", "")
-        
-        history = MessageHistory(
-            message_id=message_id,
-            user_ip=user_ip,
-            user_agent=user_agent
+        await access_log_writer.record_async(
+            message_id=message["id"],
+            user_ip=request.client.host,
+            user_agent=request.headers.get("user-agent", ""),
+            category=message["category"]
         )
-        db.add(history)
-        db.commit()
     except Exception as e:
         logger.error(f"Failed to log message access: {e}")
 
+search_index_builder = SearchIndexBuilder()
+
+async def get_search_index() -> MessageSearchIndex:
+    """검색 색인 (카탈로그가 바뀌면 백그라운드에서 다시 만들고 그동안은 직전 색인 사용)"""
+    future = search_index_builder.refresh(message_catalog.version, message_catalog.snapshot)
+    index = search_index_builder.current()
+    if index is None:
+        # 첫 색인이 완성될 때까지만 기다린다 (이벤트 루프는 막지 않는다)
+        index = await asyncio.wrap_future(future)
+    return index
+
+def encode_cursor(message: dict) -> str:
+    """정렬 목록의 다음 페이지 커서 생성 (priority, created_at, id)"""
+    payload = json.dumps([message["priority"], message["createdAt"], message["id"]])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    """커서 해석 (형식이 잘못된 경우 400)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        priority, created_at, message_id = json.loads(base64.urlsafe_b64decode(padded))
+        return int(priority), datetime.fromisoformat(created_at), int(message_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="유효하지 않은 커서입니다")
+
 # ==================== API 엔드포인트 ====================
 
 @app.get("/")
@@ -97,47 +173,108 @@ async def root():
 @app.get("/api/messages")
 async def get_messages(
     request: Request,
+    response: Response,
     category: Optional[str] = Query(None, description="카테고리 필터"),
-    time_of_day: Optional[str] = Query(None, description="시간대 필터"),
+    time_of_day: Optional[str] = Query(None, pattern=TIME_OF_DAY_PATTERN, description="시간대 필터"),
+    season: Optional[str] = Query(None, pattern=SEASON_PATTERN, description="계절 필터"),
+    tags: Optional[str] = Query(None, description="태그 필터 (쉼표로 구분)"),
+    tag_mode: str = Query("any", pattern="^(any|all)$", description="태그 일치 방식: any, all"),
     limit: int = Query(10, ge=1, le=100, description="반환할 메시지 수"),
     random_order: bool = Query(True, description="랜덤 순서 여부"),
+    cursor: Optional[str] = Query(None, description="다음 페이지 커서 (random_order=false 전용)"),
     db: Session = Depends(get_db)
 ):
     """메시지 목록 조회"""
     try:
-        query = db.query(DailyMessage).filter(DailyMessage.is_active == True)
+        if cursor and random_order:
+            raise HTTPException(status_code=400, detail="cursor는 random_order=false 일 때만 사용할 수 있습니다")
         
-        # 필터링
-        if category and category != "all":
-            query = query.filter(DailyMessage.category == category)
-            
-        if time_of_day and time_of_day != "all":
-            query = query.filter(
-                or_(
-                    DailyMessage.time_of_day == time_of_day,
-                    DailyMessage.time_of_day == None,
-                    DailyMessage.time_of_day == ""
-                )
-            )
+        message_catalog.ensure_fresh(db)
+        current_period = get_current_time_period()
+        tag_names = split_tags(tags)
+        next_cursor = None
         
-        # 정렬
         if random_order:
-            query = query.order_by(func.random())
+            # ORDER BY random() 대신 카탈로그의 후보 목록에서 추출 (테이블 크기와 무관)
+            messages = message_catalog.sample(limit, category, time_of_day, season, tag_names, tag_mode)
         else:
-            query = query.order_by(DailyMessage.priority.desc(), DailyMessage.created_at.desc())
+            # 정렬 목록은 카탈로그 버전이 같으면 결과도 같으므로 DB 조회 전에 검증
+            etag = make_etag(message_catalog.version, current_period)
+            headers = cache_headers(etag, message_catalog.last_modified)
+            if is_not_modified(request, etag, message_catalog.last_modified):
+                return not_modified_response(headers)
+            response.headers.update(headers)
+            
+            query = db.query(DailyMessage).filter(DailyMessage.is_active == True)
+            
+            # 필터링
+            if category and category != "all":
+                query = query.filter(DailyMessage.category == category)
+                
+            if time_of_day and time_of_day != "all":
+                query = query.filter(
+                    or_(
+                        DailyMessage.time_of_day == time_of_day,
+                        DailyMessage.time_of_day == None,
+                        DailyMessage.time_of_day == ""
+                    )
+                )
+            
+            if season and season != "all":
+                query = query.filter(
+                    or_(
+                        DailyMessage.season == season,
+                        DailyMessage.season == "all",
+                        DailyMessage.season == None,
+                        DailyMessage.season == ""
+                    )
+                )
+            
+            if tag_names:
+                tagged = select(DailyMessageTag.message_id).join(
+                    MessageTag, MessageTag.id == DailyMessageTag.tag_id
+                ).where(MessageTag.name.in_(tag_names))
+                if tag_mode == "all":
+                    tagged = tagged.group_by(DailyMessageTag.message_id).having(
+                        func.count(distinct(MessageTag.id)) == len(tag_names)
+                    )
+                query = query.filter(DailyMessage.id.in_(tagged))
+            
+            # 키셋 페이지네이션: 이전 페이지 마지막 행 이후부터 조회
+            if cursor:
+                query = query.filter(
+                    tuple_(DailyMessage.priority, DailyMessage.created_at, DailyMessage.id) < decode_cursor(cursor)
+                )
             
-        messages = query.limit(limit).all()
+            # 정렬 (idx_daily_messages_active_*_order 인덱스 순서와 일치)
+            query = query.order_by(
+                DailyMessage.priority.desc(),
+                DailyMessage.created_at.desc(),
+                DailyMessage.id.desc()
+            )
+            
+            # 다음 페이지 존재 여부 확인을 위해 한 건 더 조회
+            rows = query.limit(limit + 1).all()
+            messages = [msg.to_dict() for msg in rows[:limit]]
+            if len(rows) > limit:
+                next_cursor = encode_cursor(messages[-1])
         
         return {
-            "messages": [msg.to_dict() for msg in messages],
+            "messages": messages,
             "total": len(messages),
+            "nextCursor": next_cursor,
             "filters": {
                 "category": category,
                 "timeOfDay": time_of_day,
-                "currentTimePeriod": get_current_time_period()
+                "season": season,
+                "tags": tag_names,
+                "tagMode": tag_mode,
+                "currentTimePeriod": current_period
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get messages: {e}")
         raise HTTPException(status_code=500, detail="메시지 조회 실패")
@@ -146,7 +283,12 @@ async def get_messages(
 async def get_random_message(
     request: Request,
     category: Optional[str] = Query(None),
-    time_of_day: Optional[str] = Query(None),
+    time_of_day: Optional[str] = Query(None, pattern=TIME_OF_DAY_PATTERN, description="시간대 필터 (기본값: 현재 시간대)"),
+    season: Optional[str] = Query(None, pattern=SEASON_PATTERN, description="계절 필터 (기본값: 현재 계절)"),
+    tags: Optional[str] = Query(None, description="태그 필터 (쉼표로 구분)"),
+    tag_mode: str = Query("any", pattern="^(any|all)$", description="태그 일치 방식: any, all"),
+    weighted: bool = Query(True, description="우선순위 가중치 적용 여부"),
+    no_repeat: bool = Query(False, description="최근에 받은 메시지 제외 여부"),
     db: Session = Depends(get_db)
 ):
     """랜덤 메시지 1개 조회"""
@@ -154,44 +296,50 @@ async def get_random_message(
         # 현재 시간대 자동 설정
         if not time_of_day:
             time_of_day = get_current_time_period()
-            
-        query = db.query(DailyMessage).filter(DailyMessage.is_active == True)
         
-        if category and category != "all":
-            query = query.filter(DailyMessage.category == category)
-            
-        if time_of_day and time_of_day != "all":
-            query = query.filter(
-                or_(
-                    DailyMessage.time_of_day == time_of_day,
-                    DailyMessage.time_of_day == None,
-                    DailyMessage.time_of_day == ""
-                )
-            )
+        # 현재 계절 자동 설정
+        if not season:
+            season = get_current_season()
+        
+        tag_names = split_tags(tags)
+        
+        message_catalog.ensure_fresh(db)
         
-        messages = query.all()
+        def draw():
+            message, count = message_catalog.choice(
+                category, time_of_day, season, weighted=weighted, tags=tag_names, tag_mode=tag_mode
+            )
+            if message is None:
+                # 조건에 맞는 메시지가 없으면 전체에서 선택
+                message, count = message_catalog.choice(weighted=weighted)
+            return message, count
         
-        if not messages:
-            # 조건에 맞는 메시지가 없으면 전체에서 선택
-            messages = db.query(DailyMessage).filter(DailyMessage.is_active == True).all()
+        if no_repeat:
+            key = client_key(request.client.host, request.headers.get("user-agent", ""))
+            selected_message, selected_from = recent_messages.choose(key, draw)
+        else:
+            selected_message, selected_from = draw()
             
-        if not messages:
+        if selected_message is None:
             raise HTTPException(status_code=404, detail="메시지를 찾을 수 없습니다")
-            
-        # 랜덤 선택
-        selected_message = random.choice(messages)
         
         # 접근 로그 기록
-        log_message_access(db, selected_message.id, request)
+        await log_message_access(selected_message, request)
         
         return {
-            "message": selected_message.to_dict(),
+            "message": selected_message,
             "metadata": {
-                "selectedFrom": len(messages),
+                "selectedFrom": selected_from,
                 "currentTimePeriod": get_current_time_period(),
+                "currentSeason": get_current_season(),
+                "weighted": weighted,
+                "noRepeat": no_repeat,
                 "filters": {
                     "category": category,
-                    "timeOfDay": time_of_day
+                    "timeOfDay": time_of_day,
+                    "season": season,
+                    "tags": tag_names,
+                    "tagMode": tag_mode
                 }
             }
         }
@@ -202,28 +350,99 @@ async def get_random_message(
         logger.error(f"Failed to get random message: {e}")
         raise HTTPException(status_code=500, detail="랜덤 메시지 조회 실패")
 
+@app.get("/api/messages/catalog")
+async def get_message_catalog(request: Request, db: Session = Depends(get_db)):
+    """활성 메시지 전체 카탈로그 조회 (조건부 요청 지원)"""
+    try:
+        message_catalog.ensure_fresh(db)
+        
+        etag = make_etag(message_catalog.version)
+        headers = cache_headers(etag, message_catalog.last_modified)
+        if is_not_modified(request, etag, message_catalog.last_modified):
+            return not_modified_response(headers)
+        
+        # 직렬화 결과는 카탈로그 버전이 바뀔 때까지 재사용
+        body = message_catalog.memoize("catalog_body", lambda: json.dumps({
+            "version": message_catalog.version,
+            "messages": message_catalog.messages(),
+            "categories": message_catalog.categories(),
+            "total": len(message_catalog)
+        }, ensure_ascii=False).encode("utf-8"))
+        
+        return Response(content=body, media_type="application/json", headers=headers)
+        
+    except Exception as e:
+        logger.error(f"Failed to get message catalog: {e}")
+        raise HTTPException(status_code=500, detail="카탈로그 조회 실패")
+
+@app.get("/api/messages/search")
+async def search_messages(
+    q: str = Query(..., min_length=1, max_length=100, description="검색어 (공백으로 구분된 단어는 모두 포함)"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """메시지 본문/작성자 검색"""
+    try:
+        message_catalog.ensure_fresh(db)
+        
+        index = await get_search_index()
+        total, results, estimated_total = index.search(q, offset=(page - 1) * limit, limit=limit)
+        
+        # 직전 색인으로 검색한 경우 그 사이 비활성화된 메시지는 빼고 최신 내용으로 바꾼다
+        for result in results:
+            result["message"] = message_catalog.get(result["message"]["id"])
+        results = [result for result in results if result["message"] is not None]
+        
+        return {
+            "query": q,
+            "results": results,
+            "total": total,
+            "estimatedTotal": estimated_total,
+            "page": page,
+            "limit": limit,
+            "hasMore": page * limit < total
+        }
+        
+    except Exception as e:
+        logger.error(f"Failed to search messages: {e}")
+        raise HTTPException(status_code=500, detail="메시지 검색 실패")
+
+@app.get("/api/messages/changes")
+async def get_message_changes(
+    since: Optional[str] = Query(None, description="이전 응답의 version (없으면 전체 동기화)"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """버전 토큰 이후 추가/수정/비활성화/삭제된 메시지 조회 (델타 동기화)
+
+    PostgreSQL 에서는 진행 중인 가장 오래된 트랜잭션(pg_snapshot_xmin) 이전의 변경만 내려준다.
+    메시지 DB 에 오래 열린 트랜잭션(유휴 트랜잭션, 긴 일괄 작업 등)이 있으면 끝날 때까지
+    이후 변경이 응답에 나오지 않으므로 idle_in_transaction_session_timeout 등으로 막아 둔다.
+    """
+    try:
+        return get_changes(db, since, limit)
+        
+    except ValueError:
+        raise HTTPException(status_code=400, detail="잘못된 버전 토큰입니다")
+    except Exception as e:
+        logger.error(f"Failed to get message changes: {e}")
+        raise HTTPException(status_code=500, detail="변경 내역 조회 실패")
+
 @app.get("/api/categories")
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(request: Request, response: Response, db: Session = Depends(get_db)):
     """카테고리 목록 조회"""
     try:
-        # 실제 사용 중인 카테고리들 조회
-        used_categories = db.query(
-            DailyMessage.category,
-            func.count(DailyMessage.id).label('count')
-        ).filter(
-            DailyMessage.is_active == True
-        ).group_by(DailyMessage.category).all()
+        # 카탈로그 스냅샷에서 계산해 둔 목록 사용 (메시지/카테고리 변경 시에만 재계산)
+        message_catalog.ensure_fresh(db)
         
-        categories = []
-        for cat_name, count in used_categories:
-            categories.append({
-                "name": cat_name,
-                "count": count,
-                "displayName": cat_name
-            })
-            
-        # 카테고리를 이름순으로 정렬
-        categories.sort(key=lambda x: x['name'])
+        etag = make_etag(message_catalog.version)
+        headers = cache_headers(etag, message_catalog.last_modified)
+        if is_not_modified(request, etag, message_catalog.last_modified):
+            return not_modified_response(headers)
+        response.headers.update(headers)
+        
+        categories = message_catalog.categories()
         
         return {
             "categories": categories,
@@ -254,16 +473,14 @@ async def add_reaction(
             raise HTTPException(status_code=400, detail="유효하지 않은 반응입니다")
         
         # 히스토리에 반응 기록
-        user_ip = request.client.host
-        user_agent = request.headers.get("user-agent", "")
-        
-        history = MessageHistory(
-            message_id=message_id,
-            user_ip=user_ip,
-            user_agent=user_agent,
-            reaction=reaction
-        )
-        db.add(history)
+        write_history_rows(db, [{
+            "message_id": message_id,
+            "user_ip": request.client.host,
+            "user_agent": request.headers.get("user-agent", ""),
+            "reaction": reaction,
+            "accessed_at": datetime.now(timezone.utc),
+            "category": message.category
+        }])
         db.commit()
         
         return {"message": "반응이 기록되었습니다", "reaction": reaction}
@@ -278,49 +495,74 @@ async def add_reaction(
 async def get_stats(db: Session = Depends(get_db)):
     """통계 정보 조회"""
     try:
-        total_messages = db.query(func.count(DailyMessage.id)).filter(
-            DailyMessage.is_active == True
-        ).scalar()
-        
-        total_views = db.query(func.count(MessageHistory.id)).scalar()
-        
-        # 오늘의 접근 수
-        today = datetime.now().date()
-        today_views = db.query(func.count(MessageHistory.id)).filter(
-            func.date(MessageHistory.accessed_at) == today
-        ).scalar()
-        
-        # 인기 카테고리 (상위 5개)
-        popular_categories = db.query(
-            DailyMessage.category,
-            func.count(MessageHistory.id).label('views')
-        ).join(
-            MessageHistory, DailyMessage.id == MessageHistory.message_id
-        ).group_by(DailyMessage.category).order_by(
-            func.count(MessageHistory.id).desc()
-        ).limit(5).all()
+        # 전체 메시지 수는 카탈로그, 조회/반응 수는 일간 집계 테이블에서 조회
+        message_catalog.ensure_fresh(db)
+        summary = get_stats_summary(db, stats_today(db))
         
         return {
-            "totalMessages": total_messages,
-            "totalViews": total_views,
-            "todayViews": today_views,
-            "popularCategories": [
-                {"category": cat, "views": views} 
-                for cat, views in popular_categories
-            ]
+            "totalMessages": len(message_catalog),
+            **summary
         }
         
     except Exception as e:
         logger.error(f"Failed to get stats: {e}")
         raise HTTPException(status_code=500, detail="통계 조회 실패")
 
+def require_export_token(x_export_token: Optional[str] = Header(None)):
+    """내보내기 API 토큰 확인 (EXPORT_API_TOKEN 미설정 시 비활성화)"""
+    if not EXPORT_API_TOKEN:
+        raise HTTPException(status_code=403, detail="내보내기가 비활성화되어 있습니다")
+    if not x_export_token or not hmac.compare_digest(x_export_token, EXPORT_API_TOKEN):
+        raise HTTPException(status_code=401, detail="내보내기 토큰이 올바르지 않습니다")
+
+def export_response(name: str, stmt, columns, export_format: str, compress: bool) -> StreamingResponse:
+    """내보내기 스트리밍 응답 생성"""
+    return StreamingResponse(
+        stream_export(SessionLocal, stmt, list(columns), export_format, compress),
+        media_type="application/gzip" if compress else MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{export_filename(name, export_format, compress)}"'
+        }
+    )
+
+@app.get("/api/export/messages", dependencies=[Depends(require_export_token)])
+async def export_messages(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    compress: bool = Query(False, alias="gzip", description="gzip 압축 여부"),
+    category: Optional[str] = Query(None),
+    since: Optional[date] = Query(None, description="생성일 시작 (포함)"),
+    until: Optional[date] = Query(None, description="생성일 끝 (포함)")
+):
+    """메시지 전체 내보내기 (NDJSON / CSV 스트리밍)"""
+    if since and until and since > until:
+        raise HTTPException(status_code=400, detail="기간이 올바르지 않습니다")
+    
+    stmt = message_export_query(category, since, until)
+    return export_response("messages", stmt, MESSAGE_EXPORT_COLUMNS, export_format, compress)
+
+@app.get("/api/export/history", dependencies=[Depends(require_export_token)])
+async def export_history(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    compress: bool = Query(False, alias="gzip", description="gzip 압축 여부"),
+    category: Optional[str] = Query(None),
+    since: Optional[date] = Query(None, description="접근일 시작 (포함)"),
+    until: Optional[date] = Query(None, description="접근일 끝 (포함)")
+):
+    """접근 로그 내보내기 (NDJSON / CSV 스트리밍)"""
+    if since and until and since > until:
+        raise HTTPException(status_code=400, detail="기간이 올바르지 않습니다")
+    
+    stmt = history_export_query(category, since, until)
+    return export_response("history", stmt, HISTORY_EXPORT_COLUMNS, export_format, compress)
+
 @app.get("/health")
 async def health_check():
     """헬스 체크"""
     return {
         "status": "healthy",
         "environment": ENVIRONMENT,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "accessLog": {**access_log_writer.stats, "pending": access_log_writer.pending()}
     }
 
 if __name__ == "__main__":
@@ -3,18 +3,22 @@
 """
 
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
+from collections import OrderedDict
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import secrets
+import hashlib
+import threading
+import time
+import os
 
-try:
-    from database import get_db
-except ImportError:
-    from database_lite import get_db
+from database_async import get_db, DbSession
 from models import User
 from schemas import TokenData
 
@@ -23,6 +27,15 @@ SECRET_KEY = secrets.token_urlsafe(32)  # 실제 운영에서는 환경변수로
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30일
 
+# 토큰별 사용자 정보 캐시 유지 시간 (초), 다른 워커에서 바뀐 정보는 최대 이 시간만큼 늦게 반영된다
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))
+# 캐시할 최대 토큰 수
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# 비밀번호 해싱 전용 스레드 수 (bcrypt 는 해싱 중 GIL 을 놓으므로 코어 수 이하로 설정)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# 실행 대기 중인 해싱 작업이 이 수를 넘으면 503 으로 거절
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+
 # 비밀번호 해싱
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -37,6 +50,85 @@ def get_password_hash(password: str) -> str:
     """비밀번호 해시화"""
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """이벤트 루프 밖에서 비밀번호 해싱/검증을 실행하는 제한된 스레드 풀
+
+    동시에 실행되는 해싱은 workers 개로 제한하고, 대기열이 max_queue 를 넘으면
+    다른 요청이 밀리지 않도록 새 요청을 503 으로 거절한다.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self.stats = {"completed": 0, "rejected": 0, "queue_time_total": 0.0, "queue_time_max": 0.0}
+
+    def _admit(self):
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="요청이 많아 잠시 후 다시 시도해 주세요.",
+                    headers={"Retry-After": "1"}
+                )
+            self._queued += 1
+
+    def _call(self, submitted_at: float, func, *args):
+        queue_time = time.perf_counter() - submitted_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self.stats["queue_time_total"] += queue_time
+            self.stats["queue_time_max"] = max(self.stats["queue_time_max"], queue_time)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.stats["completed"] += 1
+
+    async def run(self, func, *args):
+        """해싱 함수를 풀에서 실행하고 결과를 기다린다 (대기열이 가득 차면 503)"""
+        self._admit()
+        future = self._executor.submit(self._call, time.perf_counter(), func, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # 실행되기 전에 취소된 작업은 대기 수에서 빼 준다
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+            raise
+
+    def snapshot(self) -> dict:
+        """현재 대기/실행 수와 누적 대기 시간 지표"""
+        with self._lock:
+            completed = self.stats["completed"]
+            return {
+                "workers": self.workers,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": completed,
+                "rejected": self.stats["rejected"],
+                "avgQueueMs": round(self.stats["queue_time_total"] / completed * 1000, 1) if completed else 0.0,
+                "maxQueueMs": round(self.stats["queue_time_max"] * 1000, 1)
+            }
+
+
+password_hasher = PasswordHasher()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """비밀번호 검증 (해싱 스레드 풀에서 실행)"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """비밀번호 해시화 (해싱 스레드 풀에서 실행)"""
+    return await password_hasher.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """JWT 액세스 토큰 생성"""
     to_encode = data.copy()
@@ -49,32 +141,115 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[TokenData]:
-    """JWT 토큰 검증"""
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """JWT 토큰 검증 후 payload 반환 (유효하지 않으면 None)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        token_data = TokenData(username=username)
-        return token_data
     except JWTError:
         return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+def verify_token(token: str) -> Optional[TokenData]:
+    """JWT 토큰 검증"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return TokenData(username=payload["sub"])
+
+class Principal:
+    """인증된 사용자 정보 (엔드포인트가 사용하는 필드만 담은 세션과 무관한 사본)
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-    """사용자 인증"""
-    user = db.query(User).filter(User.username == username).first()
+    UserResponse.from_orm 에 그대로 넘길 수 있다. 값을 바꾸려면 DB 에서 User 를 다시 읽어야 한다.
+    """
+
+    __slots__ = (
+        "id", "username", "email", "display_name", "is_active",
+        "created_at", "last_login", "settings"
+    )
+
+    def __init__(self, user: User):
+        for field in self.__slots__:
+            setattr(self, field, getattr(user, field))
+        self.settings = dict(user.settings or {})
+
+
+class PrincipalCache:
+    """토큰 -> Principal TTL/LRU 캐시
+
+    캐시 항목은 AUTH_CACHE_TTL 과 토큰 만료 시각 중 이른 쪽까지만 유효하다.
+    사용자 정보가 바뀌거나 비활성화되면 invalidate_user 로 해당 사용자의 항목을 지운다.
+    """
+
+    def __init__(self, ttl: int = AUTH_CACHE_TTL, max_size: int = AUTH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[Principal]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, token: str, principal: Principal, token_expires_at: Optional[float] = None):
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str) -> int:
+        """해당 사용자의 캐시 항목 삭제 (삭제한 건수)"""
+        with self._lock:
+            keys = [key for key, (_, principal) in self._entries.items() if principal.id == user_id]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_user(user_id: str):
+    """사용자 정보 변경/비활성화 후 호출해 캐시된 인증 정보를 버린다"""
+    principal_cache.invalidate_user(user_id)
+
+async def authenticate_user(db: DbSession, username: str, password: str) -> Optional[User]:
+    """사용자 인증 (비밀번호 검증은 해싱 스레드 풀에서 실행)"""
+    user = await db.scalar(select(User).where(User.username == username))
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """현재 로그인된 사용자 가져오기"""
+    db: DbSession = Depends(get_db)
+) -> Principal:
+    """현재 로그인된 사용자 가져오기 (토큰별로 캐시)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="인증 정보가 유효하지 않습니다.",
@@ -82,26 +257,32 @@ def get_current_user(
     )
     
     token = credentials.credentials
-    token_data = verify_token(token)
-    if token_data is None:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    
+    payload = decode_token(token)
+    if payload is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = await db.scalar(select(User).where(User.username == payload["sub"]))
     if user is None:
         raise credentials_exception
     
-    return user
+    principal = Principal(user)
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     """현재 활성 사용자 가져오기"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="비활성화된 사용자입니다.")
     return current_user
 
-def create_user(db: Session, username: str, password: str, email: Optional[str] = None, display_name: Optional[str] = None) -> User:
-    """새 사용자 생성"""
+async def create_user(db: DbSession, username: str, password: str, email: Optional[str] = None, display_name: Optional[str] = None) -> User:
+    """새 사용자 생성 (비밀번호 해시화는 해싱 스레드 풀에서 실행)"""
     # 중복 확인
-    existing_user = db.query(User).filter(User.username == username).first()
+    existing_user = await db.scalar(select(User).where(User.username == username))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -109,7 +290,7 @@ def create_user(db: Session, username: str, password: str, email: Optional[str]
         )
     
     if email:
-        existing_email = db.query(User).filter(User.email == email).first()
+        existing_email = await db.scalar(select(User).where(User.email == email))
         if existing_email:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -117,7 +298,7 @@ def create_user(db: Session, username: str, password: str, email: Optional[str]
             )
     
     # 사용자 생성
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash_async(password)
     user = User(
         username=username,
         email=email,
@@ -127,7 +308,7 @@ def create_user(db: Session, username: str, password: str, email: Optional[str]
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     return user
\ No newline at end of file
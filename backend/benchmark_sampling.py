@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+랜덤 메시지 추출 벤치마크
+카탈로그 기반 추출과 ORDER BY random() 방식의 지연 시간을 카탈로그 크기별로 비교합니다.
+
+사용법:
+    python benchmark_sampling.py                 # 카탈로그 추출만 측정 (1k ~ 1M)
+    python benchmark_sampling.py --with-sql      # SQLite ORDER BY random() 비교 포함 (100k 까지)
+"""
+
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+from message_catalog import MessageCatalog
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SQL_MAX_SIZE = 100_000
+ITERATIONS = 1000
+SQL_ITERATIONS = 20
+LIMIT = 10
+
+CATEGORIES = [f"category_{i}" for i in range(40)]
+TIME_PERIODS = ["morning", "afternoon", "evening", "night", "", None]
+
+
+def build_messages(size: int) -> list:
+    """to_dict() 형태의 가짜 메시지 생성"""
+    rng = random.Random(size)
+    return [
+        {
+            "id": i,
+            "text": f"message {i}",
+            "author": "benchmark",
+            "category": rng.choice(CATEGORIES),
+            "timeOfDay": rng.choice(TIME_PERIODS),
+            "season": "all",
+            "isActive": True,
+            "priority": rng.randint(1, 10),
+            "tags": [],
+            "createdAt": None,
+            "updatedAt": None,
+            "createdBy": "benchmark"
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+def measure(func, iterations: int) -> tuple:
+    """중앙값과 p99 지연 시간 (ms)"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def bench_catalog(messages: list) -> tuple:
+    catalog = MessageCatalog()
+    catalog.replace(messages)
+
+    def run():
+        catalog.sample(LIMIT, random.choice(CATEGORIES), "morning")
+
+    # 필터별 후보 목록은 첫 요청 때 만들어지므로 미리 한 번씩 채운다
+    for category in CATEGORIES:
+        catalog.pool(category, "morning")
+    return measure(run, ITERATIONS)
+
+
+def bench_sql(messages: list) -> tuple:
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE daily_messages (id INTEGER PRIMARY KEY, category TEXT, time_of_day TEXT, is_active INTEGER)"
+    )
+    conn.execute("CREATE INDEX idx_category ON daily_messages (is_active, category)")
+    conn.executemany(
+        "INSERT INTO daily_messages VALUES (?, ?, ?, 1)",
+        [(m["id"], m["category"], m["timeOfDay"]) for m in messages]
+    )
+
+    def run():
+        conn.execute(
+            "SELECT id FROM daily_messages WHERE is_active = 1 AND category = ? "
+            "AND (time_of_day = 'morning' OR time_of_day IS NULL OR time_of_day = '') "
+            "ORDER BY random() LIMIT ?",
+            (random.choice(CATEGORIES), LIMIT)
+        ).fetchall()
+
+    result = measure(run, SQL_ITERATIONS)
+    conn.close()
+    return result
+
+
+def main():
+    with_sql = "--with-sql" in sys.argv
+
+    print(f"{'rows':>10} | {'catalog p50':>12} | {'catalog p99':>12} | {'ORDER BY random() p50':>22}")
+    print("-" * 66)
+    for size in SIZES:
+        messages = build_messages(size)
+        p50, p99 = bench_catalog(messages)
+
+        sql_column = "-"
+        if with_sql and size <= SQL_MAX_SIZE:
+            sql_p50, _ = bench_sql(messages)
+            sql_column = f"{sql_p50:.3f}ms"
+
+        print(f"{size:>10,} | {p50:>10.4f}ms | {p99:>10.4f}ms | {sql_column:>22}")
+
+
+if __name__ == "__main__":
+    main()
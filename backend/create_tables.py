@@ -33,12 +33,21 @@ CREATE TABLE IF NOT EXISTS users (
     settings JSONB DEFAULT '{}'::jsonb
 );
 
+-- 메시지 내용 저장소 (정규화한 JSON 의 SHA-256 -> 내용)
+CREATE TABLE IF NOT EXISTS message_contents (
+    content_hash VARCHAR(64) PRIMARY KEY,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    stored_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- 사용자 즐겨찾기 테이블
 CREATE TABLE IF NOT EXISTS user_favorites (
     id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid()::text,
     user_id VARCHAR NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     message_id VARCHAR NOT NULL,
-    message_data JSONB NOT NULL,
+    content_hash VARCHAR(64) REFERENCES message_contents(content_hash),
+    message_data JSONB, -- 해시 도입 전 행만 사용
     added_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -47,10 +56,35 @@ CREATE TABLE IF NOT EXISTS message_history (
     id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid()::text,
     user_id VARCHAR NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     message_id VARCHAR NOT NULL,
-    message_data JSONB NOT NULL,
+    content_hash VARCHAR(64) REFERENCES message_contents(content_hash),
+    message_data JSONB, -- 해시 도입 전 행만 사용
     viewed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- 보존 기간이 지나 삭제된 조회 히스토리의 사용자별 일간 집계
+CREATE TABLE IF NOT EXISTS user_history_daily (
+    user_id VARCHAR NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    view_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+-- 사용자 통계 카운터 테이블
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id VARCHAR PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    total_favorites INTEGER NOT NULL DEFAULT 0,
+    total_history INTEGER NOT NULL DEFAULT 0,
+    total_journal_entries INTEGER NOT NULL DEFAULT 0,
+    total_goals INTEGER NOT NULL DEFAULT 0,
+    completed_goals INTEGER NOT NULL DEFAULT 0,
+    total_user_messages INTEGER NOT NULL DEFAULT 0,
+    total_days INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_visit_day DATE,
+    recent_days BIGINT NOT NULL DEFAULT 0 -- 비트 i = last_visit_day 의 i일 전 방문
+);
+
 -- 일기 엔트리 테이블
 CREATE TABLE IF NOT EXISTS journal_entries (
     id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid()::text,
@@ -122,6 +156,8 @@ CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_user_favorites_user_id ON user_favorites(user_id);
 CREATE INDEX IF NOT EXISTS idx_message_history_user_id ON message_history(user_id);
+CREATE INDEX IF NOT EXISTS idx_message_history_content_hash ON message_history(content_hash);
+CREATE INDEX IF NOT EXISTS idx_user_favorites_content_hash ON user_favorites(content_hash);
 CREATE INDEX IF NOT EXISTS idx_journal_entries_user_date ON journal_entries(user_id, date);
 CREATE INDEX IF NOT EXISTS idx_user_goals_user_id ON user_goals(user_id);
 CREATE INDEX IF NOT EXISTS idx_user_messages_user_id ON user_messages(user_id);
@@ -0,0 +1,123 @@
+"""
+메시지/접근 로그 스트리밍 내보내기
+서버 측 커서(yield_per)로 일정 건수씩 읽어 NDJSON 또는 CSV 청크로 내보내므로 행 수와 무관하게 메모리가 일정하다.
+"""
+
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models_messages import DailyMessage, MessageHistory
+
+# 내보내기 인증 토큰 (설정하지 않으면 내보내기 비활성화)
+EXPORT_API_TOKEN = os.getenv("EXPORT_API_TOKEN", "")
+# 서버 측 커서에서 한 번에 가져올 행 수
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "2000"))
+
+EXPORT_FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+MESSAGE_EXPORT_COLUMNS = (
+    "id", "text", "author", "category", "time_of_day", "season", "is_active",
+    "priority", "tags", "created_at", "updated_at", "created_by"
+)
+HISTORY_EXPORT_COLUMNS = ("id", "message_id", "user_ip", "user_agent", "reaction", "accessed_at")
+
+
+def _day_range(column, since: Optional[date], until: Optional[date]) -> list:
+    """[since, until] (날짜 포함) 범위 조건"""
+    conditions = []
+    if since is not None:
+        conditions.append(column >= datetime.combine(since, datetime.min.time()))
+    if until is not None:
+        conditions.append(column < datetime.combine(until + timedelta(days=1), datetime.min.time()))
+    return conditions
+
+
+def message_export_query(category: Optional[str] = None, since: Optional[date] = None, until: Optional[date] = None):
+    """daily_messages 내보내기 쿼리 (생성일 기준 범위, id 순)"""
+    stmt = select(*(getattr(DailyMessage, column) for column in MESSAGE_EXPORT_COLUMNS))
+    if category:
+        stmt = stmt.where(DailyMessage.category == category)
+    return stmt.where(*_day_range(DailyMessage.created_at, since, until)).order_by(DailyMessage.id)
+
+
+def history_export_query(category: Optional[str] = None, since: Optional[date] = None, until: Optional[date] = None):
+    """message_history 내보내기 쿼리
+
+    accessed_at 범위 조건으로 해당 파티션만 읽고, 대량 정렬을 피하도록 순서는 보장하지 않는다.
+    """
+    stmt = select(*(getattr(MessageHistory, column) for column in HISTORY_EXPORT_COLUMNS))
+    if category:
+        stmt = stmt.where(
+            MessageHistory.message_id.in_(select(DailyMessage.id).where(DailyMessage.category == category))
+        )
+    return stmt.where(*_day_range(MessageHistory.accessed_at, since, until))
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _encode_ndjson(columns: List[str], rows: list) -> str:
+    return "".join(
+        json.dumps({column: _json_value(value) for column, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def _encode_csv(rows: list) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_json_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def stream_export(
+    session_factory: Callable[[], Session],
+    stmt,
+    columns: List[str],
+    export_format: str = "ndjson",
+    compress: bool = False
+) -> Iterator[bytes]:
+    """쿼리 결과를 NDJSON/CSV (선택적으로 gzip) 청크로 생성
+
+    응답이 끝날 때까지 세션을 유지해야 하므로 요청 세션 대신 생성기가 직접 세션을 연다.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    db = session_factory()
+    try:
+        if export_format == "csv":
+            yield encode(_encode_csv([columns]))
+
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_FETCH_SIZE))
+        for rows in result.partitions():
+            if export_format == "csv":
+                chunk = encode(_encode_csv(rows))
+            else:
+                chunk = encode(_encode_ndjson(columns, rows))
+            if chunk:
+                yield chunk
+
+        if compressor:
+            yield compressor.flush()
+    finally:
+        db.close()
+
+
+def export_filename(name: str, export_format: str, compress: bool) -> str:
+    return f"{name}-{datetime.now():%Y%m%d%H%M%S}.{export_format}{'.gz' if compress else ''}"
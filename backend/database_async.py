@@ -0,0 +1,117 @@
+"""
+비동기 데이터베이스 연결 (main.py 용)
+PostgreSQL 은 asyncpg, SQLite(lite) 는 aiosqlite 드라이버로 AsyncSession 을 만든다.
+
+DB_ASYNC=false 로 두면 기존 동기 Session 을 그대로 사용하며, 엔드포인트는 두 경우 모두
+DbSession 을 통해 같은 코드로 동작한다 (동기 모드에서는 쿼리가 이벤트 루프를 막는다).
+"""
+
+import os
+from typing import Any, AsyncIterator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+try:
+    from database import SessionLocal, connection_string
+    DEFAULT_ASYNC_DATABASE_URL = connection_string.set(drivername="postgresql+asyncpg")
+except ImportError:
+    from database_lite import SessionLocal, DATABASE_URL
+    DEFAULT_ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+# 비동기 드라이버 사용 여부 (false 면 기존 동기 Session)
+DB_ASYNC = os.getenv("DB_ASYNC", "true").lower() in ("1", "true", "yes")
+# 비동기 연결 URL (기본값: 동기 설정과 같은 데이터베이스)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or DEFAULT_ASYNC_DATABASE_URL
+# 연결 풀 크기 (느린 클라이언트가 많아도 쿼리 중인 요청만 연결을 점유한다)
+ASYNC_POOL_SIZE = int(os.getenv("ASYNC_POOL_SIZE", "10"))
+ASYNC_MAX_OVERFLOW = int(os.getenv("ASYNC_MAX_OVERFLOW", "20"))
+
+_async_engine = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_engine():
+    """비동기 엔진 (처음 사용할 때 생성하므로 동기 모드에서는 비동기 드라이버가 필요 없다)"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        options = {"pool_pre_ping": True}
+        if not str(ASYNC_DATABASE_URL).startswith("sqlite"):
+            options.update(pool_size=ASYNC_POOL_SIZE, max_overflow=ASYNC_MAX_OVERFLOW, pool_recycle=300)
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **options)
+        # 커밋 후 응답 직렬화에서 지연 로딩이 일어나지 않도록 만료시키지 않는다
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_engine
+
+
+class DbSession:
+    """동기 Session / AsyncSession 공통 인터페이스 (add 외에는 모두 await 로 호출)
+
+    엔드포인트는 select()/delete() 문과 이 메서드만 사용하고, Query API 와 관계 지연 로딩은 쓰지 않는다.
+    """
+
+    __slots__ = ("session", "is_async")
+
+    def __init__(self, session):
+        self.session = session
+        self.is_async = isinstance(session, AsyncSession)
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        result = getattr(self.session, method)(*args, **kwargs)
+        if self.is_async:
+            result = await result
+        return result
+
+    async def execute(self, statement, *args, **kwargs):
+        return await self._call("execute", statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await self._call("scalar", statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await self._call("scalars", statement, *args, **kwargs)
+
+    async def get(self, model, ident):
+        return await self._call("get", model, ident)
+
+    async def delete(self, instance):
+        await self._call("delete", instance)
+
+    async def flush(self):
+        await self._call("flush")
+
+    async def commit(self):
+        await self._call("commit")
+
+    async def rollback(self):
+        await self._call("rollback")
+
+    async def refresh(self, instance):
+        await self._call("refresh", instance)
+
+    def add(self, instance):
+        self.session.add(instance)
+
+    @property
+    def dialect_name(self) -> str:
+        return self.session.get_bind().dialect.name
+
+
+async def get_db() -> AsyncIterator[DbSession]:
+    """데이터베이스 세션 의존성 (DB_ASYNC 에 따라 AsyncSession 또는 동기 Session)"""
+    if DB_ASYNC:
+        get_async_engine()
+        async with _async_session_factory() as session:
+            yield DbSession(session)
+        return
+
+    db = SessionLocal()
+    try:
+        yield DbSession(db)
+    finally:
+        db.close()
+
+
+async def dispose_async_engine():
+    """종료 시 연결 풀 정리"""
+    if _async_engine is not None:
+        await _async_engine.dispose()
@@ -1,13 +1,18 @@
 """
 PostgreSQL 데이터베이스 설정 및 연결 관리
 개발/운영 환경 분리 지원
+
+MESSAGES_DATABASE_URL 에 sqlite URL 을 주면 PostgreSQL 없이 SQLite 로 실행한다 (로컬 개발, 테스트).
+이때 스키마 이름은 schema_translate_map 으로 지워 기본 데이터베이스에 테이블을 만든다.
 """
 
 import os
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, text, inspect
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from typing import Generator
+from sqlalchemy.pool import StaticPool
+from typing import Generator, Optional
 
 # 환경변수 또는 기본값 설정
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")  # development, production
@@ -47,21 +52,48 @@ def get_database_url(environment: str = None) -> str:
         f"?sslmode={config['OPTIONS']['sslmode']}"
     )
 
+# 메타데이터에 스키마 설정
+def get_schema() -> str:
+    """현재 환경의 스키마 반환"""
+    return DATABASE_CONFIG[ENVIRONMENT]["SCHEMA"]
+
+# 연결 URL 직접 지정 (예: sqlite:///./messages.db, sqlite:// 는 메모리)
+DATABASE_URL = os.getenv("MESSAGES_DATABASE_URL") or get_database_url()
+
+def create_database_engine(url: str):
+    """연결 URL 에 맞는 엔진 생성 (SQLite 는 스키마 없이 기본 데이터베이스 사용)"""
+    if url.startswith("sqlite"):
+        options = {"connect_args": {"check_same_thread": False}}
+        if url in ("sqlite://", "sqlite:///:memory:"):
+            # 메모리 데이터베이스는 연결마다 따로 생기므로 하나를 공유한다
+            options["poolclass"] = StaticPool
+        return create_engine(
+            url,
+            execution_options={"schema_translate_map": {get_schema(): None}},
+            **options
+        )
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        echo=True if ENVIRONMENT == "development" else False
+    )
+
 # SQLAlchemy 엔진 및 세션 생성
-engine = create_engine(
-    get_database_url(),
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=True if ENVIRONMENT == "development" else False
-)
+engine = create_database_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-# 메타데이터에 스키마 설정
-def get_schema() -> str:
-    """현재 환경의 스키마 반환"""
-    return DATABASE_CONFIG[ENVIRONMENT]["SCHEMA"]
+def table_schema(table) -> Optional[str]:
+    """실제 데이터베이스의 스키마 이름 (SQLite 는 None)"""
+    return None if engine.dialect.name == "sqlite" else table.schema
+
+def dialect_insert(dialect_name: str, model):
+    """ON CONFLICT 를 지원하는 방언별 INSERT 생성 (PostgreSQL / SQLite)"""
+    if dialect_name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
 
 # 데이터베이스 세션 의존성
 def get_db() -> Generator:
@@ -77,12 +109,30 @@ def create_tables():
     """데이터베이스 테이블 생성"""
     # 스키마 먼저 생성
     schema = get_schema()
-    with engine.connect() as conn:
-        conn.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
-        conn.commit()
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+            conn.commit()
     
     # 테이블 생성
     Base.metadata.create_all(bind=engine)
+    
+    # 이미 존재하는 테이블에 나중에 추가된 (NULL 허용) 컬럼 추가
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name, schema=table_schema(table))}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    qualified = f"{table_schema(table)}.{table.name}" if table_schema(table) else table.name
+                    conn.execute(text(f"ALTER TABLE {qualified} ADD COLUMN {column.name} {column_type}"))
+    
+    # 이미 존재하는 테이블에 나중에 추가된 인덱스 생성
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
     print(f"Tables created in schema: {schema}")
 
 if __name__ == "__main__":
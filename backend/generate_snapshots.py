@@ -0,0 +1,158 @@
+"""
+활성 메시지 카탈로그 정적 스냅샷 생성
+daily_messages 의 활성 메시지를 내용 해시가 붙은 JSON 파일로 내보내고 gzip/brotli 로 미리 압축한 뒤,
+service-worker.js 가 캐시 무효화에 사용하는 manifest.json 을 갱신한다.
+카탈로그 버전이 바뀌지 않았으면 아무것도 다시 만들지 않는다.
+
+사용법:
+    python generate_snapshots.py                 # ../snapshots 에 생성 (버전이 같으면 건너뜀)
+    python generate_snapshots.py --out dist/snapshots
+    python generate_snapshots.py --force         # 버전과 무관하게 다시 생성
+
+brotli 압축은 brotli 패키지가 설치된 경우에만 만든다.
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import hashlib
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Optional
+
+from database_config import SessionLocal, ENVIRONMENT
+from message_catalog import message_catalog
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 스냅샷 출력 디렉터리 (기본값: 저장소 루트의 snapshots)
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", str(Path(__file__).parent.parent / "snapshots"))
+# 이전 버전 스냅샷을 남겨 둘 개수 (이전 manifest 를 가진 클라이언트용)
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "3"))
+
+SNAPSHOT_PREFIX = "messages."
+MANIFEST_NAME = "manifest.json"
+
+
+def build_snapshot(catalog) -> bytes:
+    """카탈로그를 messages.json 과 같은 형태의 JSON 바이트로 직렬화 (같은 내용이면 같은 바이트)"""
+    payload = {
+        "version": catalog.version,
+        "messages": catalog.messages(),
+        "categories": catalog.categories()
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def load_manifest(out_dir: Path) -> Optional[dict]:
+    try:
+        return json.loads((out_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path: Path, data: bytes):
+    """임시 파일에 쓴 뒤 교체 (CDN/웹 서버가 반쯤 쓰인 파일을 내보내지 않도록)"""
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+def _is_current(manifest: Optional[dict], version: str, out_dir: Path) -> bool:
+    return bool(
+        manifest
+        and manifest.get("version") == version
+        and (out_dir / manifest.get("file", "")).is_file()
+    )
+
+
+def write_snapshot(out_dir: Path, data: bytes, version: str, count: int) -> dict:
+    """스냅샷과 압축본을 쓰고 manifest 갱신 (manifest 는 마지막에 교체한다)"""
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    name = f"{SNAPSHOT_PREFIX}{digest}.json"
+
+    _write_atomic(out_dir / name, data)
+    # mtime 을 고정해 같은 내용이면 같은 gzip 바이트가 나오도록 한다
+    _write_atomic(out_dir / f"{name}.gz", gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write_atomic(out_dir / f"{name}.br", brotli.compress(data, quality=11))
+
+    manifest = {
+        "version": version,
+        "file": name,
+        "hash": digest,
+        "size": len(data),
+        "count": count,
+        "encodings": ["gzip", "br"] if brotli is not None else ["gzip"],
+        "generatedAt": datetime.now(timezone.utc).isoformat()
+    }
+    _write_atomic(out_dir / MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    return manifest
+
+
+def prune_snapshots(out_dir: Path, keep: int = SNAPSHOT_KEEP) -> list:
+    """최근 keep 개를 제외한 이전 스냅샷 파일 삭제"""
+    snapshots = sorted(
+        out_dir.glob(f"{SNAPSHOT_PREFIX}*.json"),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True
+    )
+    removed = []
+    for path in snapshots[keep:]:
+        for variant in (path, path.with_name(path.name + ".gz"), path.with_name(path.name + ".br")):
+            if variant.exists():
+                variant.unlink()
+                removed.append(variant.name)
+    return removed
+
+
+def generate(db, out_dir: Path, force: bool = False) -> Optional[dict]:
+    """카탈로그 버전이 바뀐 경우에만 스냅샷 생성 (새 manifest, 건너뛰면 None)"""
+    message_catalog.invalidate()
+    message_catalog.ensure_fresh(db)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if not force and _is_current(load_manifest(out_dir), message_catalog.version, out_dir):
+        return None
+
+    data = build_snapshot(message_catalog)
+    manifest = write_snapshot(out_dir, data, message_catalog.version, len(message_catalog))
+    prune_snapshots(out_dir)
+    return manifest
+
+
+def main():
+    """스냅샷 생성 실행"""
+    args = sys.argv[1:]
+    if "--help" in args:
+        print(__doc__)
+        sys.exit(0)
+
+    out_dir = Path(args[args.index("--out") + 1]) if "--out" in args else Path(SNAPSHOT_DIR)
+    print(f"Generating catalog snapshot from {ENVIRONMENT} environment into {out_dir}...")
+    if brotli is None:
+        print("brotli is not installed; writing gzip only")
+
+    started = time.time()
+    db = SessionLocal()
+    try:
+        manifest = generate(db, out_dir, force="--force" in args)
+        if manifest is None:
+            print(f"Catalog version {message_catalog.version} unchanged; nothing to do")
+        else:
+            print(f"Wrote {manifest['file']} ({manifest['count']} messages, {manifest['size']:,} bytes)")
+        print(f"Completed in {time.time() - started:.1f}s")
+    except Exception as e:
+        print(f"Snapshot generation failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
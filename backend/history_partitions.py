@@ -0,0 +1,301 @@
+"""
+message_history 월별 파티션 관리
+PostgreSQL 에서는 accessed_at 범위 파티션을 미리 만들고, 오래된 파티션을 통째로 분리/삭제한다.
+SQLite 대체 모드에서는 단일 테이블을 월 단위 가상 파티션으로 보고 범위 DELETE 로 대신한다.
+
+사용법:
+    python history_partitions.py --list                        # 파티션 목록
+    python history_partitions.py --ensure                      # 이번 달부터 미리 만들 파티션 생성
+    python history_partitions.py --drop-before 2026-01         # 해당 월 이전 파티션 삭제
+    python history_partitions.py --drop-before 2026-01 --detach-only   # 삭제하지 않고 분리만
+    python history_partitions.py --convert                     # 기존 일반 테이블을 파티션 테이블로 전환
+"""
+
+import os
+import sys
+import time
+import logging
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from database_config import SessionLocal, ENVIRONMENT, get_schema
+from models_messages import MessageHistory
+
+logger = logging.getLogger(__name__)
+
+# 이번 달 이후로 미리 만들어 둘 파티션 수
+HISTORY_PARTITION_MONTHS_AHEAD = int(os.getenv("HISTORY_PARTITION_MONTHS_AHEAD", "3"))
+
+PARENT_TABLE = MessageHistory.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+
+# ==================== 월 계산 ====================
+
+def month_start(value: date) -> date:
+    """해당 날짜가 속한 달의 1일"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def parse_month(value: str) -> date:
+    """YYYY-MM 문자열을 달의 1일로 변환"""
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month:%Y%m}"
+
+
+def month_bounds(month: date) -> tuple:
+    """파티션 범위 [시작, 끝) (UTC 기준)"""
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    next_month = add_months(month, 1)
+    end = datetime(next_month.year, next_month.month, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def _qualified(name: str) -> str:
+    return f'"{get_schema()}"."{name}"'
+
+
+def _is_postgresql(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+# ==================== 조회 ====================
+
+def table_kind(db: Session) -> Optional[str]:
+    """message_history 테이블 종류: partitioned, regular, None (없음)"""
+    if not _is_postgresql(db):
+        return "regular"
+
+    relkind = db.execute(text(
+        "SELECT c.relkind FROM pg_class c "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = :schema AND c.relname = :name"
+    ), {"schema": get_schema(), "name": PARENT_TABLE}).scalar()
+
+    if relkind is None:
+        return None
+    return "partitioned" if relkind == "p" else "regular"
+
+
+def list_partitions(db: Session) -> List[dict]:
+    """파티션 목록 (SQLite 대체 모드에서는 데이터가 있는 달)"""
+    if not _is_postgresql(db):
+        month = func.strftime("%Y-%m", MessageHistory.accessed_at)
+        rows = db.execute(
+            select(month, func.count()).group_by(month).order_by(month)
+        ).all()
+        return [
+            {"name": partition_name(parse_month(value)), "month": parse_month(value), "rows": count}
+            for value, count in rows
+        ]
+
+    rows = db.execute(text(
+        "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+        "FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "JOIN pg_namespace n ON n.oid = parent.relnamespace "
+        "WHERE n.nspname = :schema AND parent.relname = :name "
+        "ORDER BY child.relname"
+    ), {"schema": get_schema(), "name": PARENT_TABLE}).all()
+
+    partitions = []
+    for name, bound in rows:
+        month = None
+        if name.startswith(f"{PARENT_TABLE}_p"):
+            month = datetime.strptime(name[-6:], "%Y%m").date()
+        partitions.append({"name": name, "month": month, "bound": bound})
+    return partitions
+
+
+# ==================== 생성 ====================
+
+def _create_partition(db: Session, month: date):
+    """월 파티션 생성 (기본 파티션에 이미 들어간 해당 월 데이터는 새 파티션으로 옮긴다)"""
+    name = partition_name(month)
+    start, end = month_bounds(month)
+    bounds = {"start": start, "end": end}
+
+    stray = db.execute(text(
+        f"SELECT 1 FROM {_qualified(DEFAULT_PARTITION)} "
+        "WHERE accessed_at >= :start AND accessed_at < :end LIMIT 1"
+    ), bounds).first()
+
+    if stray is None:
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_qualified(name)} PARTITION OF {_qualified(PARENT_TABLE)} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        return
+
+    # 기본 파티션에 범위가 겹치는 행이 있으면 PARTITION OF 가 실패하므로 옮긴 뒤 붙인다
+    db.execute(text(f"CREATE TABLE {_qualified(name)} (LIKE {_qualified(PARENT_TABLE)} INCLUDING DEFAULTS)"))
+    db.execute(text(
+        f"WITH moved AS (DELETE FROM {_qualified(DEFAULT_PARTITION)} "
+        "WHERE accessed_at >= :start AND accessed_at < :end RETURNING *) "
+        f"INSERT INTO {_qualified(name)} SELECT * FROM moved"
+    ), bounds)
+    db.execute(text(
+        f"ALTER TABLE {_qualified(PARENT_TABLE)} ATTACH PARTITION {_qualified(name)} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    logger.info(f"Moved stray rows from {DEFAULT_PARTITION} into {name}")
+
+
+def ensure_partitions(
+    db: Session,
+    today: Optional[date] = None,
+    months_ahead: int = HISTORY_PARTITION_MONTHS_AHEAD,
+    first_month: Optional[date] = None
+) -> List[str]:
+    """이번 달(또는 first_month)부터 months_ahead 개월 뒤까지의 파티션과 기본 파티션 보장 (커밋은 호출자가 담당)
+
+    파티션 테이블이 아니면 (SQLite, 전환 전 테이블) 아무것도 하지 않는다.
+    """
+    if table_kind(db) != "partitioned":
+        return []
+
+    current = month_start(today or date.today())
+    month = month_start(first_month) if first_month else current
+    last = add_months(current, months_ahead)
+
+    db.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {_qualified(DEFAULT_PARTITION)} "
+        f"PARTITION OF {_qualified(PARENT_TABLE)} DEFAULT"
+    ))
+
+    existing = {partition["name"] for partition in list_partitions(db)}
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            _create_partition(db, month)
+            created.append(name)
+        month = add_months(month, 1)
+
+    if created:
+        logger.info(f"Created history partitions: {', '.join(created)}")
+    return created
+
+
+# ==================== 삭제 ====================
+
+def drop_partitions_before(db: Session, cutoff: date, detach_only: bool = False) -> List[str]:
+    """cutoff 달 이전의 파티션을 분리(및 삭제) (커밋은 호출자가 담당)
+
+    SQLite 대체 모드에서는 같은 범위를 DELETE 로 지운다.
+    """
+    cutoff = month_start(cutoff)
+
+    if not _is_postgresql(db):
+        partitions = [p for p in list_partitions(db) if p["month"] < cutoff]
+        if partitions:
+            db.execute(
+                MessageHistory.__table__.delete().where(
+                    MessageHistory.accessed_at < datetime(cutoff.year, cutoff.month, 1)
+                )
+            )
+        return [partition["name"] for partition in partitions]
+
+    removed = []
+    for partition in list_partitions(db):
+        if partition["month"] is None or partition["month"] >= cutoff:
+            continue
+        name = partition["name"]
+        db.execute(text(f"ALTER TABLE {_qualified(PARENT_TABLE)} DETACH PARTITION {_qualified(name)}"))
+        if not detach_only:
+            db.execute(text(f"DROP TABLE {_qualified(name)}"))
+        removed.append(name)
+    return removed
+
+
+# ==================== 전환 ====================
+
+def convert_to_partitioned(db: Session) -> int:
+    """기존 일반 message_history 를 파티션 테이블로 전환하고 옮긴 행 수 반환 (커밋은 호출자가 담당)
+
+    기존 테이블은 message_history_legacy 로 이름을 바꿔 남겨 두므로 확인 후 직접 삭제한다.
+    """
+    if not _is_postgresql(db):
+        raise RuntimeError("Partitioning is only supported on PostgreSQL")
+    if table_kind(db) != "regular":
+        raise RuntimeError(f"{PARENT_TABLE} is not a regular table")
+
+    legacy = f"{PARENT_TABLE}_legacy"
+    db.execute(text(f"ALTER TABLE {_qualified(PARENT_TABLE)} RENAME TO {legacy}"))
+    MessageHistory.__table__.create(bind=db.connection())
+
+    first_access = db.execute(text(f"SELECT min(accessed_at) FROM {_qualified(legacy)}")).scalar()
+    first_month = first_access.astimezone(timezone.utc).date() if first_access else None
+    ensure_partitions(db, first_month=first_month)
+
+    moved = db.execute(text(
+        f"INSERT INTO {_qualified(PARENT_TABLE)} (id, message_id, user_ip, user_agent, accessed_at, reaction) "
+        "SELECT id, message_id, user_ip, user_agent, coalesce(accessed_at, now()), reaction "
+        f"FROM {_qualified(legacy)}"
+    )).rowcount
+
+    # 이후 INSERT 가 기존 id 와 겹치지 않도록 identity 시퀀스를 맞춘다
+    db.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{_qualified(PARENT_TABLE)}', 'id'), "
+        f"coalesce((SELECT max(id) FROM {_qualified(PARENT_TABLE)}), 0) + 1, false)"
+    ))
+    return moved
+
+
+def main():
+    """파티션 관리 실행"""
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+
+    print(f"Managing {PARENT_TABLE} partitions in {ENVIRONMENT} environment...")
+    db = SessionLocal()
+    started = time.time()
+
+    try:
+        if "--convert" in args:
+            moved = convert_to_partitioned(db)
+            print(f"Converted {PARENT_TABLE} to a partitioned table ({moved} rows moved)")
+            print(f"Drop {PARENT_TABLE}_legacy after verifying the new table")
+        elif "--ensure" in args:
+            created = ensure_partitions(db)
+            print(f"Created partitions: {', '.join(created) or 'none'}")
+        elif "--drop-before" in args:
+            cutoff = parse_month(args[args.index("--drop-before") + 1])
+            removed = drop_partitions_before(db, cutoff, detach_only="--detach-only" in args)
+            action = "Detached" if "--detach-only" in args else "Dropped"
+            print(f"{action} partitions: {', '.join(removed) or 'none'}")
+        elif "--list" in args:
+            print(f"Table kind: {table_kind(db)}")
+            for partition in list_partitions(db):
+                details = partition.get("bound") or f"{partition.get('rows')} rows"
+                print(f"  {partition['name']}: {details}")
+        else:
+            print(__doc__)
+            sys.exit(1)
+
+        db.commit()
+        print(f"Completed in {time.time() - started:.1f}s")
+    except Exception as e:
+        print(f"Partition management failed: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+접근 히스토리 보존 기간 정리 작업
+보존 기간이 지난 원본 행을 일간 집계로 옮긴 뒤, 긴 잠금과 WAL 급증을 피하도록 작은 배치로 나누어 삭제한다.
+
+- message_history (익명 접근 로그): 일간 집계(message_daily_stats, category_daily_stats)가
+  원본과 맞는지 확인하고 부족한 날짜를 다시 집계한 다음, 통째로 지울 수 있는 월 파티션은 DROP 하고
+  나머지는 배치 DELETE 한다.
+- 사용자 message_history (models.MessageHistory): 배치마다 같은 트랜잭션에서
+  user_history_daily 에 조회 수를 더하고 원본을 삭제한다.
+- message_contents: 히스토리/즐겨찾기 어느 쪽에서도 참조하지 않고 유예 시간이 지난 메시지 내용을 삭제한다.
+
+사용법:
+    python history_retention.py                   # 기본 보존 기간으로 정리
+    python history_retention.py --dry-run         # 삭제 대상 건수만 확인
+    python history_retention.py --days 30 --user-days 180 --batch-size 2000
+"""
+
+import os
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.orm import Session
+
+from database_config import SessionLocal, ENVIRONMENT, dialect_insert
+from models_messages import MessageHistory, CategoryDailyStat
+from stats_rollup import backfill_rollups, stats_day_column, stats_day_start
+from history_partitions import table_kind, drop_partitions_before, month_start
+
+try:
+    from database import SessionLocal as UserSessionLocal
+except ImportError:
+    from database_lite import SessionLocal as UserSessionLocal
+import models
+from message_store import CONTENT_SWEEP_GRACE_HOURS
+from user_stats import visit_day, visit_day_start
+
+# 익명 접근 로그 보존 기간 (일)
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "90"))
+# 사용자 조회 히스토리 보존 기간 (일)
+USER_HISTORY_RETENTION_DAYS = int(os.getenv("USER_HISTORY_RETENTION_DAYS", "365"))
+# 한 트랜잭션에서 지울 최대 행 수
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "5000"))
+# 배치 사이 대기 시간 (초), 복제/vacuum 이 따라올 여유를 준다
+RETENTION_BATCH_PAUSE = float(os.getenv("RETENTION_BATCH_PAUSE", "0.05"))
+
+
+class Progress:
+    """배치 삭제 진행 상황과 처리량 출력"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.total = 0
+        self.started = time.time()
+
+    def add(self, count: int):
+        self.total += count
+        print(f"  {self.label}: {self.total:,} rows ({self.rate():,.0f} rows/s)")
+
+    def rate(self) -> float:
+        return self.total / max(time.time() - self.started, 1e-6)
+
+
+def _as_date(value) -> date:
+    # SQLite 의 date() 는 문자열을 돌려준다
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+# ==================== 익명 접근 로그 ====================
+
+def repair_rollups(db: Session, cutoff: date) -> List[date]:
+    """cutoff 이전 날짜 중 원본 건수가 집계보다 많은 날짜를 다시 집계 (커밋은 호출자가 담당)
+
+    원본이 집계보다 적은 날짜는 이전 실행에서 이미 일부 삭제된 것이므로 집계를 그대로 둔다.
+    """
+    day = stats_day_column(db, MessageHistory.accessed_at)
+    raw_counts = db.execute(
+        select(day, func.count()).where(MessageHistory.accessed_at < stats_day_start(db, cutoff)).group_by(day)
+    ).all()
+    rolled_counts = dict(db.execute(
+        select(CategoryDailyStat.day, func.sum(CategoryDailyStat.count))
+        .where(CategoryDailyStat.day < cutoff)
+        .group_by(CategoryDailyStat.day)
+    ).all())
+
+    repaired = []
+    for value, raw_count in sorted(raw_counts):
+        value = _as_date(value)
+        if raw_count > (rolled_counts.get(value) or 0):
+            backfill_rollups(db, value, value + timedelta(days=1))
+            repaired.append(value)
+    return repaired
+
+
+def prune_history(
+    db: Session,
+    cutoff: date,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause: float = RETENTION_BATCH_PAUSE
+) -> int:
+    """cutoff 이전 접근 로그 삭제 (파티션 DROP 후 나머지는 배치마다 커밋)"""
+    # 집계일 경계에서 자른다 (UTC 월 파티션은 경계 이전에 끝나는 것만 DROP)
+    cutoff_at = stats_day_start(db, cutoff)
+    if table_kind(db) == "partitioned":
+        dropped = drop_partitions_before(db, month_start(cutoff_at.astimezone(timezone.utc).date()))
+        db.commit()
+        if dropped:
+            print(f"  Dropped partitions: {', '.join(dropped)}")
+
+    progress = Progress("message_history deleted")
+    while True:
+        batch_ids = select(MessageHistory.id).where(
+            MessageHistory.accessed_at < cutoff_at
+        ).limit(batch_size).scalar_subquery()
+        deleted = db.execute(
+            delete(MessageHistory).where(
+                MessageHistory.accessed_at < cutoff_at,
+                MessageHistory.id.in_(batch_ids)
+            )
+        ).rowcount
+        db.commit()
+
+        if not deleted:
+            break
+        progress.add(deleted)
+        time.sleep(pause)
+    return progress.total
+
+
+# ==================== 사용자 조회 히스토리 ====================
+
+def prepare_user_tables(db: Session):
+    """집계 테이블과 보존 기간 조회용 인덱스가 없으면 생성"""
+    bind = db.get_bind()
+    models.UserHistoryDaily.__table__.create(bind=bind, checkfirst=True)
+    for model in (models.MessageHistory, models.UserFavorite):
+        for index in model.__table__.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def compact_user_history(
+    db: Session,
+    cutoff: date,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause: float = RETENTION_BATCH_PAUSE
+) -> int:
+    """cutoff 이전 사용자 히스토리를 user_history_daily 로 옮기고 삭제
+
+    집계와 삭제가 배치마다 같은 트랜잭션이므로 중간에 멈춰도 다시 실행하면 이어서 처리된다.
+    """
+    history = models.MessageHistory
+    daily = models.UserHistoryDaily
+    dialect_name = db.get_bind().dialect.name
+    cutoff_at = visit_day_start(dialect_name, cutoff)
+    progress = Progress("user message_history compacted")
+
+    while True:
+        rows = db.execute(
+            select(history.id, history.user_id, history.viewed_at)
+            .where(history.viewed_at < cutoff_at)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        counts = Counter((user_id, visit_day(dialect_name, viewed_at)) for _, user_id, viewed_at in rows)
+        stmt = dialect_insert(db.get_bind().dialect.name, daily).values([
+            {"user_id": user_id, "day": day, "view_count": count}
+            for (user_id, day), count in sorted(counts.items())
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "day"],
+            set_={"view_count": daily.__table__.c.view_count + stmt.excluded.view_count}
+        ))
+        db.execute(delete(history).where(history.id.in_([row.id for row in rows])))
+        db.commit()
+
+        progress.add(len(rows))
+        time.sleep(pause)
+    return progress.total
+
+
+def _unreferenced_contents(cutoff_at: datetime):
+    """참조되지 않고 cutoff_at 이전에 마지막으로 저장된 메시지 내용 조건"""
+    contents = models.MessageContent
+    return (
+        contents.stored_at < cutoff_at,
+        ~exists().where(models.MessageHistory.content_hash == contents.content_hash),
+        ~exists().where(models.UserFavorite.content_hash == contents.content_hash)
+    )
+
+
+def sweep_message_contents(
+    db: Session,
+    grace_hours: int = CONTENT_SWEEP_GRACE_HOURS,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause: float = RETENTION_BATCH_PAUSE
+) -> int:
+    """히스토리 삭제/즐겨찾기 제거로 참조가 사라진 메시지 내용 삭제
+
+    최근에 저장된 내용은 참조 행이 아직 커밋되지 않았을 수 있으므로 grace_hours 동안 남겨 둔다.
+    """
+    contents = models.MessageContent
+    conditions = _unreferenced_contents(datetime.now(timezone.utc) - timedelta(hours=grace_hours))
+    progress = Progress("message_contents swept")
+
+    while True:
+        hashes = db.scalars(select(contents.content_hash).where(*conditions).limit(batch_size)).all()
+        if not hashes:
+            break
+
+        # 조회와 삭제 사이에 다시 참조된 내용은 남기도록 조건을 함께 건다
+        db.execute(delete(contents).where(contents.content_hash.in_(hashes), *conditions))
+        db.commit()
+
+        progress.add(len(hashes))
+        time.sleep(pause)
+    return progress.total
+
+
+# ==================== 실행 ====================
+
+def _option(args: List[str], name: str, default: int) -> int:
+    if name in args:
+        return int(args[args.index(name) + 1])
+    return default
+
+
+def main():
+    """보존 기간 정리 실행"""
+    args = sys.argv[1:]
+    if "--help" in args:
+        print(__doc__)
+        sys.exit(0)
+
+    dry_run = "--dry-run" in args
+    batch_size = _option(args, "--batch-size", RETENTION_BATCH_SIZE)
+    today = date.today()
+    cutoff = today - timedelta(days=_option(args, "--days", HISTORY_RETENTION_DAYS))
+    user_cutoff = today - timedelta(days=_option(args, "--user-days", USER_HISTORY_RETENTION_DAYS))
+
+    print(f"History retention in {ENVIRONMENT} environment{' (dry run)' if dry_run else ''}")
+    print(f"  message_history before {cutoff}, user message_history before {user_cutoff}")
+    started = time.time()
+
+    db = SessionLocal()
+    try:
+        if dry_run:
+            expired = db.query(func.count()).select_from(MessageHistory).filter(
+                MessageHistory.accessed_at < stats_day_start(db, cutoff)
+            ).scalar()
+            print(f"Expired message_history rows: {expired:,}")
+        else:
+            repaired = repair_rollups(db, cutoff)
+            db.commit()
+            print(f"Re-rolled days: {', '.join(map(str, repaired)) or 'none'}")
+            deleted = prune_history(db, cutoff, batch_size)
+            print(f"Deleted message_history rows: {deleted:,}")
+    except Exception as e:
+        print(f"message_history retention failed: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+    user_db = UserSessionLocal()
+    try:
+        prepare_user_tables(user_db)
+        if dry_run:
+            expired = user_db.query(func.count()).select_from(models.MessageHistory).filter(
+                models.MessageHistory.viewed_at < visit_day_start(user_db.get_bind().dialect.name, user_cutoff)
+            ).scalar()
+            print(f"Expired user message_history rows: {expired:,}")
+            unreferenced = user_db.query(func.count()).select_from(models.MessageContent).filter(
+                *_unreferenced_contents(datetime.now(timezone.utc) - timedelta(hours=CONTENT_SWEEP_GRACE_HOURS))
+            ).scalar()
+            print(f"Unreferenced message_contents rows: {unreferenced:,}")
+        else:
+            compacted = compact_user_history(user_db, user_cutoff, batch_size)
+            print(f"Compacted user message_history rows: {compacted:,}")
+            swept = sweep_message_contents(user_db, batch_size=batch_size)
+            print(f"Removed unreferenced message_contents rows: {swept:,}")
+    except Exception as e:
+        print(f"User history retention failed: {e}")
+        user_db.rollback()
+        sys.exit(1)
+    finally:
+        user_db.close()
+
+    print(f"Completed in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
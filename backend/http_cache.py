@@ -0,0 +1,52 @@
+"""
+HTTP 조건부 요청 (ETag / Last-Modified) 유틸리티
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: str) -> str:
+    """강한 ETag 생성"""
+    return '"' + "-".join(parts) + '"'
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    """검증자 응답 헤더 (클라이언트는 매번 재검증)"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache"
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """If-None-Match / If-Modified-Since 검사 (If-None-Match 가 있으면 그것만 본다)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return etag in candidates or f"W/{etag}" in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def not_modified_response(headers: dict) -> Response:
+    """304 응답"""
+    return Response(status_code=304, headers=headers)
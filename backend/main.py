@@ -6,18 +6,21 @@ FastAPI 메인 애플리케이션
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, func
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 # 로컬 임포트
 try:
-    from database import get_db, create_tables
+    from database import create_tables
 except ImportError:
-    from database_lite import get_db, create_tables
-from models import User, UserFavorite, MessageHistory, JournalEntry, UserGoal, UserMessage, MessageReaction
+    from database_lite import create_tables
+from database_async import get_db, DbSession, dispose_async_engine
+from user_stats import VISIT_FIELDS, increment_stats, reset_stats, record_visit, load_user_stats, visit_today
+from message_store import store_message_content, message_payloads
+from models import User, UserFavorite, MessageHistory, UserHistoryDaily, JournalEntry, UserGoal, UserMessage, MessageReaction
 from schemas import *
-from auth import authenticate_user, create_access_token, get_current_active_user, create_user
+from auth import authenticate_user, create_access_token, get_current_active_user, create_user, Principal, invalidate_user, password_hasher
 
 # FastAPI 앱 생성
 app = FastAPI(
@@ -40,6 +43,10 @@ app.add_middleware(
 async def startup_event():
     create_tables()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await dispose_async_engine()
+
 # 기본 엔드포인트
 @app.get("/")
 async def root():
@@ -47,15 +54,15 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now()}
+    return {"status": "healthy", "timestamp": datetime.now(), "passwordHashing": password_hasher.snapshot()}
 
 # === 인증 관련 엔드포인트 ===
 
 @app.post("/auth/register", response_model=Token)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: DbSession = Depends(get_db)):
     """사용자 회원가입"""
     try:
-        user = create_user(
+        user = await create_user(
             db=db,
             username=user_data.username,
             password=user_data.password,
@@ -80,9 +87,9 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
 @app.post("/auth/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: DbSession = Depends(get_db)):
     """사용자 로그인"""
-    user = authenticate_user(db, user_data.username, user_data.password)
+    user = await authenticate_user(db, user_data.username, user_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -91,7 +98,8 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     
     # 마지막 로그인 시간 업데이트
     user.last_login = datetime.now()
-    db.commit()
+    await db.commit()
+    invalidate_user(user.id)
     
     access_token = create_access_token(data={"sub": user.username})
     return {
@@ -101,56 +109,71 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     }
 
 @app.get("/auth/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_info(current_user: Principal = Depends(get_current_active_user)):
     """현재 사용자 정보 조회"""
     return UserResponse.from_orm(current_user)
 
 @app.put("/auth/me", response_model=UserResponse)
 async def update_current_user(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
     """현재 사용자 정보 업데이트"""
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
+    
     if user_update.display_name is not None:
-        current_user.display_name = user_update.display_name
+        user.display_name = user_update.display_name
     if user_update.email is not None:
-        current_user.email = user_update.email
+        user.email = user_update.email
     if user_update.settings is not None:
-        current_user.settings = user_update.settings
+        user.settings = user_update.settings
     
-    current_user.updated_at = datetime.now()
-    db.commit()
-    db.refresh(current_user)
+    user.updated_at = datetime.now()
+    await db.commit()
+    await db.refresh(user)
     
-    return UserResponse.from_orm(current_user)
+    # 캐시된 인증 정보가 이전 값을 돌려주지 않도록 버린다
+    invalidate_user(user.id)
+    
+    return UserResponse.from_orm(user)
 
 # === 즐겨찾기 관련 엔드포인트 ===
 
 @app.get("/favorites", response_model=List[FavoriteResponse])
 async def get_favorites(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
     """사용자 즐겨찾기 목록 조회"""
-    favorites = db.query(UserFavorite).filter(
-        UserFavorite.user_id == current_user.id
-    ).order_by(UserFavorite.added_at.desc()).all()
+    favorites = (await db.scalars(
+        select(UserFavorite).where(
+            UserFavorite.user_id == current_user.id
+        ).order_by(UserFavorite.added_at.desc())
+    )).all()
     
-    return [FavoriteResponse.from_orm(fav) for fav in favorites]
+    payloads = await message_payloads(db, favorites)
+    return [
+        FavoriteResponse(id=fav.id, message_id=fav.message_id, message_data=payload, added_at=fav.added_at)
+        for fav, payload in zip(favorites, payloads)
+    ]
 
 @app.post("/favorites", response_model=FavoriteResponse)
 async def add_favorite(
     favorite_data: FavoriteCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
     """즐겨찾기 추가"""
     # 중복 확인
-    existing = db.query(UserFavorite).filter(
-        UserFavorite.user_id == current_user.id,
-        UserFavorite.message_id == favorite_data.message_id
-    ).first()
+    existing = await db.scalar(
+        select(UserFavorite).where(
+            UserFavorite.user_id == current_user.id,
+            UserFavorite.message_id == favorite_data.message_id
+        )
+    )
     
     if existing:
         raise HTTPException(
@@ -161,26 +184,34 @@ async def add_favorite(
     favorite = UserFavorite(
         user_id=current_user.id,
         message_id=favorite_data.message_id,
-        message_data=favorite_data.message_data
+        content_hash=await store_message_content(db, favorite_data.message_data)
     )
     
     db.add(favorite)
-    db.commit()
-    db.refresh(favorite)
+    await increment_stats(db, current_user.id, total_favorites=1)
+    await db.commit()
+    await db.refresh(favorite)
     
-    return FavoriteResponse.from_orm(favorite)
+    return FavoriteResponse(
+        id=favorite.id,
+        message_id=favorite.message_id,
+        message_data=favorite_data.message_data,
+        added_at=favorite.added_at
+    )
 
 @app.delete("/favorites/{favorite_id}")
 async def remove_favorite(
     favorite_id: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
     """즐겨찾기 제거"""
-    favorite = db.query(UserFavorite).filter(
-        UserFavorite.id == favorite_id,
-        UserFavorite.user_id == current_user.id
-    ).first()
+    favorite = await db.scalar(
+        select(UserFavorite).where(
+            UserFavorite.id == favorite_id,
+            UserFavorite.user_id == current_user.id
+        )
+    )
     
     if not favorite:
         raise HTTPException(
@@ -188,8 +219,9 @@ async def remove_favorite(
             detail="즐겨찾기를 찾을 수 없습니다."
         )
     
-    db.delete(favorite)
-    db.commit()
+    await db.delete(favorite)
+    await increment_stats(db, current_user.id, total_favorites=-1)
+    await db.commit()
     
     return MessageResponse(message="즐겨찾기가 제거되었습니다.")
 
@@ -198,45 +230,63 @@ async def remove_favorite(
 @app.get("/history", response_model=List[HistoryResponse])
 async def get_history(
     limit: int = 100,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
     """사용자 메시지 히스토리 조회"""
-    history = db.query(MessageHistory).filter(
-        MessageHistory.user_id == current_user.id
-    ).order_by(MessageHistory.viewed_at.desc()).limit(limit).all()
+    history = (await db.scalars(
+        select(MessageHistory).where(
+            MessageHistory.user_id == current_user.id
+        ).order_by(MessageHistory.viewed_at.desc()).limit(limit)
+    )).all()
     
-    return [HistoryResponse.from_orm(item) for item in history]
+    payloads = await message_payloads(db, history)
+    return [
+        HistoryResponse(id=item.id, message_id=item.message_id, message_data=payload, viewed_at=item.viewed_at)
+        for item, payload in zip(history, payloads)
+    ]
 
 @app.post("/history", response_model=HistoryResponse)
 async def add_history(
     history_data: HistoryCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
     """히스토리 추가"""
     history = MessageHistory(
         user_id=current_user.id,
         message_id=history_data.message_id,
-        message_data=history_data.message_data
+        content_hash=await store_message_content(db, history_data.message_data)
     )
     
     db.add(history)
-    db.commit()
-    db.refresh(history)
+    await increment_stats(db, current_user.id, total_history=1)
+    await record_visit(db, current_user.id, visit_today(db.dialect_name))
+    await db.commit()
+    await db.refresh(history)
     
-    return HistoryResponse.from_orm(history)
+    return HistoryResponse(
+        id=history.id,
+        message_id=history.message_id,
+        message_data=history_data.message_data,
+        viewed_at=history.viewed_at
+    )
 
 @app.delete("/history")
 async def clear_history(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
-    """히스토리 전체 삭제"""
-    db.query(MessageHistory).filter(
-        MessageHistory.user_id == current_user.id
-    ).delete()
-    db.commit()
+    """히스토리 전체 삭제 (보존 기간 정리로 남은 일간 집계 포함)"""
+    await db.execute(
+        delete(MessageHistory).where(MessageHistory.user_id == current_user.id)
+    )
+    await db.execute(
+        delete(UserHistoryDaily).where(UserHistoryDaily.user_id == current_user.id)
+    )
+    # 방문일도 조회 히스토리에서만 나오므로 함께 비운다
+    await reset_stats(db, current_user.id, "total_history", *VISIT_FIELDS)
+    await db.commit()
     
     return MessageResponse(message="히스토리가 삭제되었습니다.")
 
@@ -245,27 +295,31 @@ async def clear_history(
 @app.get("/journal", response_model=List[JournalEntryResponse])
 async def get_journal_entries(
     limit: int = 30,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
     """일기 엔트리 목록 조회"""
-    entries = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id
-    ).order_by(JournalEntry.date.desc()).limit(limit).all()
+    entries = (await db.scalars(
+        select(JournalEntry).where(
+            JournalEntry.user_id == current_user.id
+        ).order_by(JournalEntry.date.desc()).limit(limit)
+    )).all()
     
     return [JournalEntryResponse.from_orm(entry) for entry in entries]
 
 @app.get("/journal/{date}", response_model=JournalEntryResponse)
 async def get_journal_entry(
     date: str,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
     """특정 날짜의 일기 조회"""
-    entry = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id,
-        JournalEntry.date == date
-    ).first()
+    entry = await db.scalar(
+        select(JournalEntry).where(
+            JournalEntry.user_id == current_user.id,
+            JournalEntry.date == date
+        )
+    )
     
     if not entry:
         raise HTTPException(
@@ -278,15 +332,17 @@ async def get_journal_entry(
 @app.post("/journal", response_model=JournalEntryResponse)
 async def create_journal_entry(
     entry_data: JournalEntryCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
     """일기 작성"""
     # 같은 날짜 일기가 있는지 확인
-    existing = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id,
-        JournalEntry.date == entry_data.date
-    ).first()
+    existing = await db.scalar(
+        select(JournalEntry).where(
+            JournalEntry.user_id == current_user.id,
+            JournalEntry.date == entry_data.date
+        )
+    )
     
     if existing:
         # 기존 일기 업데이트
@@ -296,8 +352,8 @@ async def create_journal_entry(
             existing.mood = entry_data.mood
         existing.updated_at = datetime.now()
         
-        db.commit()
-        db.refresh(existing)
+        await db.commit()
+        await db.refresh(existing)
         return JournalEntryResponse.from_orm(existing)
     else:
         # 새 일기 생성
@@ -309,8 +365,9 @@ async def create_journal_entry(
         )
         
         db.add(entry)
-        db.commit()
-        db.refresh(entry)
+        await increment_stats(db, current_user.id, total_journal_entries=1)
+        await db.commit()
+        await db.refresh(entry)
         
         return JournalEntryResponse.from_orm(entry)
 
@@ -318,14 +375,16 @@ async def create_journal_entry(
 async def update_journal_entry(
     date: str,
     entry_data: JournalEntryUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
     """일기 수정"""
-    entry = db.query(JournalEntry).filter(
-        JournalEntry.user_id == current_user.id,
-        JournalEntry.date == date
-    ).first()
+    entry = await db.scalar(
+        select(JournalEntry).where(
+            JournalEntry.user_id == current_user.id,
+            JournalEntry.date == date
+        )
+    )
     
     if not entry:
         raise HTTPException(
@@ -339,8 +398,8 @@ async def update_journal_entry(
         entry.mood = entry_data.mood
     entry.updated_at = datetime.now()
     
-    db.commit()
-    db.refresh(entry)
+    await db.commit()
+    await db.refresh(entry)
     
     return JournalEntryResponse.from_orm(entry)
 
@@ -348,35 +407,11 @@ async def update_journal_entry(
 
 @app.get("/stats", response_model=UserStatsResponse)
 async def get_user_stats(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: DbSession = Depends(get_db)
 ):
-    """사용자 통계 조회"""
-    # 각종 통계 계산
-    total_favorites = db.query(UserFavorite).filter(UserFavorite.user_id == current_user.id).count()
-    total_history = db.query(MessageHistory).filter(MessageHistory.user_id == current_user.id).count()
-    total_journal_entries = db.query(JournalEntry).filter(JournalEntry.user_id == current_user.id).count()
-    total_goals = db.query(UserGoal).filter(UserGoal.user_id == current_user.id).count()
-    completed_goals = db.query(UserGoal).filter(
-        UserGoal.user_id == current_user.id,
-        UserGoal.is_completed == True
-    ).count()
-    total_user_messages = db.query(UserMessage).filter(UserMessage.user_id == current_user.id).count()
-    
-    # 연속 방문일 계산 (간단한 버전)
-    current_streak = 1  # 임시값
-    total_days = total_history  # 임시값
-    
-    return UserStatsResponse(
-        total_favorites=total_favorites,
-        total_history=total_history,
-        total_journal_entries=total_journal_entries,
-        total_goals=total_goals,
-        completed_goals=completed_goals,
-        total_user_messages=total_user_messages,
-        current_streak=current_streak,
-        total_days=total_days
-    )
+    """사용자 통계 조회 (쓰기 시점에 갱신한 카운터 행 1건)"""
+    return UserStatsResponse(**await load_user_stats(db, current_user.id, visit_today(db.dialect_name)))
 
 if __name__ == "__main__":
     import uvicorn
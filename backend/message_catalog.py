@@ -0,0 +1,624 @@
+"""
+활성 메시지 인메모리 카탈로그
+프로세스 단위로 활성 메시지를 한 번만 적재하고 (카테고리, 시간대, 계절) 기준으로 인덱싱
+"""
+
+import os
+import json
+import hashlib
+import random
+import threading
+import time
+import logging
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, object_session
+
+from models_messages import DailyMessage, MessageCategory, MessageTombstone
+
+logger = logging.getLogger(__name__)
+
+# 다른 프로세스에서 발생한 변경을 확인하는 주기 (초)
+CATALOG_REFRESH_INTERVAL = int(os.getenv("CATALOG_REFRESH_INTERVAL", "60"))
+# 이 건수 이하의 변경은 전체 재적재 대신 해당 메시지만 다시 읽어 반영
+CATALOG_PATCH_LIMIT = int(os.getenv("CATALOG_PATCH_LIMIT", "500"))
+# 태그 필터 결과를 보관하는 최대 조합 수
+TAG_POOL_CACHE_SIZE = int(os.getenv("TAG_POOL_CACHE_SIZE", "256"))
+# 태그 없는 필터 결과를 보관하는 최대 조합 수 (별칭 테이블도 같은 수만 보관)
+POOL_CACHE_SIZE = int(os.getenv("POOL_CACHE_SIZE", "1024"))
+
+TIMES_OF_DAY = ("morning", "afternoon", "evening", "night")
+SEASONS = ("spring", "summer", "autumn", "winter")
+
+BucketKey = Tuple[str, str, str]
+FilterKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+HASH_MODULUS = 1 << 256
+
+
+def _normalize_time_of_day(value: Optional[str]) -> str:
+    """시간대 값 정규화 (NULL/빈 문자열은 모든 시간대에 해당)"""
+    return value or ""
+
+
+def _normalize_season(value: Optional[str]) -> str:
+    """계절 값 정규화 (NULL/빈 문자열은 all로 취급)"""
+    return value or "all"
+
+
+def _filter_value(value: Optional[str]) -> Optional[str]:
+    """요청 필터 값 정규화 (all/빈 값은 필터 없음)"""
+    if not value or value == "all":
+        return None
+    return value
+
+
+def _filter_key(category: Optional[str], time_of_day: Optional[str], season: Optional[str]) -> FilterKey:
+    """요청 필터를 캐시 키로 변환
+
+    알 수 없는 시간대는 시간대 없는 메시지만, 알 수 없는 계절은 all 메시지만 고르므로
+    같은 결과를 내는 하나의 키로 모아 임의의 값으로 캐시가 늘어나지 않게 한다.
+    """
+    time_of_day = _filter_value(time_of_day)
+    if time_of_day is not None and time_of_day not in TIMES_OF_DAY:
+        time_of_day = ""
+    season = _filter_value(season)
+    if season is not None and season not in SEASONS:
+        season = "all"
+    return _filter_value(category), time_of_day, season
+
+
+def _bucket_key(message: dict) -> BucketKey:
+    return (
+        message["category"],
+        _normalize_time_of_day(message["timeOfDay"]),
+        _normalize_season(message["season"])
+    )
+
+
+def _matches(key: FilterKey, bucket: BucketKey) -> bool:
+    """버킷이 필터 조건에 포함되는지 여부"""
+    category, time_of_day, season = key
+    bucket_category, bucket_time, bucket_season = bucket
+    if category is not None and bucket_category != category:
+        return False
+    if time_of_day is not None and bucket_time not in (time_of_day, ""):
+        return False
+    if season is not None and bucket_season not in (season, "all"):
+        return False
+    return True
+
+
+def _intersect_sorted(left: Sequence[int], right: Sequence[int]) -> array:
+    """정렬된 ID 배열 교집합 (짧은 쪽을 기준으로 긴 쪽을 이진 탐색)"""
+    if len(left) > len(right):
+        left, right = right, left
+    result = array("q")
+    position = 0
+    for value in left:
+        position = bisect_left(right, value, position)
+        if position == len(right):
+            break
+        if right[position] == value:
+            result.append(value)
+    return result
+
+
+def _normalize_tags(tags: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    if not tags:
+        return ()
+    return tuple(sorted({tag.strip() for tag in tags if tag and tag.strip()}))
+
+
+def _weight(message: dict) -> int:
+    """선택 가중치 (priority 1-10, 범위를 벗어나면 잘라낸다)"""
+    return min(max(message.get("priority") or 1, 1), 10)
+
+
+def _message_hash(message: dict) -> int:
+    digest = hashlib.sha256(json.dumps(message, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return int.from_bytes(digest.digest(), "big")
+
+
+def _aware(timestamp: Optional[datetime]) -> Optional[datetime]:
+    # SQLite 는 시간대 없는 값을 돌려준다
+    if timestamp is not None and timestamp.tzinfo is None:
+        timestamp = timestamp.astimezone()
+    return timestamp
+
+
+def _timestamp(message: dict) -> Optional[datetime]:
+    value = message.get("updatedAt") or message.get("createdAt")
+    if not value:
+        return None
+    return _aware(datetime.fromisoformat(value))
+
+
+def _fingerprint_changed_at(fingerprint: Optional[tuple]) -> Optional[datetime]:
+    """요약값에 담긴 마지막 변경 시각 (비활성 메시지 수정, 카테고리 수정, 삭제 포함)"""
+    if not fingerprint:
+        return None
+    return max(
+        (_aware(value) for value in fingerprint if isinstance(value, datetime)),
+        default=None
+    )
+
+
+class AliasTable:
+    """Walker/Vose 별칭 테이블 (구성 O(n), 추출 O(1))"""
+
+    __slots__ = ("probability", "alias")
+
+    def __init__(self, weights: List[int]):
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+
+        self.probability = [1.0] * count
+        self.alias = list(range(count))
+
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # 남은 항목은 부동소수 오차를 무시하고 확률 1로 둔다
+
+    def draw(self) -> int:
+        index = random.randrange(len(self.probability))
+        if random.random() < self.probability[index]:
+            return index
+        return self.alias[index]
+
+
+class MessageCatalog:
+    """활성 메시지 카탈로그
+
+    메시지는 to_dict() 결과로 한 번만 직렬화해 보관하고,
+    필터 조합별 후보 목록과 가중치 별칭 테이블은 처음 요청될 때 만들어 재사용한다.
+    메시지 일부가 바뀌면 해당 메시지가 속한 버킷의 후보 목록만 다시 만든다.
+    """
+
+    def __init__(self, refresh_interval: int = CATALOG_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._dirty = True
+        self._changed_ids: Set[int] = set()
+        self._checked_at = 0.0
+        self._fingerprint = None
+
+        self._by_id: Dict[int, dict] = {}
+        self._buckets: Dict[BucketKey, List[dict]] = {}
+        self._pools: "OrderedDict[FilterKey, List[dict]]" = OrderedDict()
+        self._tag_pools: "OrderedDict[tuple, List[dict]]" = OrderedDict()
+        self._alias_tables: Dict[tuple, AliasTable] = {}
+        self._category_meta: Dict[str, dict] = {}
+        self._categories: Optional[List[dict]] = None
+        self._memo: Dict[str, Any] = {}
+
+        self._message_hash_sum = 0
+        self._category_hash = ""
+        self.version: Optional[str] = None
+        self.last_modified: Optional[datetime] = None
+
+    # ==================== 갱신 ====================
+
+    def invalidate(self):
+        """다음 접근 시 전체를 다시 적재하도록 표시"""
+        self._dirty = True
+
+    def mark_changed(self, message_ids: Iterable[int]):
+        """다음 접근 시 해당 메시지만 다시 읽도록 표시"""
+        with self._lock:
+            self._changed_ids.update(message_ids)
+
+    def ensure_fresh(self, db: Session):
+        """필요한 경우에만 DB에서 카탈로그를 다시 적재"""
+        if self._is_fresh():
+            return
+
+        with self._lock:
+            if self._is_fresh():
+                return
+
+            # 적재 중 들어온 변경 표시를 놓치지 않도록 먼저 가져간다
+            dirty, self._dirty = self._dirty, False
+            changed_ids, self._changed_ids = self._changed_ids, set()
+
+            fingerprint = self._read_fingerprint(db)
+            if dirty or not self._loaded or len(changed_ids) > CATALOG_PATCH_LIMIT:
+                self._load(db, fingerprint)
+            elif changed_ids:
+                self._patch(db, changed_ids, fingerprint)
+            elif fingerprint != self._fingerprint:
+                self._load(db, fingerprint)
+            self._checked_at = time.monotonic()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._loaded
+            and not self._dirty
+            and not self._changed_ids
+            and time.monotonic() - self._checked_at < self.refresh_interval
+        )
+
+    def _read_fingerprint(self, db: Session) -> tuple:
+        """테이블 변경 여부를 판단하기 위한 요약값 조회"""
+        category_count = db.query(func.count(MessageCategory.id)).scalar_subquery()
+        category_max_id = db.query(func.max(MessageCategory.id)).scalar_subquery()
+        category_updated = db.query(func.max(MessageCategory.updated_at)).scalar_subquery()
+        tombstone_removed = db.query(func.max(MessageTombstone.removed_at)).scalar_subquery()
+        return tuple(db.query(
+            func.count(DailyMessage.id),
+            func.max(DailyMessage.id),
+            func.max(DailyMessage.updated_at),
+            category_count,
+            category_max_id,
+            category_updated,
+            tombstone_removed
+        ).one())
+
+    def _load(self, db: Session, fingerprint: tuple):
+        """활성 메시지 전체를 적재하고 인덱스 재구성"""
+        started = time.perf_counter()
+
+        rows = db.query(DailyMessage).filter(
+            DailyMessage.is_active == True
+        ).order_by(DailyMessage.id).yield_per(1000)
+
+        categories = [category.to_dict() for category in db.query(MessageCategory).all()]
+
+        self.replace([row.to_dict() for row in rows], categories, fingerprint)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Message catalog loaded: {len(self)} messages, {len(self._buckets)} buckets ({elapsed_ms:.1f}ms)")
+
+    def _patch(self, db: Session, message_ids: Set[int], fingerprint: Optional[tuple] = None):
+        """변경된 메시지만 다시 읽어 반영하고, 영향받은 후보 목록만 폐기"""
+        previous_version = self.version
+        rows = db.query(DailyMessage).filter(DailyMessage.id.in_(message_ids)).all()
+        current = {row.id: row.to_dict() for row in rows if row.is_active}
+
+        touched: Set[BucketKey] = set()
+        for message_id in message_ids:
+            old = self._by_id.pop(message_id, None)
+            if old is not None:
+                bucket_key = _bucket_key(old)
+                bucket = self._buckets[bucket_key]
+                bucket.remove(old)
+                if not bucket:
+                    del self._buckets[bucket_key]
+                self._message_hash_sum = (self._message_hash_sum - _message_hash(old)) % HASH_MODULUS
+                touched.add(bucket_key)
+
+            new = current.get(message_id)
+            if new is not None:
+                bucket_key = _bucket_key(new)
+                self._buckets.setdefault(bucket_key, []).append(new)
+                self._by_id[message_id] = new
+                self._message_hash_sum = (self._message_hash_sum + _message_hash(new)) % HASH_MODULUS
+                touched.add(bucket_key)
+
+        for key in [key for key in self._pools if any(_matches(key, bucket) for bucket in touched)]:
+            del self._pools[key]
+            self._alias_tables.pop(key, None)
+        for key in self._tag_pools:
+            self._alias_tables.pop(key, None)
+        self._tag_pools.clear()
+
+        self._categories = None
+        self._memo = {}
+        self._fingerprint = fingerprint
+        self._update_version()
+        self._advance_last_modified(
+            previous_version,
+            [self.last_modified, _fingerprint_changed_at(fingerprint)]
+            + [_timestamp(self._by_id[message_id]) for message_id in message_ids if message_id in self._by_id]
+        )
+        logger.info(f"Message catalog patched: {len(message_ids)} messages, {len(touched)} buckets")
+
+    def replace(
+        self,
+        messages: List[dict],
+        categories: Optional[List[dict]] = None,
+        fingerprint: Optional[tuple] = None
+    ):
+        """직렬화된 메시지/카테고리 목록으로 인덱스 재구성"""
+        previous_version = self.version
+        by_id = {}
+        buckets: Dict[BucketKey, List[dict]] = {}
+        hash_sum = 0
+        for data in messages:
+            by_id[data["id"]] = data
+            buckets.setdefault(_bucket_key(data), []).append(data)
+            hash_sum = (hash_sum + _message_hash(data)) % HASH_MODULUS
+
+        categories = sorted(categories or [], key=lambda c: c["name"])
+
+        self._by_id = by_id
+        self._buckets = buckets
+        self._pools = OrderedDict()
+        self._tag_pools = OrderedDict()
+        self._alias_tables = {}
+        self._category_meta = {category["name"]: category for category in categories}
+        self._categories = None
+        self._memo = {}
+        self._fingerprint = fingerprint
+        self._message_hash_sum = hash_sum
+        self._category_hash = hashlib.sha256(
+            json.dumps(categories, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        self._update_version()
+        self._advance_last_modified(
+            previous_version,
+            [_fingerprint_changed_at(fingerprint)] + list(map(_timestamp, messages))
+        )
+        self._loaded = True
+
+    def _advance_last_modified(self, previous_version: Optional[str], candidates: Iterable[Optional[datetime]]):
+        """Last-Modified 갱신
+
+        활성 메시지뿐 아니라 비활성화/삭제/카테고리 수정 시각도 반영하고,
+        내용이 바뀌었는데 기록된 시각으로는 앞으로 가지 않으면 (직접 수정한 행 등) 현재 시각을 쓴다.
+        """
+        previous = self.last_modified
+        latest = max((timestamp for timestamp in candidates if timestamp is not None), default=None)
+        if previous is not None and previous_version is not None:
+            if self.version == previous_version:
+                latest = max(latest or previous, previous)
+            elif latest is None or latest <= previous:
+                latest = datetime.now(timezone.utc)
+        self.last_modified = latest
+
+    def _update_version(self):
+        """카탈로그 내용 해시 (메시지별 해시의 합이라 일부 변경 시에도 O(1)로 갱신)"""
+        digest = hashlib.sha256(f"{self._message_hash_sum:064x}:{self._category_hash}".encode("ascii"))
+        self.version = digest.hexdigest()[:32]
+
+    # ==================== 조회 ====================
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def messages(self) -> List[dict]:
+        """활성 메시지 전체 (ID 순)"""
+        return self.memoize("messages", lambda: [self._by_id[key] for key in sorted(self._by_id)])
+
+    def snapshot(self) -> Tuple[Optional[str], List[dict]]:
+        """(버전, 활성 메시지 목록) 을 같은 시점 기준으로 복사 (다른 스레드에서 색인을 만들 때 사용)"""
+        with self._lock:
+            return self.version, list(self._by_id.values())
+
+    def memoize(self, key: str, factory: Callable[[], Any]) -> Any:
+        """현재 스냅샷 동안만 유지되는 계산 결과 캐시"""
+        if key not in self._memo:
+            self._memo[key] = factory()
+        return self._memo[key]
+
+    def get(self, message_id: int) -> Optional[dict]:
+        """ID로 메시지 조회"""
+        return self._by_id.get(message_id)
+
+    def _remember(self, cache: "OrderedDict[tuple, List[dict]]", key: tuple, pool: List[dict], limit: int):
+        """후보 목록을 LRU 캐시에 저장 (밀려난 목록의 별칭 테이블도 함께 버린다)"""
+        cache[key] = pool
+        if len(cache) > limit:
+            evicted, _ = cache.popitem(last=False)
+            self._alias_tables.pop(evicted, None)
+
+    def _pool(self, key: FilterKey) -> List[dict]:
+        pool = self._pools.get(key)
+        if pool is not None:
+            self._pools.move_to_end(key)
+            return pool
+
+        pool = []
+        for bucket_key, bucket in self._buckets.items():
+            if _matches(key, bucket_key):
+                pool.extend(bucket)
+
+        # 빈 결과는 저장하지 않고, 나머지도 POOL_CACHE_SIZE 개까지만 보관한다
+        if pool:
+            pool.sort(key=lambda message: message["id"])
+            self._remember(self._pools, key, pool, POOL_CACHE_SIZE)
+        return pool
+
+    def tag_index(self) -> Dict[str, array]:
+        """태그 -> 정렬된 메시지 ID 배열 (역색인)"""
+        def build():
+            index: Dict[str, array] = {}
+            for message in self.messages():
+                for tag in message["tags"]:
+                    index.setdefault(tag, array("q")).append(message["id"])
+            return index
+        return self.memoize("tag_index", build)
+
+    def _tag_ids(self, tags: Tuple[str, ...], tag_mode: str) -> Sequence[int]:
+        """태그 조건에 맞는 메시지 ID (all: 교집합, any: 합집합)"""
+        index = self.tag_index()
+        postings = [index.get(tag) for tag in tags]
+
+        if tag_mode == "all":
+            if any(posting is None for posting in postings):
+                return ()
+            postings.sort(key=len)
+            result = postings[0]
+            for posting in postings[1:]:
+                result = _intersect_sorted(result, posting)
+                if not result:
+                    break
+            return result
+
+        return sorted(set().union(*(posting for posting in postings if posting is not None)))
+
+    def _tag_pool(self, key: FilterKey, tags: Tuple[str, ...], tag_mode: str) -> List[dict]:
+        cache_key = (key, tags, tag_mode)
+        pool = self._tag_pools.get(cache_key)
+        if pool is not None:
+            self._tag_pools.move_to_end(cache_key)
+            return pool
+
+        pool = []
+        for message_id in self._tag_ids(tags, tag_mode):
+            message = self._by_id[message_id]
+            if _matches(key, _bucket_key(message)):
+                pool.append(message)
+
+        if pool:
+            self._remember(self._tag_pools, cache_key, pool, TAG_POOL_CACHE_SIZE)
+        return pool
+
+    def _candidates(
+        self,
+        category: Optional[str],
+        time_of_day: Optional[str],
+        season: Optional[str],
+        tags: Optional[Iterable[str]],
+        tag_mode: str
+    ) -> Tuple[tuple, List[dict]]:
+        """(캐시 키, 후보 목록)"""
+        key = _filter_key(category, time_of_day, season)
+        tags = _normalize_tags(tags)
+        if not tags:
+            return key, self._pool(key)
+        return (key, tags, tag_mode), self._tag_pool(key, tags, tag_mode)
+
+    def pool(
+        self,
+        category: Optional[str] = None,
+        time_of_day: Optional[str] = None,
+        season: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+        tag_mode: str = "any"
+    ) -> List[dict]:
+        """필터 조건에 맞는 후보 메시지 목록
+
+        시간대가 비어 있는 메시지는 모든 시간대에, 계절이 all인 메시지는 모든 계절에 포함된다.
+        tags 가 주어지면 tag_mode 에 따라 하나라도(any) 또는 모두(all) 가진 메시지로 좁힌다.
+        """
+        return self._candidates(category, time_of_day, season, tags, tag_mode)[1]
+
+    def choice(
+        self,
+        category: Optional[str] = None,
+        time_of_day: Optional[str] = None,
+        season: Optional[str] = None,
+        weighted: bool = False,
+        tags: Optional[Iterable[str]] = None,
+        tag_mode: str = "any"
+    ) -> Tuple[Optional[dict], int]:
+        """조건에 맞는 메시지 1개를 무작위로 선택 (선택된 메시지, 후보 수)
+
+        weighted=True 이면 priority 에 비례한 확률로 선택한다.
+        """
+        cache_key, pool = self._candidates(category, time_of_day, season, tags, tag_mode)
+        if not pool:
+            return None, 0
+        if not weighted:
+            return random.choice(pool), len(pool)
+
+        table = self._alias_tables.get(cache_key)
+        if table is None:
+            table = AliasTable([_weight(message) for message in pool])
+            # 캐시에 남아 있는 후보 목록의 별칭 테이블만 보관한다 (목록과 함께 밀려난다)
+            if cache_key in self._pools or cache_key in self._tag_pools:
+                self._alias_tables[cache_key] = table
+        return pool[table.draw()], len(pool)
+
+    def sample(
+        self,
+        limit: int,
+        category: Optional[str] = None,
+        time_of_day: Optional[str] = None,
+        season: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+        tag_mode: str = "any"
+    ) -> List[dict]:
+        """조건에 맞는 메시지를 중복 없이 최대 limit개 무작위 추출 (O(limit))"""
+        pool = self.pool(category, time_of_day, season, tags, tag_mode)
+        return random.sample(pool, min(limit, len(pool)))
+
+    def categories(self) -> List[dict]:
+        """사용 중인 카테고리 목록 (메시지 수 + MessageCategory 메타데이터)
+
+        스냅샷마다 한 번만 계산하고, 정렬은 sort_order 후 이름순이다.
+        """
+        if self._categories is not None:
+            return self._categories
+
+        counts: Dict[str, int] = {}
+        for (category, _, _), bucket in self._buckets.items():
+            counts[category] = counts.get(category, 0) + len(bucket)
+
+        categories = []
+        for name, count in counts.items():
+            meta = self._category_meta.get(name, {})
+            categories.append({
+                "name": name,
+                "count": count,
+                "displayName": name,
+                "description": meta.get("description"),
+                "color": meta.get("color"),
+                "icon": meta.get("icon"),
+                "sortOrder": meta.get("sortOrder")
+            })
+
+        # 메타데이터가 없는 카테고리는 뒤로 보낸다
+        categories.sort(key=lambda c: (c["sortOrder"] is None, c["sortOrder"] or 0, c["name"]))
+        self._categories = categories
+        return categories
+
+
+message_catalog = MessageCatalog()
+
+
+# ==================== 변경 감지 ====================
+
+def _mark_message_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("message_catalog_changed", set()).add(target.id)
+    else:
+        message_catalog.mark_changed([target.id])
+
+
+def _mark_category_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info["message_catalog_dirty"] = True
+    else:
+        message_catalog.invalidate()
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(DailyMessage, _event_name, _mark_message_changed)
+    event.listen(MessageCategory, _event_name, _mark_category_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    """커밋된 변경만 카탈로그에 반영"""
+    changed_ids = session.info.pop("message_catalog_changed", None)
+    if changed_ids:
+        message_catalog.mark_changed(changed_ids)
+    if session.info.pop("message_catalog_dirty", False):
+        message_catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("message_catalog_changed", None)
+    session.info.pop("message_catalog_dirty", None)
@@ -0,0 +1,127 @@
+"""
+메시지 변경 동기화 (델타 동기화)
+클라이언트가 가진 버전 토큰 이후에 추가/수정/비활성화/삭제된 메시지만 돌려준다.
+
+버전 토큰은 두 개의 키셋 위치로 이루어진다.
+- 메시지: 마지막으로 받은 (change_seq, id)
+- 툼스톤: 마지막으로 받은 (change_seq, id)
+
+change_seq 는 쓰기 시점의 트랜잭션 ID 이고, 진행 중인 트랜잭션 중 가장 오래된 ID
+(change_seq_horizon) 보다 작은 변경만 내려준다. 진행 중인 트랜잭션의 변경은 항상 그 이상이므로
+오래 걸리는 일괄 가져오기가 늦게 커밋되어도 이미 내려준 위치 뒤로 끼어들지 않는다.
+대신 오래 열려 있는 트랜잭션이 있으면 그 트랜잭션이 끝날 때까지 이후 변경도 내려가지 않는다.
+
+SQLite 는 쓰기가 직렬화되므로 두 테이블의 최대 순번 + 1 을 순번으로 쓰고 기준선은 두지 않는다.
+"""
+
+import base64
+import json
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from models_messages import DailyMessage, MessageTombstone, change_seq_now, change_seq_horizon
+
+# 토큰 형식 버전 (이전 형식 토큰은 거절되어 클라이언트가 전체 동기화를 다시 한다)
+VERSION_FORMAT = 2
+
+Position = Optional[Tuple[int, int]]
+
+
+def encode_version(message_position: Position, tombstone_position: Position) -> str:
+    """버전 토큰 생성"""
+    payload = json.dumps({
+        "v": VERSION_FORMAT,
+        "m": list(message_position) if message_position else None,
+        "t": list(tombstone_position) if tombstone_position else None
+    }, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_version(token: str) -> Tuple[Position, Position]:
+    """버전 토큰 해석 (올바르지 않으면 ValueError)"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["v"] != VERSION_FORMAT:
+            raise ValueError(f"Unsupported version format: {payload['v']}")
+        positions = []
+        for key in ("m", "t"):
+            value = payload[key]
+            positions.append((int(value[0]), int(value[1])) if value else None)
+        return positions[0], positions[1]
+    except Exception as e:
+        raise ValueError(f"Invalid version token: {token}") from e
+
+
+def backfill_updated_at(db: Session) -> int:
+    """updated_at/change_seq 가 비어 있는 기존 메시지와 툼스톤을 채운다 (커밋은 호출자가 담당)"""
+    filled = db.execute(
+        update(DailyMessage)
+        .where(DailyMessage.updated_at == None)
+        .values(updated_at=func.coalesce(DailyMessage.created_at, func.now()))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    for model in (DailyMessage, MessageTombstone):
+        filled += db.execute(
+            update(model)
+            .where(model.change_seq == None)
+            .values(change_seq=change_seq_now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return filled
+
+
+def get_changes(db: Session, since: Optional[str], limit: int) -> dict:
+    """since 토큰 이후의 변경 (since 가 없으면 활성 메시지 전체를 처음부터)
+
+    한 번에 최대 limit 건씩 돌려주며, hasMore 가 참이면 돌려준 version 으로 다시 요청한다.
+    """
+    message_position, tombstone_position = decode_version(since) if since else (None, None)
+    horizon = db.scalar(select(change_seq_horizon()))
+
+    message_order = (DailyMessage.change_seq, DailyMessage.id)
+    query = select(DailyMessage).where(DailyMessage.change_seq < horizon)
+    if since is None:
+        # 처음 동기화할 때는 비활성 메시지를 내려줄 필요가 없다
+        query = query.where(DailyMessage.is_active == True)
+    if message_position:
+        query = query.where(tuple_(*message_order) > tuple_(*message_position))
+    messages = db.scalars(query.order_by(*message_order).limit(limit + 1)).all()
+
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if messages:
+        message_position = (messages[-1].change_seq, messages[-1].id)
+
+    removed_ids = [message.id for message in messages if not message.is_active]
+
+    tombstone_order = (MessageTombstone.change_seq, MessageTombstone.id)
+    if since is None:
+        # 처음 동기화하면 지난 삭제 기록은 필요 없으므로 최신 위치만 가져간다
+        latest = db.execute(
+            select(*tombstone_order).where(MessageTombstone.change_seq < horizon)
+            .order_by(MessageTombstone.change_seq.desc(), MessageTombstone.id.desc()).limit(1)
+        ).first()
+        if latest:
+            tombstone_position = (latest[0], latest[1])
+    else:
+        query = select(MessageTombstone).where(MessageTombstone.change_seq < horizon)
+        if tombstone_position:
+            query = query.where(tuple_(*tombstone_order) > tuple_(*tombstone_position))
+        tombstones = db.scalars(query.order_by(*tombstone_order).limit(limit + 1)).all()
+
+        has_more = has_more or len(tombstones) > limit
+        tombstones = tombstones[:limit]
+        if tombstones:
+            tombstone_position = (tombstones[-1].change_seq, tombstones[-1].id)
+        removed_ids.extend(tombstone.message_id for tombstone in tombstones)
+
+    return {
+        "version": encode_version(message_position, tombstone_position),
+        "changes": [message.to_dict() for message in messages if message.is_active],
+        "removed": sorted(set(removed_ids)),
+        "hasMore": has_more,
+        "full": since is None
+    }
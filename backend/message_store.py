@@ -0,0 +1,142 @@
+"""
+메시지 내용 저장소 (content-addressed)
+히스토리/즐겨찾기 행마다 메시지 JSON 전체를 복사하지 않고, 정규화한 JSON 의 SHA-256 으로
+message_contents 에 한 번만 저장한 뒤 각 행은 content_hash 만 가진다.
+
+응답을 만들 때는 필요한 해시를 모아 한 번의 IN 조회로 내용을 채우며,
+같은 해시의 내용은 바뀌지 않으므로 프로세스 LRU 캐시에 만료 없이 보관한다.
+
+아무 행도 참조하지 않는 내용은 history_retention.py 가 정리한다. 저장할 때마다 (최대 CONTENT_TOUCH_HOURS 에
+한 번) stored_at 을 갱신하고, 정리 작업은 CONTENT_SWEEP_GRACE_HOURS 보다 오래된 내용만 지우므로
+저장 직후 참조 행이 커밋되기 전에 내용이 지워지지 않는다.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+
+from database_async import DbSession
+from database_config import dialect_insert
+from models import MessageContent
+
+# 메모리에 보관할 메시지 내용 수
+MESSAGE_CONTENT_CACHE_SIZE = int(os.getenv("MESSAGE_CONTENT_CACHE_SIZE", "4096"))
+# IN 조회 한 번에 넣을 최대 해시 수
+CONTENT_LOOKUP_BATCH = 500
+# 이미 있는 내용을 다시 저장할 때 stored_at 을 갱신하는 최소 간격 (시간)
+CONTENT_TOUCH_HOURS = 1
+# 참조되지 않는 내용을 지우기 전 유예 시간 (CONTENT_TOUCH_HOURS 보다 충분히 길어야 한다)
+CONTENT_SWEEP_GRACE_HOURS = int(os.getenv("CONTENT_SWEEP_GRACE_HOURS", "24"))
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_json(payload: Dict[str, Any]) -> str:
+    """키 순서와 공백을 고정한 JSON (같은 내용이면 같은 문자열)"""
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def content_hash(payload: Dict[str, Any]) -> str:
+    """메시지 내용 해시 (SHA-256 hex)"""
+    return hashlib.sha256(canonical_json(payload).encode("utf-8")).hexdigest()
+
+
+class ContentCache:
+    """content_hash -> 메시지 내용 LRU 캐시 (내용이 바뀌지 않으므로 만료 없음)"""
+
+    __slots__ = ("max_size", "_entries")
+
+    def __init__(self, max_size: int = MESSAGE_CONTENT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        payload = self._entries.get(key)
+        if payload is not None:
+            self._entries.move_to_end(key)
+        return payload
+
+    def put(self, key: str, payload: dict):
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+content_cache = ContentCache()
+
+
+async def store_message_content(db: DbSession, payload: Dict[str, Any]) -> str:
+    """메시지 내용을 저장하고 해시 반환 (커밋은 호출자가 담당)
+
+    이미 있으면 내용은 그대로 두고, 정리 작업이 지우지 않도록 오래된 stored_at 만 갱신한다.
+    """
+    key = content_hash(payload)
+    touch_before = datetime.now(timezone.utc) - timedelta(hours=CONTENT_TOUCH_HOURS)
+    await db.execute(
+        dialect_insert(db.dialect_name, MessageContent).values(
+            content_hash=key, payload=payload
+        ).on_conflict_do_update(
+            index_elements=["content_hash"],
+            set_={"stored_at": func.now()},
+            where=MessageContent.stored_at < touch_before
+        )
+    )
+    return key
+
+
+async def load_contents(db: DbSession, hashes: Iterable[str]) -> Dict[str, dict]:
+    """해시 -> 메시지 내용 (캐시에 없는 해시만 배치로 조회)"""
+    found: Dict[str, dict] = {}
+    missing = []
+    for key in set(hashes):
+        payload = content_cache.get(key)
+        if payload is None:
+            missing.append(key)
+        else:
+            found[key] = payload
+
+    for start in range(0, len(missing), CONTENT_LOOKUP_BATCH):
+        rows = await db.execute(
+            select(MessageContent.content_hash, MessageContent.payload).where(
+                MessageContent.content_hash.in_(missing[start:start + CONTENT_LOOKUP_BATCH])
+            )
+        )
+        for key, payload in rows:
+            content_cache.put(key, payload)
+            found[key] = payload
+    return found
+
+
+async def message_payloads(db: DbSession, rows) -> List[dict]:
+    """히스토리/즐겨찾기 행 목록의 메시지 내용 (행 순서 유지)
+
+    아직 migrate_message_contents.py 로 옮기지 않은 행은 message_data 를 그대로 쓴다.
+    """
+    contents = await load_contents(
+        db, (row.content_hash for row in rows if row.message_data is None and row.content_hash)
+    )
+    payloads = []
+    for row in rows:
+        if row.message_data is not None:
+            payloads.append(row.message_data)
+            continue
+        payload = contents.get(row.content_hash)
+        if payload is None:
+            # 참조하는 내용이 없으면 데이터 손실이므로 숨기지 않고 기록한다
+            logger.error(f"Missing message content {row.content_hash} for {type(row).__name__} {row.id} (message {row.message_id})")
+            payload = {"id": row.message_id}
+        payloads.append(payload)
+    return payloads
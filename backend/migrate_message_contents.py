@@ -0,0 +1,166 @@
+"""
+사용자 히스토리/즐겨찾기의 message_data 를 message_contents 로 옮기는 마이그레이션
+각 행의 메시지 JSON 을 해시해 message_contents 에 한 번만 저장하고, 행에는 content_hash 만 남긴다.
+
+배치마다 커밋하므로 중간에 멈춰도 다시 실행하면 이어서 처리된다.
+새 코드를 배포하기 전에 한 번 실행해 content_hash 컬럼을 추가하고 message_data 의 NOT NULL 을 푼다.
+
+사용법:
+    python migrate_message_contents.py                    # 스키마 변경 + 백필
+    python migrate_message_contents.py --dry-run          # 옮길 행 수만 확인
+    python migrate_message_contents.py --batch-size 2000
+"""
+
+import sys
+import time
+from typing import List
+
+from sqlalchemy import bindparam, func, inspect, null, select, text, update
+from sqlalchemy.orm import Session
+
+from database_config import dialect_insert
+from message_store import content_hash
+from models import MessageContent, UserFavorite, MessageHistory
+
+try:
+    from database import SessionLocal, engine
+except ImportError:
+    from database_lite import SessionLocal, engine
+
+BATCH_SIZE = 1000
+TABLES = (UserFavorite, MessageHistory)
+
+
+def _needs_schema_change(model) -> bool:
+    columns = {column["name"]: column for column in inspect(engine).get_columns(model.__tablename__)}
+    return "content_hash" not in columns or not columns["message_data"]["nullable"]
+
+
+def _rebuild_sqlite_table(connection, model):
+    """SQLite 는 NOT NULL 을 바꿀 수 없으므로 새 스키마로 테이블을 다시 만들어 복사"""
+    table = model.__table__
+    old_name = f"{table.name}_old"
+    old_columns = [column["name"] for column in inspect(connection).get_columns(table.name)]
+    for index in inspect(connection).get_indexes(table.name):
+        connection.execute(text(f'DROP INDEX "{index["name"]}"'))
+    connection.execute(text(f'ALTER TABLE "{table.name}" RENAME TO "{old_name}"'))
+    table.create(bind=connection)
+    columns = ", ".join(f'"{name}"' for name in old_columns if name in table.c)
+    connection.execute(text(f'INSERT INTO "{table.name}" ({columns}) SELECT {columns} FROM "{old_name}"'))
+    connection.execute(text(f'DROP TABLE "{old_name}"'))
+
+
+def prepare_schema() -> List[str]:
+    """message_contents 생성, content_hash 추가, message_data NOT NULL 해제 (변경한 테이블 목록)"""
+    MessageContent.__table__.create(bind=engine, checkfirst=True)
+    content_columns = {column["name"] for column in inspect(engine).get_columns(MessageContent.__tablename__)}
+    if "stored_at" not in content_columns:
+        column_type = MessageContent.__table__.c.stored_at.type.compile(dialect=engine.dialect)
+        with engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE {MessageContent.__tablename__} ADD COLUMN stored_at {column_type}"))
+            connection.execute(text(f"UPDATE {MessageContent.__tablename__} SET stored_at = created_at"))
+    changed = [model for model in TABLES if _needs_schema_change(model)]
+
+    with engine.begin() as connection:
+        for model in changed:
+            if engine.dialect.name == "sqlite":
+                _rebuild_sqlite_table(connection, model)
+                continue
+            name = model.__tablename__
+            connection.execute(text(
+                f"ALTER TABLE {name} ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64) "
+                f"REFERENCES message_contents(content_hash)"
+            ))
+            connection.execute(text(f"ALTER TABLE {name} ALTER COLUMN message_data DROP NOT NULL"))
+
+    # 정리 작업이 참조 여부를 확인할 때 쓰는 인덱스
+    for model in TABLES:
+        for index in model.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+    return [model.__tablename__ for model in changed]
+
+
+def _pending(model):
+    return (model.content_hash.is_(None), model.message_data.isnot(None))
+
+
+def backfill_table(db: Session, model, batch_size: int = BATCH_SIZE) -> int:
+    """message_data 가 남은 행을 해시로 바꾸고 처리한 행 수 반환"""
+    table = model.__table__
+    processed = 0
+
+    while True:
+        rows = db.execute(
+            select(model.id, model.message_data).where(*_pending(model)).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        hashes = {row.id: content_hash(row.message_data) for row in rows}
+        contents = {hashes[row.id]: row.message_data for row in rows}
+        db.execute(
+            dialect_insert(db.get_bind().dialect.name, MessageContent).values([
+                {"content_hash": key, "payload": payload} for key, payload in contents.items()
+            ]).on_conflict_do_nothing(index_elements=["content_hash"])
+        )
+        db.execute(
+            update(table).where(table.c.id == bindparam("row_id")).values(
+                content_hash=bindparam("row_hash"), message_data=null()
+            ),
+            [{"row_id": row_id, "row_hash": key} for row_id, key in hashes.items()]
+        )
+        db.commit()
+
+        processed += len(rows)
+        print(f"  {model.__tablename__}: {processed:,} rows")
+    return processed
+
+
+def main():
+    """메시지 내용 마이그레이션 실행"""
+    args = sys.argv[1:]
+    if "--help" in args:
+        print(__doc__)
+        sys.exit(0)
+
+    dry_run = "--dry-run" in args
+    batch_size = int(args[args.index("--batch-size") + 1]) if "--batch-size" in args else BATCH_SIZE
+    started = time.time()
+
+    if dry_run:
+        db = SessionLocal()
+        try:
+            for model in TABLES:
+                if _needs_schema_change(model):
+                    pending = db.query(func.count()).select_from(model).scalar()
+                else:
+                    pending = db.query(func.count()).select_from(model).filter(*_pending(model)).scalar()
+                print(f"{model.__tablename__} rows to migrate: {pending:,}")
+        finally:
+            db.close()
+        return
+
+    try:
+        changed = prepare_schema()
+        print(f"Schema updated: {', '.join(changed) or 'none'}")
+    except Exception as e:
+        print(f"Schema update failed: {e}")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        for model in TABLES:
+            processed = backfill_table(db, model, batch_size)
+            print(f"Migrated {model.__tablename__} rows: {processed:,}")
+        print(f"Message contents in DB: {db.query(func.count()).select_from(MessageContent).scalar():,}")
+        print(f"Completed in {time.time() - started:.1f}s")
+    except Exception as e:
+        print(f"Message content migration failed: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,127 @@
 """
 messages.json 데이터를 PostgreSQL로 마이그레이션
+
+사용법:
+    python migrate_messages.py                      # ../messages.json 을 한 건씩 마이그레이션
+    python migrate_messages.py --bulk [파일 경로]    # 대용량 일괄 가져오기 (COPY / 다중 행 INSERT)
+    python migrate_messages.py --bulk dump.ndjson   # NDJSON (.ndjson, .jsonl) 입력
+    python migrate_messages.py --bulk dump.json --restart   # 체크포인트를 무시하고 처음부터
+
+일괄 가져오기는 입력을 스트리밍으로 읽고 배치마다 커밋하며, 커밋된 입력 항목 수를
+<입력 파일>.checkpoint 에 기록해 중단된 가져오기를 이어서 진행한다.
 """
 
 import json
 import sys
 import os
+import io
+import time
+import itertools
 from pathlib import Path
 from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+from sqlalchemy import func, select, text, update
 from sqlalchemy.orm import Session
-from database_config import SessionLocal, create_tables, ENVIRONMENT
-from models_messages import DailyMessage, MessageCategory
+from database_config import SessionLocal, create_tables, ENVIRONMENT, get_schema, dialect_insert
+from models_messages import DailyMessage, MessageCategory, message_content_hash, split_tags, sync_message_tags
+
+# 일괄 가져오기 한 번에 적재할 메시지 수
+BULK_BATCH_SIZE = 10000
+# content_hash 백필 배치 크기
+HASH_BACKFILL_BATCH_SIZE = 1000
+
+IMPORT_COLUMNS = (
+    "text", "author", "category", "time_of_day", "season",
+    "is_active", "priority", "tags", "created_by", "content_hash"
+)
+IMPORT_STAGING_TABLE = "daily_messages_import"
+# 스트리밍 파싱 시 한 번에 읽을 문자 수
+STREAM_CHUNK_SIZE = 1 << 20
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+# 버퍼 끝에서 이만큼 안쪽에서 난 파싱 오류는 값이 잘린 것으로 보고 더 읽는다 (잘린 리터럴, 숫자, 이스케이프)
+TRUNCATED_TAIL = 32
+
+# 카테고리별 색상 매핑
+CATEGORY_COLORS = {
+    "자기계발": "#4CAF50",
+    "성공": "#FF9800", 
+    "동기부여": "#2196F3",
+    "목표": "#9C27B0",
+    "현재에 집중": "#00BCD4",
+    "믿음": "#3F51B5",
+    "변화": "#FF5722",
+    "가능성": "#795548",
+    "행복": "#FFEB3B",
+    "인내": "#607D8B",
+    "자신감": "#E91E63",
+    "긍정적 사고": "#8BC34A",
+    "혁신": "#FF6F00",
+    "꿈": "#673AB7",
+    "진보": "#009688",
+    "가치": "#FFC107",
+    "도전": "#F44336",
+    "학습": "#03DAC6",
+    "시간 관리": "#6200EE",
+    "완벽주의": "#018786",
+    "성취": "#B00020",
+    "기회": "#3700B3", 
+    "실패": "#CF6679",
+    "열정": "#BB86FC",
+    "미래": "#03DAC5",
+    "행동": "#FF0266",
+    "삶의 지혜": "#6200EA",
+    "용기": "#00C853",
+    "위험감수": "#FF5252",
+    "끈기": "#448AFF",
+    "습관": "#69F0AE",
+    "감사": "#FFD740",
+    "잠재력": "#FF4081",
+    "응원": "#40C4FF",
+    "노력": "#B39DDB",
+    "성장": "#A5D6A7",
+    "새로운 시작": "#FFCC02"
+}
+
+CATEGORY_ICONS = {
+    "자기계발": "🚀",
+    "성공": "🏆", 
+    "동기부여": "💪",
+    "목표": "🎯",
+    "현재에 집중": "⭐",
+    "믿음": "🙏",
+    "변화": "🔄",
+    "가능성": "✨",
+    "행복": "😊",
+    "인내": "⏳",
+    "자신감": "💎",
+    "긍정적 사고": "☀️",
+    "혁신": "💡",
+    "꿈": "🌟",
+    "진보": "📈",
+    "가치": "💰",
+    "도전": "⛰️",
+    "학습": "📚",
+    "시간 관리": "⏰",
+    "완벽주의": "🎨",
+    "성취": "🏅",
+    "기회": "🚪",
+    "실패": "📝",
+    "열정": "🔥",
+    "미래": "🔮",
+    "행동": "🏃",
+    "삶의 지혜": "🧠",
+    "용기": "🦁",
+    "위험감수": "🎲",
+    "끈기": "🏋️",
+    "습관": "📅",
+    "감사": "🙏",
+    "잠재력": "🌱",
+    "응원": "👏",
+    "노력": "💪",
+    "성장": "🌳",
+    "새로운 시작": "🌅"
+}
+
 
 def load_json_messages(json_file_path: str) -> list:
     """JSON 파일에서 메시지 데이터 로드"""
@@ -24,6 +136,133 @@ def load_json_messages(json_file_path: str) -> list:
         print(f"Error: JSON 파싱 실패 - {e}")
         return []
 
+def iter_json_messages(json_file_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator:
+    """JSON 배열 항목을 하나씩 읽는다 ({"messages": [...]} 또는 최상위 배열)
+
+    파일 전체를 읽지 않고 버퍼에 남은 미완성 항목만 유지하므로 메모리 사용량이 파일 크기와 무관하다.
+    """
+    decoder = json.JSONDecoder()
+    
+    with open(json_file_path, 'r', encoding='utf-8') as file:
+        buffer = ""
+        position = 0
+        consumed = 0
+        eof = False
+        
+        def read_more() -> bool:
+            """다음 청크를 붙이면서 이미 처리한 앞부분은 버린다"""
+            nonlocal buffer, position, eof
+            chunk = file.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[position:] + chunk
+            position = 0
+            return True
+        
+        # 메시지 배열 시작 위치 찾기
+        while True:
+            stripped = buffer.lstrip()
+            if stripped.startswith('['):
+                position = len(buffer) - len(stripped) + 1
+                break
+            key = buffer.find('"messages"')
+            if key != -1:
+                bracket = buffer.find('[', key)
+                if bracket != -1:
+                    position = bracket + 1
+                    break
+            if not read_more():
+                raise ValueError("메시지 배열을 찾을 수 없습니다")
+        
+        while True:
+            # 공백과 구분자 건너뛰기
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                    position += 1
+                if position < len(buffer) or not read_more():
+                    break
+            
+            if position >= len(buffer):
+                raise ValueError("JSON 배열이 닫히지 않았습니다")
+            if buffer[position] == ']':
+                return
+            
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                # 버퍼 끝에서 잘린 값만 더 읽어서 다시 해석하고, 그 외에는 입력 자체의 오류
+                if not _is_truncated(e, buffer) or not read_more():
+                    raise ValueError(f"잘못된 JSON 항목 ({consumed + 1}번째): {e.msg}") from e
+                continue
+            
+            # 버퍼 끝에서 끝난 값은 잘린 값일 수 있으므로 (숫자 등) 뒤 내용을 더 읽고 다시 해석
+            if end == len(buffer) and read_more():
+                continue
+            
+            yield item
+            consumed += 1
+            position = end
+
+def _is_truncated(error: json.JSONDecodeError, buffer: str) -> bool:
+    """버퍼가 값 중간에서 끝나서 생긴 파싱 오류인지 여부"""
+    if error.msg.startswith("Unterminated string"):
+        # 닫는 따옴표 없이 버퍼 끝까지 간 문자열
+        return True
+    return error.pos >= len(buffer) - TRUNCATED_TAIL
+
+def iter_ndjson_messages(json_file_path: str) -> Iterator:
+    """NDJSON (한 줄에 메시지 하나) 항목을 하나씩 읽는다
+
+    해석할 수 없는 줄은 None 으로 내보내 다른 잘못된 항목처럼 오류로 세고 건너뛰게 한다 (체크포인트 위치 유지).
+    """
+    with open(json_file_path, 'r', encoding='utf-8') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipped malformed line {line_number}: {e.msg}")
+                yield None
+
+def iter_messages(json_file_path: str) -> Iterator:
+    """확장자에 따라 JSON 배열 또는 NDJSON 스트리밍 읽기"""
+    if Path(json_file_path).suffix.lower() in NDJSON_SUFFIXES:
+        return iter_ndjson_messages(json_file_path)
+    return iter_json_messages(json_file_path)
+
+class ImportCheckpoint:
+    """일괄 가져오기 진행 위치 (커밋된 입력 항목 수) 기록 파일"""
+    
+    def __init__(self, source: Path):
+        self.path = source.with_name(source.name + ".checkpoint")
+        # 입력 파일이 바뀌면 체크포인트를 쓰지 않는다
+        self.signature = {"source": str(source.resolve()), "size": source.stat().st_size}
+    
+    def load(self) -> int:
+        """이어서 시작할 입력 항목 위치 (없으면 0)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        if data.get("signature") != self.signature:
+            return 0
+        return int(data.get("committed", 0))
+    
+    def save(self, committed: int):
+        """커밋된 입력 항목 수 기록 (임시 파일 후 교체로 원자적 갱신)"""
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({"signature": self.signature, "committed": committed}, file)
+        os.replace(temp_path, self.path)
+    
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
 def create_categories_from_messages(db: Session, messages: list):
     """메시지에서 카테고리 추출하여 생성"""
     categories = set()
@@ -31,115 +270,43 @@ def create_categories_from_messages(db: Session, messages: list):
         if message.get('category'):
             categories.add(message['category'])
     
-    # 카테고리별 색상 매핑
-    category_colors = {
-        "자기계발": "#4CAF50",
-        "성공": "#FF9800", 
-        "동기부여": "#2196F3",
-        "목표": "#9C27B0",
-        "현재에 집중": "#00BCD4",
-        "믿음": "#3F51B5",
-        "변화": "#FF5722",
-        "가능성": "#795548",
-        "행복": "#FFEB3B",
-        "인내": "#607D8B",
-        "자신감": "#E91E63",
-        "긍정적 사고": "#8BC34A",
-        "혁신": "#FF6F00",
-        "꿈": "#673AB7",
-        "진보": "#009688",
-        "가치": "#FFC107",
-        "도전": "#F44336",
-        "학습": "#03DAC6",
-        "시간 관리": "#6200EE",
-        "완벽주의": "#018786",
-        "성취": "#B00020",
-        "기회": "#3700B3", 
-        "실패": "#CF6679",
-        "열정": "#BB86FC",
-        "미래": "#03DAC5",
-        "행동": "#FF0266",
-        "삶의 지혜": "#6200EA",
-        "용기": "#00C853",
-        "위험감수": "#FF5252",
-        "끈기": "#448AFF",
-        "습관": "#69F0AE",
-        "감사": "#FFD740",
-        "잠재력": "#FF4081",
-        "응원": "#40C4FF",
-        "노력": "#B39DDB",
-        "성장": "#A5D6A7",
-        "새로운 시작": "#FFCC02"
-    }
-    
-    category_icons = {
-        "자기계발": "🚀",
-        "성공": "🏆", 
-        "동기부여": "💪",
-        "목표": "🎯",
-        "현재에 집중": "⭐",
-        "믿음": "🙏",
-        "변화": "🔄",
-        "가능성": "✨",
-        "행복": "😊",
-        "인내": "⏳",
-        "자신감": "💎",
-        "긍정적 사고": "☀️",
-        "혁신": "💡",
-        "꿈": "🌟",
-        "진보": "📈",
-        "가치": "💰",
-        "도전": "⛰️",
-        "학습": "📚",
-        "시간 관리": "⏰",
-        "완벽주의": "🎨",
-        "성취": "🏅",
-        "기회": "🚪",
-        "실패": "📝",
-        "열정": "🔥",
-        "미래": "🔮",
-        "행동": "🏃",
-        "삶의 지혜": "🧠",
-        "용기": "🦁",
-        "위험감수": "🎲",
-        "끈기": "🏋️",
-        "습관": "📅",
-        "감사": "🙏",
-        "잠재력": "🌱",
-        "응원": "👏",
-        "노력": "💪",
-        "성장": "🌳",
-        "새로운 시작": "🌅"
-    }
-    
-    for i, category_name in enumerate(sorted(categories)):
-        existing_category = db.query(MessageCategory).filter(
-            MessageCategory.name == category_name
-        ).first()
-        
-        if not existing_category:
-            category = MessageCategory(
-                name=category_name,
-                description=f"{category_name} 관련 메시지",
-                color=category_colors.get(category_name, "#666666"),
-                icon=category_icons.get(category_name, "💫"),
-                sort_order=i + 1
-            )
-            db.add(category)
+    upsert_categories(db, categories)
     
     db.commit()
     print(f"Created {len(categories)} categories")
 
+def upsert_categories(db: Session, names: Iterable[str]):
+    """없는 카테고리만 한 번의 INSERT ... ON CONFLICT DO NOTHING 으로 생성"""
+    names = sorted(set(names))
+    if not names:
+        return
+    
+    start = db.query(func.coalesce(func.max(MessageCategory.sort_order), 0)).scalar()
+    stmt = dialect_insert(db.get_bind().dialect.name, MessageCategory).values([
+        {
+            "name": name,
+            "description": f"{name} 관련 메시지",
+            "color": CATEGORY_COLORS.get(name, "#666666"),
+            "icon": CATEGORY_ICONS.get(name, "💫"),
+            "sort_order": start + i + 1,
+            "is_active": True
+        }
+        for i, name in enumerate(names)
+    ])
+    db.execute(stmt.on_conflict_do_nothing(index_elements=["name"]))
+
 def migrate_messages_to_db(db: Session, messages: list):
     """메시지를 데이터베이스로 마이그레이션"""
     migrated_count = 0
     skipped_count = 0
+    seen_hashes = set()
     
     for message_data in messages:
         try:
-            # 중복 체크 (텍스트 기준)
-            existing_message = db.query(DailyMessage).filter(
-                DailyMessage.text == message_data['text']
+            # 중복 체크 (본문 해시 기준, 파일 안의 중복 포함)
+            content_hash = message_content_hash(message_data['text'])
+            existing_message = content_hash in seen_hashes or db.query(DailyMessage.id).filter(
+                DailyMessage.content_hash == content_hash
             ).first()
             
             if existing_message:
@@ -160,6 +327,7 @@ def migrate_messages_to_db(db: Session, messages: list):
             )
             
             db.add(new_message)
+            seen_hashes.add(content_hash)
             migrated_count += 1
             
         except Exception as e:
@@ -170,12 +338,201 @@ def migrate_messages_to_db(db: Session, messages: list):
     db.commit()
     return migrated_count, skipped_count
 
+def backfill_content_hashes(db: Session) -> tuple:
+    """content_hash 가 비어 있는 기존 메시지의 해시 채우기 (중복 본문은 먼저 들어온 메시지만)
+
+    반환값: (채운 수, 중복으로 비워 둔 수)
+    """
+    filled = 0
+    duplicates = 0
+    last_id = 0
+    
+    while True:
+        rows = db.query(DailyMessage.id, DailyMessage.text).filter(
+            DailyMessage.content_hash == None,
+            DailyMessage.id > last_id
+        ).order_by(DailyMessage.id).limit(HASH_BACKFILL_BATCH_SIZE).all()
+        if not rows:
+            break
+        
+        hashes = [(message_id, message_content_hash(message_text)) for message_id, message_text in rows]
+        taken = set(db.scalars(
+            select(DailyMessage.content_hash).where(
+                DailyMessage.content_hash.in_({content_hash for _, content_hash in hashes})
+            )
+        ))
+        
+        updates = []
+        for message_id, content_hash in hashes:
+            if content_hash in taken:
+                duplicates += 1
+                continue
+            taken.add(content_hash)
+            updates.append({"id": message_id, "content_hash": content_hash})
+        
+        if updates:
+            db.execute(update(DailyMessage), updates)
+        filled += len(updates)
+        last_id = rows[-1].id
+    
+    return filled, duplicates
+
+def to_message_row(message_data: dict) -> dict:
+    """JSON 메시지를 daily_messages 행으로 변환"""
+    tags = message_data.get('tags')
+    if isinstance(tags, list):
+        tags = ",".join(tags)
+    
+    return {
+        "text": message_data['text'],
+        "author": message_data.get('author', '익명'),
+        "category": message_data.get('category', '기타'),
+        "time_of_day": message_data.get('timeOfDay', ''),
+        "season": message_data.get('season', 'all'),
+        "is_active": True,
+        "priority": 5,  # 기본 우선순위
+        "tags": tags or None,
+        "created_by": "migration_script",
+        "content_hash": message_content_hash(message_data['text'])
+    }
+
+def _oversized_columns(row: dict) -> List[str]:
+    """컬럼 길이를 넘는 값이 든 컬럼 (COPY 는 한 행만 넘어도 배치 전체가 실패하므로 미리 거른다)"""
+    columns = []
+    for column in IMPORT_COLUMNS:
+        length = getattr(DailyMessage.__table__.c[column].type, "length", None)
+        if length and isinstance(row[column], str) and len(row[column]) > length:
+            columns.append(column)
+    return columns
+
+def _copy_field(value) -> str:
+    """COPY CSV 필드 (NULL 만 따옴표 없는 \\N, 나머지는 따옴표로 감싸 본문의 \\N 이 NULL 이 되지 않게 한다)"""
+    if value is None:
+        return "\\N"
+    return '"' + str(value).replace('"', '""') + '"'
+
+def _copy_rows(db: Session, rows: List[dict]) -> list:
+    """PostgreSQL: COPY 로 임시 테이블에 적재한 뒤 중복을 제외하고 한 번에 INSERT"""
+    connection = db.connection()
+    columns = ", ".join(IMPORT_COLUMNS)
+    
+    connection.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {IMPORT_STAGING_TABLE} ("
+        "text text, author varchar(100), category varchar(50), time_of_day varchar(20), "
+        "season varchar(20), is_active boolean, priority integer, tags varchar(200), "
+        "created_by varchar(50), content_hash varchar(64)"
+        ") ON COMMIT DELETE ROWS"
+    ))
+    connection.execute(text(f"TRUNCATE {IMPORT_STAGING_TABLE}"))
+    
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_field(row[column]) for column in IMPORT_COLUMNS) + "\n")
+    buffer.seek(0)
+    
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {IMPORT_STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+    finally:
+        cursor.close()
+    
+    return connection.execute(text(
+        f"INSERT INTO {get_schema()}.{DailyMessage.__tablename__} ({columns}, updated_at, change_seq) "
+        f"SELECT {columns}, now(), pg_current_xact_id()::text::bigint FROM {IMPORT_STAGING_TABLE} "
+        "ON CONFLICT (content_hash) DO NOTHING RETURNING id, tags"
+    )).all()
+
+def _insert_rows(db: Session, rows: List[dict]) -> list:
+    """그 외 방언: 다중 행 INSERT ... ON CONFLICT DO NOTHING (SQLAlchemy insertmanyvalues 배치)"""
+    stmt = dialect_insert(db.get_bind().dialect.name, DailyMessage.__table__)
+    stmt = stmt.on_conflict_do_nothing(index_elements=["content_hash"]).returning(
+        DailyMessage.id, DailyMessage.tags
+    )
+    return db.execute(stmt, rows).all()
+
+def _write_batch(db: Session, rows: List[dict]) -> int:
+    """카테고리, 메시지, 태그 연결을 배치 단위로 적재하고 새로 들어간 메시지 수 반환"""
+    upsert_categories(db, (row["category"] for row in rows))
+    
+    if db.get_bind().dialect.name == "postgresql":
+        inserted = _copy_rows(db, rows)
+    else:
+        inserted = _insert_rows(db, rows)
+    
+    # 일괄 INSERT 는 ORM 이벤트를 거치지 않으므로 태그 연결을 직접 만든다
+    sync_message_tags(db.connection(), {
+        message_id: split_tags(tags) for message_id, tags in inserted if tags
+    })
+    return len(inserted)
+
+def bulk_import_messages(
+    db: Session,
+    messages: Iterable[dict],
+    batch_size: int = BULK_BATCH_SIZE,
+    checkpoint: Optional[ImportCheckpoint] = None,
+    start: int = 0
+) -> tuple:
+    """메시지를 배치 단위로 일괄 적재 (기존/파일 내 중복은 content_hash 로 제외)
+
+    checkpoint 를 주면 배치마다 커밋하고 지금까지 처리한 입력 항목 위치(start 부터 센 값)를 기록한다.
+    반환값: (적재 수, 중복 제외 수, 오류 수)
+    """
+    imported = 0
+    skipped = 0
+    errors = 0
+    consumed = start
+    batch = {}
+    
+    def flush():
+        nonlocal imported, skipped
+        rows = list(batch.values())
+        count = _write_batch(db, rows)
+        imported += count
+        skipped += len(rows) - count
+        batch.clear()
+        if checkpoint is not None:
+            db.commit()
+            checkpoint.save(consumed)
+        print(f"  imported {imported:,}, skipped {skipped:,} (input position {consumed:,})")
+    
+    for message_data in messages:
+        consumed += 1
+        if not isinstance(message_data, dict) or not message_data.get('text'):
+            errors += 1
+            continue
+        
+        row = to_message_row(message_data)
+        oversized = _oversized_columns(row)
+        if oversized:
+            print(f"Skipped message at input position {consumed:,}: too long ({', '.join(oversized)})")
+            errors += 1
+            continue
+        if row["content_hash"] in batch:
+            skipped += 1
+            continue
+        batch[row["content_hash"]] = row
+        
+        if len(batch) >= batch_size:
+            flush()
+    
+    if batch:
+        flush()
+    
+    return imported, skipped, errors
+
 def main():
     """메인 마이그레이션 함수"""
-    print(f"Starting migration in {ENVIRONMENT} environment...")
+    args = sys.argv[1:]
+    bulk = "--bulk" in args
+    paths = [arg for arg in args if not arg.startswith("--")]
+    
+    print(f"Starting {'bulk import' if bulk else 'migration'} in {ENVIRONMENT} environment...")
     
-    # messages.json 파일 경로
-    json_file_path = Path(__file__).parent.parent / "messages.json"
+    # 입력 파일 경로 (기본값: messages.json)
+    json_file_path = Path(paths[0]) if paths else Path(__file__).parent.parent / "messages.json"
     
     if not json_file_path.exists():
         print(f"Error: {json_file_path} 파일이 존재하지 않습니다.")
@@ -185,36 +542,65 @@ def main():
     print("Creating database tables...")
     create_tables()
     
-    # JSON 데이터 로드
-    print("Loading messages from JSON...")
-    messages = load_json_messages(str(json_file_path))
-    
-    if not messages:
-        print("No messages found in JSON file.")
-        sys.exit(1)
-    
-    print(f"Found {len(messages)} messages in JSON file")
+    if bulk:
+        # 대용량 입력은 스트리밍으로 읽고 체크포인트부터 이어서 진행
+        checkpoint = ImportCheckpoint(json_file_path)
+        if "--restart" in args:
+            checkpoint.clear()
+        resume_from = checkpoint.load()
+        if resume_from:
+            print(f"Resuming from input position {resume_from:,} ({checkpoint.path})")
+        messages = itertools.islice(iter_messages(str(json_file_path)), resume_from, None)
+    else:
+        # JSON 데이터 로드
+        print("Loading messages from JSON...")
+        messages = load_json_messages(str(json_file_path))
+        
+        if not messages:
+            print("No messages found in JSON file.")
+            sys.exit(1)
+        
+        print(f"Found {len(messages)} messages in JSON file")
     
     # 데이터베이스 세션 생성
     db = SessionLocal()
+    started = time.time()
     
     try:
-        # 카테고리 생성
-        print("Creating categories...")
-        create_categories_from_messages(db, messages)
+        # 중복 판별용 본문 해시 백필
+        print("Backfilling content hashes...")
+        filled, duplicates = backfill_content_hashes(db)
+        db.commit()
+        print(f"Filled {filled} content hashes ({duplicates} duplicate texts left without hash)")
         
-        # 메시지 마이그레이션
-        print("Migrating messages...")
-        migrated_count, skipped_count = migrate_messages_to_db(db, messages)
+        if bulk:
+            print("Importing messages in bulk...")
+            migrated_count, skipped_count, error_count = bulk_import_messages(
+                db, messages, checkpoint=checkpoint, start=resume_from
+            )
+            db.commit()
+            checkpoint.clear()
+            total_count = resume_from + migrated_count + skipped_count + error_count
+        else:
+            # 카테고리 생성
+            print("Creating categories...")
+            create_categories_from_messages(db, messages)
+            
+            # 메시지 마이그레이션
+            print("Migrating messages...")
+            migrated_count, skipped_count = migrate_messages_to_db(db, messages)
+            error_count = len(messages) - migrated_count - skipped_count
+            total_count = len(messages)
         
         print("\n" + "="*50)
         print("MIGRATION COMPLETED")
         print("="*50)
         print(f"Environment: {ENVIRONMENT}")
-        print(f"Total messages in JSON: {len(messages)}")
+        print(f"Total messages in JSON: {total_count}")
         print(f"Successfully migrated: {migrated_count}")
         print(f"Skipped (duplicates): {skipped_count}")
-        print(f"Errors: {len(messages) - migrated_count - skipped_count}")
+        print(f"Errors: {error_count}")
+        print(f"Elapsed: {time.time() - started:.1f}s")
         
         # 데이터베이스 확인
         total_in_db = db.query(DailyMessage).count()
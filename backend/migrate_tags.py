@@ -0,0 +1,78 @@
+"""
+DailyMessage.tags (쉼표 구분 문자열) 을 message_tags / daily_message_tags 로 백필
+이전에 만든 message_tags.name 이 tags 컬럼보다 짧으면 먼저 넓힌다.
+"""
+
+import sys
+import time
+from sqlalchemy import func, inspect, text
+from database_config import SessionLocal, create_tables, engine, table_schema, ENVIRONMENT
+from models_messages import DailyMessage, MessageTag, DailyMessageTag, split_tags, sync_message_tags
+
+BATCH_SIZE = 1000
+
+def widen_tag_names() -> bool:
+    """message_tags.name 을 모델 길이로 넓힌다 (바꿨으면 True, SQLite 는 길이를 검사하지 않으므로 건너뛴다)"""
+    if engine.dialect.name != "postgresql":
+        return False
+    table = MessageTag.__table__
+    length = table.c.name.type.length
+    columns = inspect(engine).get_columns(table.name, schema=table_schema(table))
+    current = next(column["type"] for column in columns if column["name"] == "name")
+    if getattr(current, "length", None) is None or current.length >= length:
+        return False
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table.schema}.{table.name} ALTER COLUMN name TYPE VARCHAR({length})"))
+    return True
+
+def backfill_message_tags(db) -> int:
+    """tags 컬럼이 있는 메시지의 태그 연결을 일괄 생성"""
+    connection = db.connection()
+    processed = 0
+    batch = {}
+    
+    rows = db.query(DailyMessage.id, DailyMessage.tags).filter(
+        DailyMessage.tags != None,
+        DailyMessage.tags != ""
+    ).order_by(DailyMessage.id).yield_per(BATCH_SIZE)
+    
+    for message_id, tags in rows:
+        batch[message_id] = split_tags(tags)
+        if len(batch) >= BATCH_SIZE:
+            sync_message_tags(connection, batch)
+            processed += len(batch)
+            batch = {}
+    
+    if batch:
+        sync_message_tags(connection, batch)
+        processed += len(batch)
+    
+    return processed
+
+def main():
+    """태그 마이그레이션 실행"""
+    print(f"Starting tag migration in {ENVIRONMENT} environment...")
+    create_tables()
+    if widen_tag_names():
+        print(f"Widened {MessageTag.__tablename__}.name to {MessageTag.__table__.c.name.type.length} characters")
+    
+    db = SessionLocal()
+    started = time.time()
+    
+    try:
+        processed = backfill_message_tags(db)
+        db.commit()
+        
+        print(f"Messages with tags: {processed}")
+        print(f"Tags in DB: {db.query(func.count(MessageTag.id)).scalar()}")
+        print(f"Message-tag links in DB: {db.query(func.count()).select_from(DailyMessageTag).scalar()}")
+        print(f"Completed in {time.time() - started:.1f}s")
+    except Exception as e:
+        print(f"Tag migration failed: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 데이터베이스 모델 정의
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Date, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 try:
@@ -31,9 +31,20 @@ class User(Base):
     # 관계 설정
     favorites = relationship("UserFavorite", back_populates="user", cascade="all, delete-orphan")
     history = relationship("MessageHistory", back_populates="user", cascade="all, delete-orphan")
+    history_daily = relationship("UserHistoryDaily", back_populates="user", cascade="all, delete-orphan")
     journal_entries = relationship("JournalEntry", back_populates="user", cascade="all, delete-orphan")
     goals = relationship("UserGoal", back_populates="user", cascade="all, delete-orphan")
     user_messages = relationship("UserMessage", back_populates="user", cascade="all, delete-orphan")
+    stats = relationship("UserStats", back_populates="user", uselist=False, cascade="all, delete-orphan")
+
+class MessageContent(Base):
+    """메시지 내용 저장소 (정규화한 JSON 의 SHA-256 -> 내용, 히스토리/즐겨찾기가 해시로 참조)"""
+    __tablename__ = "message_contents"
+
+    content_hash = Column(String(64), primary_key=True)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    stored_at = Column(DateTime(timezone=True), server_default=func.now())  # 마지막으로 저장(참조)된 시각, 정리 작업 유예 기준
 
 class UserFavorite(Base):
     """사용자 즐겨찾기 모델"""
@@ -42,7 +53,8 @@ class UserFavorite(Base):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     message_id = Column(String, nullable=False)  # 메시지 JSON의 ID
-    message_data = Column(JSON, nullable=False)  # 메시지 전체 데이터
+    content_hash = Column(String(64), ForeignKey("message_contents.content_hash"), nullable=True)  # 메시지 내용 해시
+    message_data = Column(JSON, nullable=True)  # 해시 도입 전 행의 메시지 전체 데이터
     added_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # 관계 설정
@@ -55,12 +67,52 @@ class MessageHistory(Base):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     message_id = Column(String, nullable=False)
-    message_data = Column(JSON, nullable=False)
+    content_hash = Column(String(64), ForeignKey("message_contents.content_hash"), nullable=True)
+    message_data = Column(JSON, nullable=True)  # 해시 도입 전 행만 사용
     viewed_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # 관계 설정
     user = relationship("User", back_populates="history")
 
+# 보존 기간 정리 작업이 오래된 히스토리를 찾을 때 사용
+Index("idx_message_history_viewed_at", MessageHistory.viewed_at)
+# 정리 작업이 참조되지 않는 메시지 내용을 찾을 때 사용
+Index("idx_message_history_content_hash", MessageHistory.content_hash)
+Index("idx_user_favorites_content_hash", UserFavorite.content_hash)
+
+class UserHistoryDaily(Base):
+    """보존 기간이 지나 삭제된 조회 히스토리의 사용자별 일간 집계"""
+    __tablename__ = "user_history_daily"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    view_count = Column(Integer, nullable=False, default=0)
+    
+    # 관계 설정
+    user = relationship("User", back_populates="history_daily")
+
+class UserStats(Base):
+    """사용자별 통계 카운터 (각 쓰기와 같은 트랜잭션에서 증분 갱신)"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    total_favorites = Column(Integer, nullable=False, default=0, server_default="0")
+    total_history = Column(Integer, nullable=False, default=0, server_default="0")
+    total_journal_entries = Column(Integer, nullable=False, default=0, server_default="0")
+    total_goals = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_goals = Column(Integer, nullable=False, default=0, server_default="0")
+    total_user_messages = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    # 방문일 (연속 방문 계산용)
+    total_days = Column(Integer, nullable=False, default=0, server_default="0")
+    current_streak = Column(Integer, nullable=False, default=0, server_default="0")
+    longest_streak = Column(Integer, nullable=False, default=0, server_default="0")
+    last_visit_day = Column(Date, nullable=True)
+    recent_days = Column(BigInteger, nullable=False, default=0, server_default="0")  # 비트 i = last_visit_day 의 i일 전 방문
+    
+    # 관계 설정
+    user = relationship("User", back_populates="stats")
+
 class JournalEntry(Base):
     """일기 엔트리 모델"""
     __tablename__ = "journal_entries"
@@ -2,11 +2,69 @@
 메시지 관련 데이터베이스 모델
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Date, Text, Boolean, Index, ForeignKey, LargeBinary
+from sqlalchemy import Identity, PrimaryKeyConstraint, UniqueConstraint
+from sqlalchemy import event, inspect, select, delete
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base 
 from sqlalchemy.sql import func
-from database_config import Base, get_schema
+from sqlalchemy.sql.functions import FunctionElement
+from database_config import Base, get_schema, dialect_insert
 from datetime import datetime
+from typing import List, Optional
+import hashlib
+
+def split_tags(value: Optional[str]) -> List[str]:
+    """쉼표로 구분된 태그 문자열을 태그 목록으로 변환 (공백 제거, 중복 제거)"""
+    if not value:
+        return []
+    tags = []
+    for tag in value.split(","):
+        tag = tag.strip()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+def message_content_hash(text: str) -> str:
+    """중복 판별용 메시지 본문 해시 (앞뒤/연속 공백 무시)"""
+    return hashlib.sha256(" ".join((text or "").split()).encode("utf-8")).hexdigest()
+
+class change_seq_now(FunctionElement):
+    """현재 트랜잭션의 변경 순번 (델타 동기화 키)
+
+    PostgreSQL 은 트랜잭션 ID 를 쓴다. 아직 커밋되지 않은 트랜잭션의 ID 는 항상
+    change_seq_horizon() 이상이므로, 그보다 작은 순번만 내려주면 늦게 커밋된 변경을 건너뛰지 않는다.
+    """
+    type = BigInteger()
+    inherit_cache = True
+
+class change_seq_horizon(FunctionElement):
+    """이 순번보다 작은 변경은 모두 커밋이 끝났다 (진행 중인 가장 오래된 트랜잭션 ID)"""
+    type = BigInteger()
+    inherit_cache = True
+
+@compiles(change_seq_now, "postgresql")
+def _change_seq_now_postgresql(element, compiler, **kw):
+    return "pg_current_xact_id()::text::bigint"
+
+@compiles(change_seq_now)
+def _change_seq_now_default(element, compiler, **kw):
+    # SQLite 는 쓰기 잠금을 커밋까지 잡으므로 쓰기 순서가 곧 커밋 순서다.
+    # 시각은 1ms 정밀도라 다른 트랜잭션과 순번이 겹칠 수 있으므로 두 테이블의 최대 순번 + 1 을 쓴다
+    # (스키마 이름을 붙이면 다중 행 INSERT 배치에서 스키마 변환 후 VALUES 절을 찾지 못한다)
+    return (
+        "(SELECT coalesce(max(seq), 0) + 1 FROM ("
+        f"SELECT max(change_seq) AS seq FROM {DailyMessage.__tablename__} "
+        f"UNION ALL SELECT max(change_seq) FROM {MessageTombstone.__tablename__}))"
+    )
+
+@compiles(change_seq_horizon, "postgresql")
+def _change_seq_horizon_postgresql(element, compiler, **kw):
+    return "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+@compiles(change_seq_horizon)
+def _change_seq_horizon_default(element, compiler, **kw):
+    return "9223372036854775807"
 
 class DailyMessage(Base):
     """일일 메시지 모델"""
@@ -24,10 +82,12 @@ class DailyMessage(Base):
     is_active = Column(Boolean, default=True, comment="활성화 상태")
     priority = Column(Integer, default=1, comment="우선순위 (1-10)")
     tags = Column(String(200), nullable=True, comment="태그 (쉼표로 구분)")
+    content_hash = Column(String(64), nullable=True, comment="본문 해시 (중복 방지)")
     
     # 타임스탬프
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="생성일시")
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), comment="수정일시")
+    updated_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), onupdate=func.now(), comment="수정일시")
+    change_seq = Column(BigInteger, nullable=True, default=change_seq_now(), onupdate=change_seq_now(), comment="변경 순번 (변경 동기화 기준)")
     created_by = Column(String(50), default="system", comment="생성자")
     
     def __repr__(self):
@@ -44,27 +104,213 @@ class DailyMessage(Base):
             "season": self.season,
             "isActive": self.is_active,
             "priority": self.priority,
-            "tags": self.tags.split(",") if self.tags else [],
+            "tags": split_tags(self.tags),
             "createdAt": self.created_at.isoformat() if self.created_at else None,
             "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
             "createdBy": self.created_by
         }
 
-class MessageHistory(Base):
-    """메시지 사용 히스토리"""
-    __tablename__ = "message_history"
+# 필터 조회용 인덱스 (카탈로그를 거치지 않는 조회 경로)
+Index(
+    "idx_daily_messages_filter",
+    DailyMessage.is_active,
+    DailyMessage.category,
+    DailyMessage.time_of_day,
+    DailyMessage.season
+)
+
+# 정렬 목록 키셋 페이지네이션용 인덱스 (priority desc, created_at desc, id desc)
+Index(
+    "idx_daily_messages_active_order",
+    DailyMessage.is_active,
+    DailyMessage.priority.desc(),
+    DailyMessage.created_at.desc(),
+    DailyMessage.id.desc()
+)
+Index(
+    "idx_daily_messages_active_category_order",
+    DailyMessage.is_active,
+    DailyMessage.category,
+    DailyMessage.priority.desc(),
+    DailyMessage.created_at.desc(),
+    DailyMessage.id.desc()
+)
+
+# 변경 동기화 (/api/messages/changes) 키셋 조회용 인덱스
+Index("idx_daily_messages_change_seq", DailyMessage.change_seq, DailyMessage.id)
+
+# 본문 중복 방지 (일괄 가져오기의 ON CONFLICT 대상, 백필 전 NULL 은 중복 허용)
+Index("idx_daily_messages_content_hash", DailyMessage.content_hash, unique=True)
+
+@event.listens_for(DailyMessage, "before_insert")
+def _set_content_hash(mapper, connection, target):
+    """본문 해시 설정"""
+    target.content_hash = message_content_hash(target.text)
+
+@event.listens_for(DailyMessage, "before_update")
+def _update_content_hash(mapper, connection, target):
+    """본문이 바뀐 경우에만 해시 갱신
+
+    백필에서 중복 본문이라 NULL 로 남긴 기존 메시지도 본문 외 수정(비활성화 등)은 그대로 가능해야 한다.
+    """
+    if inspect(target).attrs.text.history.has_changes():
+        target.content_hash = message_content_hash(target.text)
+
+class MessageTombstone(Base):
+    """삭제된 메시지 기록 (변경 동기화 클라이언트가 로컬 사본에서 지우도록)"""
+    __tablename__ = "message_tombstones"
+    __table_args__ = {"schema": get_schema()}
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    message_id = Column(Integer, nullable=False, comment="삭제된 메시지 ID")
+    removed_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), server_default=func.now(), comment="삭제일시")
+    change_seq = Column(BigInteger, nullable=True, default=change_seq_now(), comment="변경 순번 (변경 동기화 기준)")
+
+Index("idx_message_tombstones_change_seq", MessageTombstone.change_seq, MessageTombstone.id)
+
+@event.listens_for(DailyMessage, "after_delete")
+def _record_tombstone(mapper, connection, target):
+    """메시지 삭제 시 툼스톤 기록"""
+    connection.execute(MessageTombstone.__table__.insert().values(message_id=target.id))
+
+class MessageTag(Base):
+    """메시지 태그"""
+    __tablename__ = "message_tags"
     __table_args__ = {"schema": get_schema()}
     
     id = Column(Integer, primary_key=True, autoincrement=True)
+    # tags 컬럼에 태그가 하나뿐이면 태그 이름이 컬럼 길이만큼 길 수 있다
+    name = Column(String(200), unique=True, nullable=False, comment="태그 이름")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<MessageTag(name='{self.name}')>"
+
+class DailyMessageTag(Base):
+    """메시지-태그 연결 (DailyMessage.tags 컬럼과 동기화)"""
+    __tablename__ = "daily_message_tags"
+    __table_args__ = {"schema": get_schema()}
+    
+    message_id = Column(
+        Integer,
+        ForeignKey(f"{get_schema()}.daily_messages.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="메시지 ID"
+    )
+    tag_id = Column(
+        Integer,
+        ForeignKey(f"{get_schema()}.message_tags.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="태그 ID"
+    )
+    
+    def __repr__(self):
+        return f"<DailyMessageTag(message_id={self.message_id}, tag_id={self.tag_id})>"
+
+# 태그 -> 메시지 조회용 인덱스
+Index("idx_daily_message_tags_tag", DailyMessageTag.tag_id, DailyMessageTag.message_id)
+
+def sync_message_tags(connection, message_tags: dict):
+    """메시지별 태그 연결을 주어진 목록으로 교체 ({message_id: [tag, ...]})"""
+    if not message_tags:
+        return
+    
+    dialect_name = connection.dialect.name
+    names = sorted({tag for tags in message_tags.values() for tag in tags})
+    
+    # 없는 태그만 생성
+    if names:
+        connection.execute(
+            dialect_insert(dialect_name, MessageTag.__table__)
+            .values([{"name": name} for name in names])
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+    tag_ids = dict(connection.execute(
+        select(MessageTag.name, MessageTag.id).where(MessageTag.name.in_(names))
+    ).all()) if names else {}
+    
+    connection.execute(
+        delete(DailyMessageTag.__table__).where(DailyMessageTag.message_id.in_(list(message_tags)))
+    )
+    links = [
+        {"message_id": message_id, "tag_id": tag_ids[tag]}
+        for message_id, tags in message_tags.items()
+        for tag in tags
+    ]
+    if links:
+        connection.execute(DailyMessageTag.__table__.insert(), links)
+
+@event.listens_for(DailyMessage, "after_insert")
+@event.listens_for(DailyMessage, "after_update")
+def _sync_tags_after_write(mapper, connection, target):
+    """tags 컬럼이 바뀐 경우 태그 연결 테이블 동기화"""
+    if not inspect(target).attrs.tags.history.has_changes():
+        return
+    sync_message_tags(connection, {target.id: split_tags(target.tags)})
+
+class MessageHistory(Base):
+    """메시지 사용 히스토리
+
+    PostgreSQL 에서는 accessed_at 기준 월별 범위 파티션 테이블이다 (history_partitions 참고).
+    파티션 테이블의 고유 제약은 파티션 키를 포함해야 하므로 PostgreSQL 에서는 (id, accessed_at) 고유 제약을,
+    SQLite 대체 모드에서는 자동 증가를 위해 id 단일 기본 키를 만든다.
+    """
+    __tablename__ = "message_history"
+    __table_args__ = (
+        PrimaryKeyConstraint("id").ddl_if(dialect="sqlite"),
+        UniqueConstraint("id", "accessed_at", name="message_history_id_accessed_at_key").ddl_if(dialect="postgresql"),
+        {"schema": get_schema(), "postgresql_partition_by": "RANGE (accessed_at)"}
+    )
+    
+    id = Column(Integer, Identity(), primary_key=True)
     message_id = Column(Integer, nullable=False, comment="메시지 ID")
     user_ip = Column(String(45), nullable=True, comment="사용자 IP")
     user_agent = Column(String(500), nullable=True, comment="사용자 에이전트")
-    accessed_at = Column(DateTime(timezone=True), server_default=func.now(), comment="접근일시")
+    accessed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), comment="접근일시 (파티션 키)")
     reaction = Column(String(20), nullable=True, comment="사용자 반응: like, love, fire")
     
     def __repr__(self):
         return f"<MessageHistory(id={self.id}, message_id={self.message_id})>"
 
+class MessageDailyStat(Base):
+    """메시지별 일간 조회/반응 집계 (message_history 기록 시 증분 갱신)"""
+    __tablename__ = "message_daily_stats"
+    __table_args__ = {"schema": get_schema()}
+    
+    day = Column(Date, primary_key=True, comment="집계일")
+    message_id = Column(Integer, primary_key=True, comment="메시지 ID")
+    category = Column(String(50), primary_key=True, comment="메시지 카테고리")
+    reaction = Column(String(20), primary_key=True, default="", comment="반응 (빈 문자열은 조회)")
+    count = Column(Integer, nullable=False, default=0, comment="건수")
+    
+    def __repr__(self):
+        return f"<MessageDailyStat(day={self.day}, message_id={self.message_id}, reaction='{self.reaction}')>"
+
+class CategoryDailyStat(Base):
+    """카테고리별 일간 조회/반응 집계 (/api/stats 조회용)"""
+    __tablename__ = "category_daily_stats"
+    __table_args__ = {"schema": get_schema()}
+    
+    day = Column(Date, primary_key=True, comment="집계일")
+    category = Column(String(50), primary_key=True, comment="메시지 카테고리")
+    reaction = Column(String(20), primary_key=True, default="", comment="반응 (빈 문자열은 조회)")
+    count = Column(Integer, nullable=False, default=0, comment="건수")
+    
+    def __repr__(self):
+        return f"<CategoryDailyStat(day={self.day}, category='{self.category}', reaction='{self.reaction}')>"
+
+class VisitorSketch(Base):
+    """일간 고유 방문자 HyperLogLog 스케치 (카테고리별, 빈 문자열은 전체)"""
+    __tablename__ = "visitor_sketches"
+    __table_args__ = {"schema": get_schema()}
+    
+    day = Column(Date, primary_key=True, comment="집계일")
+    category = Column(String(50), primary_key=True, default="", comment="메시지 카테고리 (빈 문자열은 전체)")
+    sketch = Column(LargeBinary, nullable=False, comment="HyperLogLog 레지스터 (hyperloglog.HyperLogLog.to_bytes)")
+    
+    def __repr__(self):
+        return f"<VisitorSketch(day={self.day}, category='{self.category}')>"
+
 class MessageCategory(Base):
     """메시지 카테고리 관리"""
     __tablename__ = "message_categories"
@@ -78,6 +324,7 @@ class MessageCategory(Base):
     sort_order = Column(Integer, default=0, comment="정렬 순서")
     is_active = Column(Boolean, default=True, comment="활성화 상태")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=True, default=func.now(), onupdate=func.now(), comment="수정일시 (카탈로그 Last-Modified 기준)")
     
     def __repr__(self):
         return f"<MessageCategory(name='{self.name}')>"
@@ -0,0 +1,169 @@
+"""
+클라이언트별 최근 메시지 기록 (반복 없는 랜덤 선택용)
+클라이언트마다 두 세대짜리 회전 블룸 필터만 보관하므로 최근 본 메시지 수와 무관하게 상태 크기가 일정하다.
+
+- 현재 세대가 TTL 의 절반을 넘기거나 용량만큼 기록되면 이전 세대를 버리고 새 세대를 시작한다.
+  따라서 본 메시지는 최소 TTL/2, 최대 TTL 동안 기억된다.
+- 블룸 필터라 가끔 보지 않은 메시지를 본 것으로 판단할 수 있지만 (거짓 양성), 그 메시지를 건너뛸 뿐이다.
+- 클라이언트 수는 LRU 로 제한하고, 키는 원문 대신 짧은 해시로 보관한다.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+# 세대별 필터 비트 수 (8의 배수, 클라이언트당 상태는 두 세대분)
+NO_REPEAT_FILTER_BITS = int(os.getenv("NO_REPEAT_FILTER_BITS", "512"))
+# 메시지당 설정할 비트 수
+NO_REPEAT_HASHES = int(os.getenv("NO_REPEAT_HASHES", "4"))
+# 세대별 최대 기록 수 (비트 수와 함께 거짓 양성 비율을 결정, 기본값에서 약 1%)
+NO_REPEAT_GENERATION_CAPACITY = int(os.getenv("NO_REPEAT_GENERATION_CAPACITY", "50"))
+# 본 메시지를 기억하는 최대 기간 (초)
+NO_REPEAT_TTL = int(os.getenv("NO_REPEAT_TTL", str(7 * 24 * 3600)))
+# 상태를 보관할 최대 클라이언트 수 (기본 설정에서 클라이언트당 약 400바이트)
+NO_REPEAT_MAX_CLIENTS = int(os.getenv("NO_REPEAT_MAX_CLIENTS", "200000"))
+# 이미 본 메시지가 뽑혔을 때 다시 뽑는 최대 횟수
+NO_REPEAT_MAX_ATTEMPTS = int(os.getenv("NO_REPEAT_MAX_ATTEMPTS", "8"))
+
+MASK_64 = (1 << 64) - 1
+
+
+def client_key(user_ip: Optional[str] = None, user_agent: Optional[str] = None, user_id: Optional[int] = None) -> bytes:
+    """클라이언트 식별 키 (로그인 사용자는 user_id, 익명은 IP + User-Agent)"""
+    if user_id is not None:
+        raw = f"user:{user_id}"
+    else:
+        raw = f"anon:{user_ip or ''}|{user_agent or ''}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).digest()
+
+
+def _bit_positions(message_id: int, bits: int, hashes: int) -> Tuple[int, ...]:
+    """메시지 ID 의 필터 비트 위치 (64비트 정수 혼합 후 이중 해싱)"""
+    h1 = (message_id * 0x9E3779B97F4A7C15) & MASK_64
+    h1 ^= h1 >> 31
+    h2 = ((message_id ^ (message_id >> 29)) * 0xBF58476D1CE4E5B9) & MASK_64
+    h2 = (h2 ^ (h2 >> 32)) | 1
+    return tuple((h1 + i * h2) % bits for i in range(hashes))
+
+
+class RecentFilter:
+    """한 클라이언트의 두 세대 회전 블룸 필터 (두 세대를 하나의 버퍼에 보관)"""
+
+    __slots__ = ("buffer", "current", "started", "count")
+
+    def __init__(self, bits: int, now: float):
+        self.buffer = bytearray(bits // 4)
+        self.current = 0
+        self.started = now
+        self.count = 0
+
+    def rotate(self, now: float):
+        """이전 세대를 비우고 새 현재 세대로 사용"""
+        size = len(self.buffer) // 2
+        self.current ^= 1
+        offset = self.current * size
+        self.buffer[offset:offset + size] = bytes(size)
+        self.started = now
+        self.count = 0
+
+    def contains(self, positions: Tuple[int, ...]) -> bool:
+        buffer = self.buffer
+        size = len(buffer) // 2
+        for offset in (0, size):
+            if all(buffer[offset + (p >> 3)] & (1 << (p & 7)) for p in positions):
+                return True
+        return False
+
+    def add(self, positions: Tuple[int, ...]):
+        offset = self.current * (len(self.buffer) // 2)
+        for p in positions:
+            self.buffer[offset + (p >> 3)] |= 1 << (p & 7)
+        self.count += 1
+
+
+class RecentMessages:
+    """클라이언트별 최근 메시지 기록 (LRU 로 클라이언트 수 제한)"""
+
+    def __init__(
+        self,
+        bits: int = NO_REPEAT_FILTER_BITS,
+        hashes: int = NO_REPEAT_HASHES,
+        capacity: int = NO_REPEAT_GENERATION_CAPACITY,
+        ttl: int = NO_REPEAT_TTL,
+        max_clients: int = NO_REPEAT_MAX_CLIENTS
+    ):
+        if bits <= 0 or bits % 8:
+            raise ValueError(f"Filter bits must be a positive multiple of 8: {bits}")
+
+        self.bits = bits
+        self.hashes = hashes
+        self.capacity = capacity
+        self.ttl = ttl
+        self.max_clients = max_clients
+        self._filters: "OrderedDict[bytes, RecentFilter]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._filters)
+
+    def _positions(self, message_id: int) -> Tuple[int, ...]:
+        return _bit_positions(message_id, self.bits, self.hashes)
+
+    def _filter(self, key: bytes, now: float, create: bool) -> Optional[RecentFilter]:
+        """클라이언트 필터 조회 (만료된 세대는 회전), 호출자가 잠금을 잡고 있어야 한다"""
+        recent = self._filters.get(key)
+        if recent is not None:
+            age = now - recent.started
+            if age >= self.ttl:
+                # 두 세대 모두 만료
+                recent = RecentFilter(self.bits, now)
+                self._filters[key] = recent
+            elif age >= self.ttl / 2 or recent.count >= self.capacity:
+                recent.rotate(now)
+            self._filters.move_to_end(key)
+            return recent
+
+        if not create:
+            return None
+        recent = RecentFilter(self.bits, now)
+        self._filters[key] = recent
+        if len(self._filters) > self.max_clients:
+            self._filters.popitem(last=False)
+        return recent
+
+    def seen(self, key: bytes, message_id: int) -> bool:
+        """최근에 보여 준 메시지인지 여부 (거짓 양성 가능)"""
+        with self._lock:
+            recent = self._filter(key, time.monotonic(), create=False)
+            return recent is not None and recent.contains(self._positions(message_id))
+
+    def add(self, key: bytes, message_id: int):
+        """보여 준 메시지 기록"""
+        with self._lock:
+            self._filter(key, time.monotonic(), create=True).add(self._positions(message_id))
+
+    def choose(
+        self,
+        key: bytes,
+        draw: Callable[[], Tuple[Optional[dict], int]],
+        max_attempts: int = NO_REPEAT_MAX_ATTEMPTS
+    ) -> Tuple[Optional[dict], int]:
+        """최근에 보지 않은 메시지가 나올 때까지 최대 max_attempts 번 뽑고 기록
+
+        모두 본 메시지면 마지막으로 뽑은 메시지를 돌려준다 (후보가 적은 필터 조합).
+        """
+        message, selected_from = draw()
+        for _ in range(max_attempts - 1):
+            if message is None or not self.seen(key, message["id"]):
+                break
+            message, selected_from = draw()
+
+        if message is not None:
+            self.add(key, message["id"])
+        return message, selected_from
+
+
+recent_messages = RecentMessages()
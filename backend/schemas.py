@@ -247,6 +247,7 @@ class UserStatsResponse(BaseModel):
     completed_goals: int
     total_user_messages: int
     current_streak: int
+    longest_streak: int = 0
     total_days: int
 
 # 일반 응답 스키마
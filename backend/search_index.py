@@ -0,0 +1,235 @@
+"""
+메시지 본문/작성자 검색용 문자 n-gram 역색인
+한국어는 띄어쓰기 단위 토큰화가 잘 맞지 않으므로 1-gram/2-gram 을 색인하고,
+후보를 n-gram 교집합으로 좁힌 뒤 실제 부분 문자열 포함 여부로 확인한다.
+"""
+
+import heapq
+import html
+import logging
+import threading
+import time
+import unicodedata
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 본문 일치가 작성자 일치보다 중요하다
+TEXT_WEIGHT = 2.0
+AUTHOR_WEIGHT = 1.0
+# 검색어 전체가 본문에 그대로 들어 있을 때 가산점
+PHRASE_BONUS = 3.0
+# 점수를 계산할 최대 일치 수 (우선순위 순으로 이만큼만 보고 나머지는 건수만 추정)
+MAX_SCORED_MATCHES = 1000
+
+
+def normalize(value: str) -> str:
+    """검색용 정규화 (NFKC + 소문자 + 공백 정리)"""
+    return " ".join(unicodedata.normalize("NFKC", value or "").lower().split())
+
+
+def _grams(term: str) -> Set[str]:
+    """공백을 포함하지 않는 1-gram, 2-gram 집합"""
+    grams = set()
+    for word in term.split():
+        grams.update(word)
+        grams.update(word[i:i + 2] for i in range(len(word) - 1))
+    return grams
+
+
+def _query_grams(term: str) -> Set[str]:
+    """검색어 한 단어를 대표하는 n-gram (2글자 이상이면 2-gram 만 사용)"""
+    if len(term) == 1:
+        return {term}
+    return {term[i:i + 2] for i in range(len(term) - 1)}
+
+
+def _occurrences(haystack: str, needle: str) -> List[Tuple[int, int]]:
+    spans = []
+    start = haystack.find(needle)
+    while start != -1:
+        spans.append((start, start + len(needle)))
+        start = haystack.find(needle, start + 1)
+    return spans
+
+
+def _highlight(original: str, normalized: str, terms: Iterable[str]) -> str:
+    """일치 구간을 <mark> 로 감싼 HTML (정규화로 길이가 달라지면 정규화된 문자열 기준)"""
+    source = original if len(original) == len(normalized) else normalized
+    spans = sorted(span for term in terms for span in _occurrences(normalized, term))
+
+    merged: List[List[int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    parts = []
+    position = 0
+    for start, end in merged:
+        parts.append(html.escape(source[position:start]))
+        parts.append(f"<mark>{html.escape(source[start:end])}</mark>")
+        position = end
+    parts.append(html.escape(source[position:]))
+    return "".join(parts)
+
+
+class MessageSearchIndex:
+    """메시지 목록에 대한 n-gram 역색인
+
+    색인 번호는 (우선순위 내림차순, ID) 순서이므로 포스팅 목록을 앞에서부터 읽으면
+    중요한 메시지부터 확인하게 된다.
+    """
+
+    def __init__(self, messages: List[dict]):
+        messages = sorted(messages, key=lambda message: (-(message.get("priority") or 1), message["id"]))
+        self._messages = messages
+        self._texts = [normalize(message["text"]) for message in messages]
+        self._authors = [normalize(message["author"]) for message in messages]
+
+        postings: Dict[str, array] = {}
+        for position, (text, author) in enumerate(zip(self._texts, self._authors)):
+            for gram in _grams(text) | _grams(author):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("l")
+                posting.append(position)
+        self._postings = postings
+
+    def _score(self, position: int, terms: List[str], phrase: str) -> float:
+        """검색어별 본문/작성자 일치 횟수 기반 점수 (모든 단어가 포함되지 않으면 0)"""
+        text = self._texts[position]
+        author = self._authors[position]
+        score = 0.0
+        for term in terms:
+            text_hits = text.count(term)
+            author_hits = author.count(term)
+            if not text_hits and not author_hits:
+                return 0.0
+            score += TEXT_WEIGHT * min(text_hits, 3) + AUTHOR_WEIGHT * min(author_hits, 3)
+        if len(terms) > 1 and phrase in text:
+            score += PHRASE_BONUS
+        return score
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[dict], int]:
+        """(페이지로 볼 수 있는 일치 수, 현재 페이지 결과, 전체 일치 수 추정치)
+
+        일치가 MAX_SCORED_MATCHES 를 넘으면 우선순위가 높은 쪽만 점수순으로 정렬하므로
+        페이지는 그 범위까지만 넘길 수 있고, 전체 일치 수는 추정치로만 알려 준다.
+        """
+        phrase = normalize(query)
+        terms = sorted(set(phrase.split()), key=len, reverse=True)
+        if not terms:
+            return 0, [], 0
+
+        # 가장 짧은 포스팅 목록만 훑고, 나머지 조건은 부분 문자열 확인으로 거른다
+        shortest = None
+        for term in terms:
+            for gram in _query_grams(term):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    return 0, [], 0
+                if shortest is None or len(posting) < len(shortest):
+                    shortest = posting
+
+        scored = []
+        checked = 0
+        for position in shortest:
+            checked += 1
+            score = self._score(position, terms, phrase)
+            if score > 0:
+                # 점수가 같으면 색인 순서 (우선순위 높은 순)
+                scored.append((-score, position))
+                if len(scored) >= MAX_SCORED_MATCHES:
+                    break
+
+        total = estimated = len(scored)
+        if checked < len(shortest):
+            # 확인하지 않은 후보는 지금까지의 일치 비율로 추정
+            estimated = int(len(shortest) * total / checked)
+
+        page = heapq.nsmallest(offset + limit, scored)[offset:]
+        results = []
+        for negative_score, position in page:
+            message = self._messages[position]
+            results.append({
+                "message": message,
+                "score": -negative_score,
+                "highlight": {
+                    "text": _highlight(message["text"], self._texts[position], terms),
+                    "author": _highlight(message["author"], self._authors[position], terms)
+                }
+            })
+        return total, results, estimated
+
+
+class SearchIndexBuilder:
+    """카탈로그 버전별 검색 색인을 별도 스레드에서 만들고 완성되면 통째로 교체
+
+    100만 건 기준 색인 구성에 수십 초가 걸리므로 이벤트 루프에서 만들지 않는다.
+    새 색인이 준비될 때까지는 직전 색인을 계속 사용한다.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+        self._lock = threading.Lock()
+        self._index: Optional[MessageSearchIndex] = None
+        self._version: Optional[str] = None
+        # 구성 중인 색인, 아직 시작하지 않은 다음 구성 (버전이 여러 번 바뀌어도 하나만 대기한다)
+        self._building: Optional[Tuple[str, Future]] = None
+        self._queued: Optional[Tuple[Callable[[], Tuple[str, List[dict]]], Future]] = None
+
+    def current(self) -> Optional[MessageSearchIndex]:
+        """마지막으로 완성된 색인 (아직 없으면 None)"""
+        return self._index
+
+    def refresh(self, version: str, snapshot: Callable[[], Tuple[str, List[dict]]]) -> Future:
+        """version 의 색인이 없으면 구성을 예약 (완성된 색인을 돌려주는 Future)
+
+        snapshot 은 (버전, 메시지 목록) 을 돌려주며 구성을 시작할 때 호출한다.
+        이미 대기 중인 구성이 있으면 새로 예약하지 않고 그 구성이 최신 snapshot 을 쓰게 한다.
+        """
+        with self._lock:
+            if version == self._version:
+                future = Future()
+                future.set_result(self._index)
+                return future
+            if self._building is not None and self._building[0] == version:
+                return self._building[1]
+            if self._queued is not None:
+                self._queued = (snapshot, self._queued[1])
+                return self._queued[1]
+            future = Future()
+            self._queued = (snapshot, future)
+            self._executor.submit(self._run_queued)
+            return future
+
+    def _run_queued(self):
+        try:
+            with self._lock:
+                snapshot, future = self._queued
+                self._queued = None
+            version, messages = snapshot()
+            with self._lock:
+                if version == self._version:
+                    future.set_result(self._index)
+                    return
+                self._building = (version, future)
+            future.set_result(self._build(version, messages))
+        except Exception as e:
+            logger.error(f"Search index build failed: {e}")
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._building = None
+
+    def _build(self, version: str, messages: List[dict]) -> MessageSearchIndex:
+        started = time.perf_counter()
+        index = MessageSearchIndex(messages)
+        with self._lock:
+            self._index, self._version = index, version
+        logger.info(f"Search index built: {len(messages)} messages ({(time.perf_counter() - started) * 1000:.1f}ms)")
+        return index
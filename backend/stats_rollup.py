@@ -0,0 +1,412 @@
+"""
+조회/반응 집계 테이블 관리
+message_history 기록과 같은 트랜잭션에서 일간 집계와 고유 방문자 스케치를 증분 갱신하고, 기존 히스토리 백필을 지원
+
+집계일은 STATS_TIMEZONE 기준 날짜이며, 증분 갱신(stats_day)과 백필/복구(stats_day_column)가 같은 정의를 쓴다.
+SQLite 대체 모드는 시간대 변환을 할 수 없으므로 UTC 날짜를 쓴다.
+
+사용법:
+    python stats_rollup.py --backfill    # 남아 있는 message_history 기간의 집계 테이블 재생성
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, literal_column, select, delete, update, bindparam, tuple_
+from sqlalchemy.orm import Session
+
+from database_config import SessionLocal, ENVIRONMENT, dialect_insert
+from models_messages import DailyMessage, MessageHistory, MessageDailyStat, CategoryDailyStat, VisitorSketch
+from hyperloglog import HyperLogLog, visitor_hash
+
+VIEW = ""  # reaction 컬럼에서 일반 조회를 나타내는 값
+ALL_CATEGORIES = ""  # visitor_sketches 에서 전체 카테고리를 나타내는 값
+
+# 집계일을 나누는 시간대 (IANA 이름)
+STATS_TIMEZONE = os.getenv("STATS_TIMEZONE", "UTC")
+
+# 지난 날짜 스케치 합계를 재사용하는 시간 (초), 오늘 스케치는 매번 읽는다
+VISITOR_SKETCH_CACHE_SECONDS = int(os.getenv("VISITOR_SKETCH_CACHE_SECONDS", "600"))
+# 카테고리별 고유 방문자를 계산하는 기간 (일)
+CATEGORY_VISITOR_DAYS = 7
+# 전체 고유 방문자를 계산하는 기간 (일)
+VISITOR_RANGES = {"today": 1, "last7Days": 7, "last30Days": 30}
+
+SketchKey = Tuple[date, str]
+
+
+# ==================== 집계일 ====================
+
+def stats_zone(db: Session) -> tzinfo:
+    """집계일 기준 시간대"""
+    if db.get_bind().dialect.name == "postgresql":
+        return ZoneInfo(STATS_TIMEZONE)
+    return timezone.utc
+
+
+def stats_day(db: Session, timestamp: datetime) -> date:
+    """접근 시각의 집계일 (SQL 쪽 stats_day_column 과 같은 정의)"""
+    if timestamp.tzinfo is None:
+        # SQLite 는 시간대 없이 저장된 UTC 값을 돌려준다
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(stats_zone(db)).date()
+
+
+def stats_day_column(db: Session, column):
+    """접근 시각 컬럼의 집계일 SQL 식 (stats_day 와 같은 정의)"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date(func.timezone(STATS_TIMEZONE, column))
+    return func.date(column)
+
+
+def stats_day_start(db: Session, day: date) -> datetime:
+    """집계일이 시작되는 시각"""
+    return datetime.combine(day, datetime.min.time(), tzinfo=stats_zone(db))
+
+
+def stats_today(db: Session) -> date:
+    return stats_day(db, datetime.now(timezone.utc))
+
+
+def _upsert_counts(db: Session, model, key_columns: List[str], counts: Counter):
+    """(키 -> 건수) 를 한 번의 INSERT ... ON CONFLICT 로 누적"""
+    if not counts:
+        return
+
+    # 동시 갱신 시 교착을 피하도록 항상 같은 순서로 기록한다
+    rows = [
+        {**dict(zip(key_columns, key)), "count": count}
+        for key, count in sorted(counts.items())
+    ]
+    stmt = dialect_insert(db.get_bind().dialect.name, model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={"count": model.__table__.c.count + stmt.excluded.count}
+    )
+    db.execute(stmt)
+
+
+def record_history_rollups(db: Session, rows: Iterable[dict]):
+    """기록할 히스토리 행으로 일간 집계 증분 갱신 (커밋은 호출자가 담당)
+
+    각 행에는 message_id, category, reaction, accessed_at 이 있어야 하며,
+    고유 방문자 스케치에는 user_ip, user_agent 를 사용한다.
+    """
+    message_counts = Counter()
+    category_counts = Counter()
+    for row in rows:
+        day = stats_day(db, row["accessed_at"])
+        category = row.get("category") or ""
+        reaction = row.get("reaction") or VIEW
+        message_counts[(day, row["message_id"], category, reaction)] += 1
+        category_counts[(day, category, reaction)] += 1
+
+    _upsert_counts(db, MessageDailyStat, ["day", "message_id", "category", "reaction"], message_counts)
+    _upsert_counts(db, CategoryDailyStat, ["day", "category", "reaction"], category_counts)
+    record_visitor_sketches(db, rows)
+
+
+# ==================== 고유 방문자 ====================
+
+def _add_visitor(sketches: Dict[SketchKey, HyperLogLog], day: date, category: str, value: int):
+    for key in ((day, ALL_CATEGORIES), (day, category)) if category else ((day, ALL_CATEGORIES),):
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = HyperLogLog()
+        sketch.add_hash(value)
+
+
+def merge_visitor_sketches(db: Session, sketches: Dict[SketchKey, HyperLogLog]):
+    """메모리 스케치를 저장된 스케치와 합쳐 기록 (커밋은 호출자가 담당)
+
+    합치기는 멱등이므로 같은 행을 다시 반영해도 결과가 같다.
+    없는 행은 먼저 만들고, 동시 기록이 서로의 갱신을 덮어쓰지 않도록 행을 잠근 뒤 합친다.
+    """
+    if not sketches:
+        return
+
+    keys = sorted(sketches)
+    table = VisitorSketch.__table__
+    db.execute(
+        dialect_insert(db.get_bind().dialect.name, VisitorSketch).values([
+            {"day": day, "category": category, "sketch": sketches[(day, category)].to_bytes()}
+            for day, category in keys
+        ]).on_conflict_do_nothing(index_elements=["day", "category"])
+    )
+
+    stored = db.execute(
+        select(table.c.day, table.c.category, table.c.sketch)
+        .where(tuple_(table.c.day, table.c.category).in_(keys))
+        .order_by(table.c.day, table.c.category)
+        .with_for_update()
+    ).all()
+
+    changed = []
+    for day, category, data in stored:
+        current = HyperLogLog.from_bytes(data)
+        merged = HyperLogLog.from_bytes(data).merge(sketches[(day, category)])
+        if merged.registers != current.registers:
+            changed.append({"b_day": day, "b_category": category, "b_sketch": merged.to_bytes()})
+
+    if changed:
+        db.execute(
+            update(table)
+            .where(table.c.day == bindparam("b_day"), table.c.category == bindparam("b_category"))
+            .values(sketch=bindparam("b_sketch")),
+            changed
+        )
+
+
+def record_visitor_sketches(db: Session, rows: Iterable[dict]):
+    """히스토리 행의 방문자 (user_ip + user_agent) 를 일간/카테고리별 스케치에 반영"""
+    sketches: Dict[SketchKey, HyperLogLog] = {}
+    for row in rows:
+        value = visitor_hash(row.get("user_ip"), row.get("user_agent"))
+        _add_visitor(sketches, stats_day(db, row["accessed_at"]), row.get("category") or "", value)
+    merge_visitor_sketches(db, sketches)
+
+
+def _merged(rows, first_day: date, last_day: date, category: str = ALL_CATEGORIES) -> HyperLogLog:
+    merged = HyperLogLog()
+    for day, row_category, sketch in rows:
+        if row_category == category and first_day <= day <= last_day:
+            merged.merge(sketch)
+    return merged
+
+
+class _PastVisitorCache:
+    """어제까지의 스케치 합계 캐시 (기간별 합계를 오늘 날짜 기준으로 보관)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._today: Optional[date] = None
+        self._loaded_at = 0.0
+        self._merged: Dict[Tuple[str, int], HyperLogLog] = {}
+
+    def get(self, db: Session, today: date) -> Dict[Tuple[str, int], HyperLogLog]:
+        with self._lock:
+            if self._today == today and time.monotonic() - self._loaded_at < VISITOR_SKETCH_CACHE_SECONDS:
+                return self._merged
+
+        first_day = today - timedelta(days=max(VISITOR_RANGES.values()) - 1)
+        rows = [
+            (day, category, HyperLogLog.from_bytes(sketch))
+            for day, category, sketch in db.execute(
+                select(VisitorSketch.day, VisitorSketch.category, VisitorSketch.sketch).where(
+                    VisitorSketch.day >= first_day,
+                    VisitorSketch.day < today
+                )
+            )
+        ]
+        yesterday = today - timedelta(days=1)
+
+        merged = {}
+        for days in VISITOR_RANGES.values():
+            merged[(ALL_CATEGORIES, days)] = _merged(rows, today - timedelta(days=days - 1), yesterday)
+        for category in {category for _, category, _ in rows if category != ALL_CATEGORIES}:
+            merged[(category, CATEGORY_VISITOR_DAYS)] = _merged(
+                rows, today - timedelta(days=CATEGORY_VISITOR_DAYS - 1), yesterday, category
+            )
+
+        with self._lock:
+            self._today = today
+            self._loaded_at = time.monotonic()
+            self._merged = merged
+        return merged
+
+
+_past_visitors = _PastVisitorCache()
+
+
+def get_unique_visitors(db: Session, today: date) -> dict:
+    """고유 방문자 추정치 (오늘/최근 7일/최근 30일, 카테고리별 오늘/최근 7일)"""
+    past = _past_visitors.get(db, today)
+    current = {
+        category: HyperLogLog.from_bytes(sketch)
+        for category, sketch in db.execute(
+            select(VisitorSketch.category, VisitorSketch.sketch).where(VisitorSketch.day == today)
+        )
+    }
+
+    def total(category: str, days: int) -> int:
+        sketch = HyperLogLog()
+        if days > 1 and (category, days) in past:
+            sketch.merge(past[(category, days)])
+        if category in current:
+            sketch.merge(current[category])
+        return sketch.count()
+
+    result = {name: total(ALL_CATEGORIES, days) for name, days in VISITOR_RANGES.items()}
+
+    categories = {category for category, _ in past if category != ALL_CATEGORIES}
+    categories.update(category for category in current if category != ALL_CATEGORIES)
+    result["categories"] = sorted(
+        (
+            {
+                "category": category,
+                "today": total(category, 1),
+                "last7Days": total(category, CATEGORY_VISITOR_DAYS)
+            }
+            for category in categories
+        ),
+        key=lambda item: (-item["last7Days"], item["category"])
+    )
+    return result
+
+
+def get_stats_summary(db: Session, today: date) -> dict:
+    """집계 테이블만으로 전체/오늘 건수와 인기 카테고리 조회"""
+    total_views, today_views = db.query(
+        func.coalesce(func.sum(CategoryDailyStat.count), 0),
+        func.coalesce(func.sum(CategoryDailyStat.count).filter(CategoryDailyStat.day == today), 0)
+    ).one()
+
+    popular_categories = db.query(
+        CategoryDailyStat.category,
+        func.sum(CategoryDailyStat.count).label('views')
+    ).filter(
+        CategoryDailyStat.category != ""
+    ).group_by(CategoryDailyStat.category).order_by(
+        func.sum(CategoryDailyStat.count).desc()
+    ).limit(5).all()
+
+    return {
+        "totalViews": int(total_views),
+        "todayViews": int(today_views),
+        "uniqueVisitors": get_unique_visitors(db, today),
+        "popularCategories": [
+            {"category": cat, "views": int(views)}
+            for cat, views in popular_categories
+        ]
+    }
+
+
+def backfill_rollups(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> Optional[date]:
+    """message_history 로 집계 테이블을 다시 만든다 (트래픽이 적은 시간에 실행)
+
+    start/end 를 주면 [start, end) 기간의 집계만 다시 만들며, accessed_at 범위 조건으로 해당 파티션만 읽는다.
+    start 를 주지 않으면 남아 있는 가장 오래된 히스토리의 집계일부터 다시 만든다.
+    보존 기간이 지나 정리된 날짜는 집계로만 남아 있으므로 지우면 되살릴 수 없다.
+    히스토리가 하나도 없으면 아무것도 바꾸지 않는다. 다시 만든 기간의 시작일을 돌려준다.
+    """
+    if start is None:
+        earliest = db.execute(select(func.min(MessageHistory.accessed_at))).scalar()
+        if earliest is None:
+            return None
+        start = stats_day(db, earliest)
+
+    message_stats = delete(MessageDailyStat)
+    category_stats = delete(CategoryDailyStat)
+    history_range = []
+    if start is not None:
+        message_stats = message_stats.where(MessageDailyStat.day >= start)
+        category_stats = category_stats.where(CategoryDailyStat.day >= start)
+        history_range.append(MessageHistory.accessed_at >= stats_day_start(db, start))
+    if end is not None:
+        message_stats = message_stats.where(MessageDailyStat.day < end)
+        category_stats = category_stats.where(CategoryDailyStat.day < end)
+        history_range.append(MessageHistory.accessed_at < stats_day_start(db, end))
+    db.execute(message_stats)
+    db.execute(category_stats)
+
+    day = stats_day_column(db, MessageHistory.accessed_at)
+    category = func.coalesce(DailyMessage.category, literal_column("''"))
+    reaction = func.coalesce(MessageHistory.reaction, literal_column("''"))
+
+    message_rollup = select(
+        day, MessageHistory.message_id, category, reaction, func.count(MessageHistory.id)
+    ).select_from(MessageHistory).outerjoin(
+        DailyMessage, DailyMessage.id == MessageHistory.message_id
+    ).where(*history_range).group_by(day, MessageHistory.message_id, category, reaction)
+
+    db.execute(
+        MessageDailyStat.__table__.insert().from_select(
+            ["day", "message_id", "category", "reaction", "count"], message_rollup
+        )
+    )
+
+    category_rollup = select(
+        MessageDailyStat.day, MessageDailyStat.category, MessageDailyStat.reaction,
+        func.sum(MessageDailyStat.count)
+    )
+    if start is not None:
+        category_rollup = category_rollup.where(MessageDailyStat.day >= start)
+    if end is not None:
+        category_rollup = category_rollup.where(MessageDailyStat.day < end)
+    category_rollup = category_rollup.group_by(
+        MessageDailyStat.day, MessageDailyStat.category, MessageDailyStat.reaction
+    )
+
+    db.execute(
+        CategoryDailyStat.__table__.insert().from_select(
+            ["day", "category", "reaction", "count"], category_rollup
+        )
+    )
+
+    backfill_visitor_sketches(db, history_range)
+    return start
+
+
+def backfill_visitor_sketches(db: Session, history_range: list, fetch_size: int = 10000):
+    """message_history 의 방문자를 스케치에 합친다
+
+    스케치는 합쳐도 값이 줄지 않으므로 기존 스케치를 지우지 않는다.
+    원본이 이미 정리된 날짜의 방문자 수도 그대로 남는다.
+    """
+    rows = db.execute(
+        select(
+            MessageHistory.accessed_at, MessageHistory.user_ip, MessageHistory.user_agent,
+            func.coalesce(DailyMessage.category, literal_column("''"))
+        ).select_from(MessageHistory).outerjoin(
+            DailyMessage, DailyMessage.id == MessageHistory.message_id
+        ).where(*history_range).execution_options(yield_per=fetch_size)
+    )
+
+    sketches: Dict[SketchKey, HyperLogLog] = {}
+    for accessed_at, user_ip, user_agent, category in rows:
+        _add_visitor(sketches, stats_day(db, accessed_at), category, visitor_hash(user_ip, user_agent))
+    merge_visitor_sketches(db, sketches)
+
+
+def main():
+    """집계 백필 실행"""
+    if "--backfill" not in sys.argv:
+        print(__doc__)
+        sys.exit(1)
+
+    print(f"Backfilling stats rollups in {ENVIRONMENT} environment...")
+    db = SessionLocal()
+    started = time.time()
+
+    try:
+        start = backfill_rollups(db)
+        db.commit()
+
+        if start is None:
+            print("No message_history rows to backfill")
+            return
+        print(f"Rebuilt rollups from {start}")
+
+        message_rows = db.query(func.count()).select_from(MessageDailyStat).scalar()
+        category_rows = db.query(func.count()).select_from(CategoryDailyStat).scalar()
+        sketch_rows = db.query(func.count()).select_from(VisitorSketch).scalar()
+        print(f"Message daily rows: {message_rows}")
+        print(f"Category daily rows: {category_rows}")
+        print(f"Visitor sketch rows: {sketch_rows}")
+        print(f"Completed in {time.time() - started:.1f}s")
+    except Exception as e:
+        print(f"Backfill failed: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+백엔드 테스트 공통 설정
+메시지 DB 는 MESSAGES_DATABASE_URL 로 메모리 SQLite 를 쓰므로 PostgreSQL 없이 실행된다.
+
+실행:
+    python -m pytest -q backend/tests
+    TEST_POSTGRES_URL=postgresql://... python -m pytest -q backend/tests   # PostgreSQL 전용 테스트 포함 (버려도 되는 DB)
+"""
+
+import os
+import sys
+
+os.environ.setdefault("MESSAGES_DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import database_config
+import models_messages  # noqa: F401  (테이블 등록)
+
+
+@pytest.fixture
+def messages_db():
+    """메시지 DB 세션 (테스트마다 빈 테이블)"""
+    database_config.Base.metadata.create_all(bind=database_config.engine)
+    db = database_config.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        database_config.Base.metadata.drop_all(bind=database_config.engine)
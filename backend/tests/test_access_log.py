@@ -0,0 +1,215 @@
+"""접근 로그 지연 기록 테스트 (대기 정책, 실패 시 재시도/파일 내보내기)"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import access_log
+from access_log import AccessLogWriter
+
+
+class FakeSession:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """write_history_rows 대신 기록된 행을 모으고, available=False 이면 실패한다"""
+
+    def __init__(self):
+        self.available = True
+        self.rows = []
+
+    def write(self, db, rows):
+        if not self.available:
+            raise RuntimeError("database is down")
+        self.rows.extend(rows)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    fake = FakeDatabase()
+    monkeypatch.setattr(access_log, "write_history_rows", fake.write)
+    monkeypatch.setattr(access_log, "ensure_partitions", lambda db, today: [])
+    return fake
+
+
+def _writer(tmp_path, **options) -> AccessLogWriter:
+    options.setdefault("spill_path", str(tmp_path / "spill.ndjson"))
+    return AccessLogWriter(FakeSession, **options)
+
+
+def test_drop_policies(database, tmp_path):
+    newest = _writer(tmp_path, max_queue=2, overflow_policy="drop_newest")
+    oldest = _writer(tmp_path, max_queue=2, overflow_policy="drop_oldest")
+    for message_id in (1, 2, 3):
+        newest.record(message_id, None, None)
+        oldest.record(message_id, None, None)
+
+    assert [row["message_id"] for row in newest._buffer] == [1, 2]
+    assert [row["message_id"] for row in oldest._buffer] == [2, 3]
+    assert newest.stats["dropped"] == oldest.stats["dropped"] == 1
+
+
+def test_sync_record_does_not_block_event_loop(database, tmp_path):
+    writer = _writer(tmp_path, max_queue=1, overflow_policy="block", block_timeout=5)
+    writer.record(1, None, None)
+
+    async def record_in_loop():
+        started = time.monotonic()
+        added = writer.record(2, None, None)
+        return added, time.monotonic() - started
+
+    added, elapsed = asyncio.run(record_in_loop())
+    assert not added
+    assert elapsed < 1
+
+
+def test_async_block_waits_without_blocking_loop(database, tmp_path):
+    writer = _writer(tmp_path, max_queue=1, overflow_policy="block", block_timeout=5)
+    writer.record(1, None, None)
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        threading.Timer(0.2, writer.flush).start()
+        added = await writer.record_async(2, None, None)
+        ticker.cancel()
+        return added, ticks
+
+    added, ticks = asyncio.run(scenario())
+    assert added
+    assert ticks >= 5
+    assert [row["message_id"] for row in database.rows] == [1]
+    assert [row["message_id"] for row in writer._buffer] == [2]
+
+
+def test_async_block_drops_after_timeout(database, tmp_path):
+    writer = _writer(tmp_path, max_queue=1, overflow_policy="block", block_timeout=0.05)
+    writer.record(1, None, None)
+
+    assert not asyncio.run(writer.record_async(2, None, None))
+    assert writer.stats["dropped"] == 1
+    assert writer._async_waiters == []
+
+
+def test_failed_flush_requeues_rows(database, tmp_path):
+    writer = _writer(tmp_path, batch_size=2)
+    for message_id in (1, 2, 3):
+        writer.record(message_id, None, None)
+    database.available = False
+
+    assert not writer.flush()
+    assert [row["message_id"] for row in writer._buffer] == [1, 2, 3]
+    assert writer.stats["requeued"] == 2
+
+    database.available = True
+    assert writer.flush()
+    assert [row["message_id"] for row in database.rows] == [1, 2, 3]
+
+
+def test_requeue_overflow_is_spilled(database, tmp_path):
+    writer = _writer(tmp_path, batch_size=3, max_queue=3)
+    for message_id in (1, 2, 3):
+        writer.record(message_id, None, None)
+    database.available = False
+
+    with writer._condition:
+        batch = writer._take_batch()
+    writer.record(4, None, None)
+    writer.record(5, None, None)
+    writer._requeue(batch)
+
+    assert [row["message_id"] for row in writer._buffer] == [1, 4, 5]
+    assert writer.stats["spilled"] == 2
+    assert len((tmp_path / "spill.ndjson").read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_stop_spills_and_start_replays(database, tmp_path):
+    writer = _writer(tmp_path, batch_size=2, flush_interval=0.05)
+    for message_id in (1, 2, 3):
+        writer.record(message_id, "1.2.3.4", "ua", category="성공")
+    database.available = False
+    writer.stop()
+
+    assert writer.stats["spilled"] == 3
+    assert database.rows == []
+
+    database.available = True
+    restarted = _writer(tmp_path, batch_size=2, flush_interval=0.05)
+    restarted.start()
+    restarted.stop()
+
+    assert [row["message_id"] for row in database.rows] == [1, 2, 3]
+    assert database.rows[0]["category"] == "성공"
+    assert database.rows[0]["accessed_at"].tzinfo is not None
+    assert not (tmp_path / "spill.ndjson").exists()
+    assert not (tmp_path / "spill.ndjson.replay").exists()
+
+
+def test_failed_replay_keeps_rows(database, tmp_path):
+    writer = _writer(tmp_path, batch_size=2)
+    writer._spill([writer._row(message_id, None, None, None, None) for message_id in range(5)])
+    database.available = False
+
+    writer._replay_spill()
+
+    lines = (tmp_path / "spill.ndjson").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 5
+    assert database.rows == []
+
+
+def test_replay_skips_corrupt_lines(database, tmp_path):
+    writer = _writer(tmp_path, batch_size=2)
+    writer._spill([writer._row(message_id, None, None, None, None) for message_id in range(3)])
+    with open(tmp_path / "spill.ndjson", "a", encoding="utf-8") as file:
+        file.write("not json\n")
+        file.write('{"message_id": 9, "accessed_at": "2026-')
+
+    writer._replay_spill()
+
+    assert [row["message_id"] for row in database.rows] == [0, 1, 2]
+    assert writer.stats["corrupt"] == 2
+    assert not (tmp_path / "spill.ndjson").exists()
+
+
+def test_replay_merges_leftover_replay_file(database, tmp_path):
+    writer = _writer(tmp_path, batch_size=2)
+    writer._spill([writer._row(message_id, None, None, None, None) for message_id in (1, 2)])
+    (tmp_path / "spill.ndjson").rename(tmp_path / "spill.ndjson.replay")
+    with open(tmp_path / "spill.ndjson.replay", "a", encoding="utf-8") as file:
+        file.write('{"message_id": 9, "accessed_at": "2026-')
+    writer._spill([writer._row(message_id, None, None, None, None) for message_id in (3, 4)])
+
+    writer._replay_spill()
+
+    assert [row["message_id"] for row in database.rows] == [1, 2, 3, 4]
+    assert writer.stats["corrupt"] == 1
+    assert not (tmp_path / "spill.ndjson.replay").exists()
+
+
+@pytest.mark.skipif(access_log.fcntl is None, reason="파일 잠금 미지원")
+def test_replay_skipped_while_another_worker_replays(database, tmp_path):
+    writer = _writer(tmp_path)
+    writer._spill([writer._row(1, None, None, None, None)])
+
+    with access_log._locked_file(str(tmp_path / "spill.ndjson.replay"), "a+"):
+        writer._replay_spill()
+
+    assert database.rows == []
+    assert (tmp_path / "spill.ndjson").exists()
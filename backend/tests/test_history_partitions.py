@@ -0,0 +1,122 @@
+"""history_partitions 테스트 (SQLite 대체 모드 + PostgreSQL 파티션)"""
+
+import os
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+import history_partitions
+from database_config import get_schema
+from models_messages import MessageHistory
+
+
+def _visit(month: int, day: int = 5) -> MessageHistory:
+    return MessageHistory(message_id=1, accessed_at=datetime(2026, month, day, 12, tzinfo=timezone.utc))
+
+
+def test_month_helpers():
+    assert history_partitions.add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert history_partitions.add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert history_partitions.partition_name(date(2026, 3, 1)) == "message_history_p202603"
+    start, end = history_partitions.month_bounds(date(2026, 12, 1))
+    assert start == datetime(2026, 12, 1, tzinfo=timezone.utc)
+    assert end == datetime(2027, 1, 1, tzinfo=timezone.utc)
+
+
+def test_sqlite_lists_months_as_partitions(messages_db):
+    messages_db.add_all([_visit(1), _visit(1, 20), _visit(3)])
+    messages_db.commit()
+
+    assert history_partitions.table_kind(messages_db) == "regular"
+    partitions = history_partitions.list_partitions(messages_db)
+    assert [(p["name"], p["rows"]) for p in partitions] == [
+        ("message_history_p202601", 2),
+        ("message_history_p202603", 1),
+    ]
+
+
+def test_sqlite_ensure_is_noop(messages_db):
+    assert history_partitions.ensure_partitions(messages_db, today=date(2026, 3, 1)) == []
+
+
+def test_sqlite_drop_before_deletes_older_months_only(messages_db):
+    messages_db.add_all([_visit(1), _visit(2), _visit(3), _visit(4)])
+    messages_db.commit()
+
+    removed = history_partitions.drop_partitions_before(messages_db, date(2026, 3, 15))
+    messages_db.commit()
+
+    assert removed == ["message_history_p202601", "message_history_p202602"]
+    assert [p["month"] for p in history_partitions.list_partitions(messages_db)] == [
+        date(2026, 3, 1), date(2026, 4, 1)
+    ]
+
+
+# ==================== PostgreSQL ====================
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.fixture
+def postgres_db():
+    """파티션 테이블로 만든 message_history (현재 환경 스키마를 새로 만들고 끝나면 지운다)"""
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(TEST_POSTGRES_URL)
+    schema = get_schema()
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+        conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+        MessageHistory.__table__.create(bind=conn)
+    db = Session(bind=engine)
+    try:
+        yield db
+    finally:
+        db.close()
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+        engine.dispose()
+
+
+def _rows(db: Session, table: str) -> int:
+    return db.execute(text(f'SELECT count(*) FROM "{get_schema()}"."{table}"')).scalar()
+
+
+def test_postgres_ensure_creates_monthly_partitions(postgres_db):
+    created = history_partitions.ensure_partitions(postgres_db, today=date(2026, 1, 10), months_ahead=2)
+    postgres_db.commit()
+
+    assert created == ["message_history_p202601", "message_history_p202602", "message_history_p202603"]
+    names = {p["name"] for p in history_partitions.list_partitions(postgres_db)}
+    assert names == set(created) | {history_partitions.DEFAULT_PARTITION}
+    assert history_partitions.ensure_partitions(postgres_db, today=date(2026, 1, 10), months_ahead=2) == []
+
+
+def test_postgres_stray_rows_move_into_new_partition(postgres_db):
+    history_partitions.ensure_partitions(postgres_db, today=date(2026, 1, 10), months_ahead=0)
+    # 아직 파티션이 없는 달의 행은 기본 파티션에 들어간다
+    postgres_db.add_all([_visit(1), _visit(3), _visit(3, 20), _visit(5)])
+    postgres_db.commit()
+    assert _rows(postgres_db, history_partitions.DEFAULT_PARTITION) == 3
+
+    created = history_partitions.ensure_partitions(postgres_db, today=date(2026, 3, 1), months_ahead=0)
+    postgres_db.commit()
+
+    assert "message_history_p202603" in created
+    assert _rows(postgres_db, "message_history_p202603") == 2
+    assert _rows(postgres_db, history_partitions.DEFAULT_PARTITION) == 1
+    assert _rows(postgres_db, history_partitions.PARENT_TABLE) == 4
+
+
+def test_postgres_drop_before_detaches_old_partitions(postgres_db):
+    history_partitions.ensure_partitions(postgres_db, today=date(2026, 3, 1), months_ahead=0, first_month=date(2026, 1, 1))
+    postgres_db.add_all([_visit(1), _visit(2), _visit(3)])
+    postgres_db.commit()
+
+    removed = history_partitions.drop_partitions_before(postgres_db, date(2026, 3, 1))
+    postgres_db.commit()
+
+    assert removed == ["message_history_p202601", "message_history_p202602"]
+    assert _rows(postgres_db, history_partitions.PARENT_TABLE) == 1
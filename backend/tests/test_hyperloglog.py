@@ -0,0 +1,80 @@
+"""HyperLogLog 추정/병합 테스트"""
+
+import pytest
+
+from hyperloglog import HyperLogLog, visitor_hash
+
+
+def _sketch(values, precision: int = 12) -> HyperLogLog:
+    sketch = HyperLogLog(precision)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def test_empty_sketch():
+    sketch = HyperLogLog()
+    assert sketch.is_empty()
+    assert sketch.count() == 0
+
+
+def test_small_counts_are_exact_enough():
+    sketch = _sketch(f"visitor-{i}" for i in range(100))
+    assert sketch.count() == pytest.approx(100, abs=2)
+
+
+@pytest.mark.parametrize("count", [1000, 20000, 200000])
+def test_estimate_within_error(count):
+    sketch = _sketch(f"visitor-{i}" for i in range(count))
+    # 표준 오차 약 1.6%, 여유를 두고 5% 이내
+    assert sketch.count() == pytest.approx(count, rel=0.05)
+
+
+def test_duplicates_do_not_count():
+    sketch = _sketch(f"visitor-{i % 500}" for i in range(50000))
+    assert sketch.count() == pytest.approx(500, rel=0.05)
+
+
+def test_merge_is_union():
+    monday = _sketch(f"visitor-{i}" for i in range(0, 6000))
+    tuesday = _sketch(f"visitor-{i}" for i in range(4000, 10000))
+
+    week = HyperLogLog().merge(monday).merge(tuesday)
+
+    assert week.count() == pytest.approx(10000, rel=0.05)
+    assert week.registers == _sketch(f"visitor-{i}" for i in range(10000)).registers
+    # 병합은 원래 스케치를 바꾸지 않는다
+    assert monday.count() == pytest.approx(6000, rel=0.05)
+
+
+def test_merge_requires_same_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+
+
+def test_serialization_round_trip():
+    sketch = _sketch(f"visitor-{i}" for i in range(300))
+    data = sketch.to_bytes()
+
+    restored = HyperLogLog.from_bytes(data)
+
+    assert restored.precision == 12
+    assert restored.registers == sketch.registers
+    assert len(data) < len(sketch.registers)
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
+    with pytest.raises(ValueError):
+        HyperLogLog(4, bytes(10))
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(b"\x09\x0c")
+
+
+def test_visitor_hash():
+    assert visitor_hash("1.2.3.4", "ua") == visitor_hash("1.2.3.4", "ua")
+    assert visitor_hash("1.2.3.4", "ua") != visitor_hash("1.2.3.4", None)
+    sketch = HyperLogLog()
+    sketch.update([visitor_hash("1.2.3.4", "ua")] * 3)
+    assert sketch.count() == 1
@@ -0,0 +1,134 @@
+"""메시지 카탈로그 가중치 추출 (별칭 테이블) 테스트"""
+
+import random
+from collections import Counter
+from fractions import Fraction
+
+import pytest
+
+from message_catalog import AliasTable, MessageCatalog, _weight
+
+
+def _implied_probabilities(table: AliasTable) -> list:
+    """별칭 테이블이 나타내는 항목별 선택 확률"""
+    count = len(table.probability)
+    shares = [Fraction(0)] * count
+    for index, (probability, alias) in enumerate(zip(table.probability, table.alias)):
+        kept = Fraction(probability)
+        shares[index] += kept / count
+        shares[alias] += (1 - kept) / count
+    return shares
+
+
+def _message(message_id: int, priority: int, category: str = "성공", season: str = "all") -> dict:
+    return {
+        "id": message_id, "text": f"message {message_id}", "author": None,
+        "category": category, "timeOfDay": None, "season": season,
+        "isActive": True, "priority": priority, "tags": [],
+        "createdAt": "2026-01-01T00:00:00+00:00", "updatedAt": None, "createdBy": None
+    }
+
+
+@pytest.mark.parametrize("weights", [[1], [1, 1, 1], [1, 2, 3, 4], [10, 1, 1, 1, 1, 1], [5, 5, 1, 9, 3, 7, 2]])
+def test_alias_table_matches_weights(weights):
+    table = AliasTable(weights)
+    total = sum(weights)
+    for share, weight in zip(_implied_probabilities(table), weights):
+        assert float(share) == pytest.approx(weight / total, abs=1e-9)
+
+
+def test_alias_table_draws_follow_weights():
+    random.seed(1234)
+    table = AliasTable([1, 3, 6])
+    draws = Counter(table.draw() for _ in range(60000))
+    for index, expected in enumerate((0.1, 0.3, 0.6)):
+        assert draws[index] / 60000 == pytest.approx(expected, abs=0.01)
+
+
+def test_weight_clamps_priority():
+    assert [_weight({"priority": value}) for value in (None, 0, -3, 1, 7, 10, 99)] == [1, 1, 1, 1, 7, 10, 10]
+
+
+def test_weighted_choice_prefers_high_priority():
+    random.seed(99)
+    catalog = MessageCatalog()
+    catalog.replace([_message(1, 1), _message(2, 9), _message(3, 5, category="행복")])
+
+    picks = Counter(catalog.choice(category="성공", weighted=True)[0]["id"] for _ in range(20000))
+
+    assert set(picks) == {1, 2}
+    assert picks[2] / 20000 == pytest.approx(0.9, abs=0.01)
+    assert catalog.choice(category="성공", weighted=True)[1] == 2
+
+
+def test_weighted_choice_rebuilds_after_reload():
+    random.seed(7)
+    catalog = MessageCatalog()
+    catalog.replace([_message(1, 1), _message(2, 9)])
+    catalog.choice(weighted=True)
+
+    catalog.replace([_message(1, 9), _message(2, 1)])
+    picks = Counter(catalog.choice(weighted=True)[0]["id"] for _ in range(20000))
+
+    assert picks[1] / 20000 == pytest.approx(0.9, abs=0.01)
+
+
+def test_choice_on_empty_pool():
+    catalog = MessageCatalog()
+    catalog.replace([_message(1, 5)])
+    assert catalog.choice(category="없음", weighted=True) == (None, 0)
+
+
+def test_unknown_time_of_day_shares_one_pool():
+    catalog = MessageCatalog()
+    catalog.replace([_message(1, 5)])
+
+    for index in range(50):
+        assert catalog.choice(category="성공", time_of_day=f"dawn-{index}")[0]["id"] == 1
+
+    assert list(catalog._pools) == [("성공", "", None)]
+
+
+def test_pool_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr("message_catalog.POOL_CACHE_SIZE", 2)
+    catalog = MessageCatalog()
+    catalog.replace([_message(1, 5, category="성공"), _message(2, 5, category="행복"), _message(3, 5, category="용기")])
+
+    for category in ("성공", "행복", "용기"):
+        catalog.choice(category=category, weighted=True)
+
+    assert list(catalog._pools) == [("행복", None, None), ("용기", None, None)]
+    assert set(catalog._alias_tables) == set(catalog._pools)
+
+
+def test_alias_tables_follow_tag_pool_eviction(monkeypatch):
+    monkeypatch.setattr("message_catalog.TAG_POOL_CACHE_SIZE", 1)
+    catalog = MessageCatalog()
+    first, second = _message(1, 5), _message(2, 5)
+    first["tags"], second["tags"] = ["아침"], ["저녁"]
+    catalog.replace([first, second])
+
+    assert catalog.choice(tags=["아침"], weighted=True)[0]["id"] == 1
+    assert catalog.choice(tags=["저녁"], weighted=True)[0]["id"] == 2
+
+    assert set(catalog._alias_tables) == set(catalog._tag_pools)
+    assert len(catalog._alias_tables) == 1
+
+
+def test_alias_table_not_kept_for_uncached_pool(monkeypatch):
+    monkeypatch.setattr("message_catalog.POOL_CACHE_SIZE", 0)
+    catalog = MessageCatalog()
+    catalog.replace([_message(1, 5)])
+
+    assert catalog.choice(weighted=True)[0]["id"] == 1
+    assert catalog._alias_tables == {}
+
+
+def test_unknown_season_shares_one_pool():
+    catalog = MessageCatalog()
+    catalog.replace([_message(1, 5), _message(2, 5, season="summer")])
+
+    for index in range(50):
+        assert catalog.choice(category="성공", season=f"rainy-{index}")[0]["id"] == 1
+
+    assert list(catalog._pools) == [("성공", None, "all")]
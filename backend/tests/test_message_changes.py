@@ -0,0 +1,41 @@
+"""델타 동기화 순번 테스트 (SQLite 순번은 쓰기마다 단조 증가해야 한다)"""
+
+from sqlalchemy import update
+
+from message_changes import get_changes
+from models_messages import DailyMessage
+
+
+def _message(text: str) -> DailyMessage:
+    return DailyMessage(text=text, author="익명", category="성공")
+
+
+def test_change_seq_increases_per_write(messages_db):
+    messages_db.add_all([_message("첫 번째"), _message("두 번째")])
+    messages_db.commit()
+    first, second = messages_db.get(DailyMessage, 1), messages_db.get(DailyMessage, 2)
+    seqs = [first.change_seq, second.change_seq]
+
+    first.text = "수정"
+    messages_db.commit()
+    messages_db.execute(update(DailyMessage).where(DailyMessage.id == 2).values(priority=5))
+    messages_db.commit()
+
+    assert first.change_seq > max(seqs)
+    assert messages_db.get(DailyMessage, 2).change_seq > first.change_seq
+
+
+def test_later_write_to_lower_id_is_not_skipped(messages_db):
+    messages_db.add(_message("첫 번째"))
+    messages_db.commit()
+    messages_db.add(_message("두 번째"))
+    messages_db.commit()
+
+    synced = get_changes(messages_db, None, 10)
+    assert [change["id"] for change in synced["changes"]] == [1, 2]
+
+    messages_db.get(DailyMessage, 1).text = "수정"
+    messages_db.commit()
+
+    changes = get_changes(messages_db, synced["version"], 10)
+    assert [change["text"] for change in changes["changes"]] == ["수정"]
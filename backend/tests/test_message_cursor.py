@@ -0,0 +1,30 @@
+"""/api/messages 정렬 목록 커서 테스트"""
+
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from api_messages import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 3, 1, 9, 30, 15, 123456, tzinfo=timezone.utc)
+    message = {"id": 42, "priority": 7, "createdAt": created_at.isoformat()}
+
+    cursor = encode_cursor(message)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (7, created_at, 42)
+
+
+def test_cursor_keeps_naive_timestamp():
+    message = {"id": 1, "priority": 1, "createdAt": "2026-01-02T03:04:05"}
+    assert decode_cursor(encode_cursor(message)) == (1, datetime(2026, 1, 2, 3, 4, 5), 1)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "W10", "WzEsMl0", "WyJ4IiwiMjAyNi0wMS0wMSIsMV0"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
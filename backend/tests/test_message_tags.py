@@ -0,0 +1,27 @@
+"""메시지 태그 정규화 테스트"""
+
+from sqlalchemy import select
+
+from models_messages import DailyMessage, DailyMessageTag, MessageTag, split_tags
+
+
+def test_split_tags():
+    assert split_tags(" 아침, 동기부여 ,,아침, ") == ["아침", "동기부여"]
+    assert split_tags(None) == []
+
+
+def test_tag_name_fits_whole_tags_column():
+    assert MessageTag.__table__.c.name.type.length >= DailyMessage.__table__.c.tags.type.length
+
+
+def test_long_tag_is_linked(messages_db):
+    long_tag = "긴태그" * 60
+    message = DailyMessage(text="오늘도 힘내세요", author="익명", category="응원", tags=f"{long_tag},아침")
+    messages_db.add(message)
+    messages_db.commit()
+
+    names = messages_db.scalars(
+        select(MessageTag.name).join(DailyMessageTag, DailyMessageTag.tag_id == MessageTag.id)
+        .where(DailyMessageTag.message_id == message.id).order_by(MessageTag.name)
+    ).all()
+    assert names == sorted([long_tag, "아침"])
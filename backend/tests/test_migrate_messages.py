@@ -0,0 +1,157 @@
+"""일괄 가져오기 스트리밍 파서와 체크포인트 테스트"""
+
+import json
+
+import pytest
+
+from migrate_messages import (
+    ImportCheckpoint, _copy_field, bulk_import_messages, iter_json_messages, iter_messages, iter_ndjson_messages
+)
+
+MESSAGES = [
+    {"text": "첫 번째 메시지, [괄호] 포함", "category": "성공", "priority": 3},
+    {"text": "escaped \"quote\" and \\ backslash", "tags": ["a", "b"]},
+    {"text": "x" * 300, "nested": {"list": [1, 2, {"deep": "]"}]}},
+    {"text": "마지막"},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_json_document_streams_items(tmp_path, chunk_size):
+    source = tmp_path / "messages.json"
+    source.write_text(json.dumps({"version": 1, "messages": MESSAGES}, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    assert list(iter_json_messages(str(source), chunk_size=chunk_size)) == MESSAGES
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 20])
+def test_top_level_array_streams_items(tmp_path, chunk_size):
+    source = tmp_path / "messages.json"
+    source.write_text("  \n" + json.dumps(MESSAGES, ensure_ascii=False), encoding="utf-8")
+
+    assert list(iter_json_messages(str(source), chunk_size=chunk_size)) == MESSAGES
+
+
+def test_empty_array(tmp_path):
+    source = tmp_path / "messages.json"
+    source.write_text('{"messages": [ ]}', encoding="utf-8")
+    assert list(iter_json_messages(str(source), chunk_size=4)) == []
+
+
+def test_unterminated_array_raises(tmp_path):
+    source = tmp_path / "messages.json"
+    source.write_text('{"messages": [{"text": "a"}, ', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_messages(str(source), chunk_size=8))
+
+
+def test_missing_array_raises(tmp_path):
+    source = tmp_path / "messages.json"
+    source.write_text('{"items": {}}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_messages(str(source), chunk_size=8))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 16, 1 << 20])
+def test_truncated_literals_across_chunks(tmp_path, chunk_size):
+    items = [{"active": True, "note": None, "draft": False, "score": -12.5e3, "text": "\\u0041 \u00e9"}] * 3
+    source = tmp_path / "messages.json"
+    source.write_text(json.dumps(items), encoding="utf-8")
+
+    assert list(iter_json_messages(str(source), chunk_size=chunk_size)) == items
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1 << 20])
+def test_malformed_item_raises_without_reading_rest(tmp_path, chunk_size):
+    source = tmp_path / "messages.json"
+    good = json.dumps({"text": "ok"})
+    source.write_text("[" + good + ", {\"text\": tru, \"x\": 1}, " + ", ".join([good] * 20000) + "]", encoding="utf-8")
+
+    items = iter_json_messages(str(source), chunk_size=chunk_size)
+    assert next(items) == {"text": "ok"}
+    with pytest.raises(ValueError, match="2번째"):
+        next(items)
+
+
+def test_ndjson_counts_malformed_lines_as_errors(tmp_path, capsys):
+    source = tmp_path / "messages.ndjson"
+    source.write_text('{"text": "a"}\n{"text": \n["list"]\n{"text": "b"}\n', encoding="utf-8")
+
+    items = list(iter_ndjson_messages(str(source)))
+
+    assert items == [{"text": "a"}, None, ["list"], {"text": "b"}]
+    assert "line 2" in capsys.readouterr().out
+
+
+def test_ndjson_skips_blank_lines(tmp_path):
+    source = tmp_path / "messages.ndjson"
+    source.write_text("\n".join(json.dumps(m, ensure_ascii=False) for m in MESSAGES[:2]) + "\n\n", encoding="utf-8")
+
+    assert list(iter_ndjson_messages(str(source))) == MESSAGES[:2]
+    assert list(iter_messages(str(source))) == MESSAGES[:2]
+
+
+def test_checkpoint_round_trip(tmp_path):
+    source = tmp_path / "dump.json"
+    source.write_text(json.dumps(MESSAGES), encoding="utf-8")
+    checkpoint = ImportCheckpoint(source)
+
+    assert checkpoint.load() == 0
+    checkpoint.save(20000)
+    assert checkpoint.path.name == "dump.json.checkpoint"
+    assert ImportCheckpoint(source).load() == 20000
+
+    checkpoint.clear()
+    assert not checkpoint.path.exists()
+    assert checkpoint.load() == 0
+
+
+def test_checkpoint_ignored_when_input_changes(tmp_path):
+    source = tmp_path / "dump.json"
+    source.write_text(json.dumps(MESSAGES), encoding="utf-8")
+    ImportCheckpoint(source).save(3)
+
+    source.write_text(json.dumps(MESSAGES + MESSAGES), encoding="utf-8")
+    assert ImportCheckpoint(source).load() == 0
+
+
+def test_corrupt_checkpoint_starts_over(tmp_path):
+    source = tmp_path / "dump.json"
+    source.write_text("[]", encoding="utf-8")
+    checkpoint = ImportCheckpoint(source)
+    checkpoint.path.write_text("{not json", encoding="utf-8")
+    assert checkpoint.load() == 0
+
+
+def test_bulk_import_counts_bad_items(messages_db, tmp_path):
+    source = tmp_path / "messages.ndjson"
+    source.write_text(
+        '{"text": "a", "category": "성공", "tags": ["x"]}\n{"text": \n{"author": "no text"}\n'
+        '{"text": "a"}\n{"text": "b", "category": "행복"}\n',
+        encoding="utf-8"
+    )
+    checkpoint = ImportCheckpoint(source)
+
+    result = bulk_import_messages(messages_db, iter_messages(str(source)), batch_size=2, checkpoint=checkpoint)
+
+    assert result == (2, 1, 2)
+    assert checkpoint.load() == 5
+
+
+def test_bulk_import_counts_oversized_rows_as_errors(messages_db, capsys):
+    messages = [
+        {"text": "a", "author": "x" * 101},
+        {"text": "b", "tags": ["t" * 150, "u" * 60]},
+        {"text": "c", "author": "x" * 100},
+    ]
+
+    assert bulk_import_messages(messages_db, messages) == (1, 0, 2)
+    output = capsys.readouterr().out
+    assert "input position 1: too long (author)" in output
+    assert "input position 2: too long (tags)" in output
+
+
+def test_copy_field_keeps_literal_null_marker():
+    line = ",".join(_copy_field(value) for value in ("\\N", None, 'say "hi", ok', True, 5))
+
+    assert line == '"\\N",\\N,"say ""hi"", ok","True","5"'
@@ -0,0 +1,133 @@
+"""반복 없는 랜덤 선택용 회전 블룸 필터 테스트"""
+
+import pytest
+
+import no_repeat
+from no_repeat import RecentFilter, RecentMessages, _bit_positions, client_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(no_repeat.time, "monotonic", fake)
+    return fake
+
+
+def test_client_key():
+    assert client_key(user_id=5) == client_key("1.2.3.4", "ua", user_id=5)
+    assert client_key("1.2.3.4", "ua") != client_key("1.2.3.4", "other")
+    assert len(client_key("1.2.3.4", "ua")) == 8
+
+
+def test_bit_positions_within_filter():
+    for message_id in range(1, 500):
+        positions = _bit_positions(message_id, 512, 4)
+        assert len(positions) == 4
+        assert all(0 <= p < 512 for p in positions)
+
+
+def test_filter_has_no_false_negatives():
+    recent = RecentFilter(512, 0.0)
+    added = range(1, 51)
+    for message_id in added:
+        recent.add(_bit_positions(message_id, 512, 4))
+    assert all(recent.contains(_bit_positions(message_id, 512, 4)) for message_id in added)
+
+
+def test_false_positive_rate_at_capacity():
+    recent = RecentFilter(512, 0.0)
+    for message_id in range(1, 51):
+        recent.add(_bit_positions(message_id, 512, 4))
+    false_positives = sum(recent.contains(_bit_positions(message_id, 512, 4)) for message_id in range(1000, 11000))
+    assert false_positives / 10000 < 0.03
+
+
+def test_previous_generation_survives_one_rotation():
+    recent = RecentFilter(512, 0.0)
+    first = _bit_positions(1, 512, 4)
+    recent.add(first)
+
+    recent.rotate(1.0)
+    assert recent.contains(first)
+    recent.rotate(2.0)
+    assert not recent.contains(first)
+
+
+def test_seen_and_add(clock):
+    recent = RecentMessages(capacity=10, ttl=100)
+    key = client_key("1.2.3.4", "ua")
+
+    assert not recent.seen(key, 7)
+    recent.add(key, 7)
+    assert recent.seen(key, 7)
+    assert not recent.seen(client_key("5.6.7.8", "ua"), 7)
+
+
+def test_messages_expire_after_ttl(clock):
+    recent = RecentMessages(capacity=10, ttl=100)
+    key = client_key(user_id=1)
+    recent.add(key, 7)
+
+    clock.now += 60
+    assert recent.seen(key, 7)  # 세대가 바뀌어도 이전 세대에 남는다
+    clock.now += 60
+    assert not recent.seen(key, 7)
+
+
+def test_capacity_rotates_generation(clock):
+    recent = RecentMessages(capacity=3, ttl=10 ** 6)
+    key = client_key(user_id=1)
+    for message_id in range(1, 8):
+        recent.add(key, message_id)
+    # 용량 3 으로 두 번 회전했으므로 가장 오래된 메시지는 잊는다
+    assert not recent.seen(key, 1)
+    assert recent.seen(key, 7)
+
+
+def test_client_count_is_bounded(clock):
+    recent = RecentMessages(max_clients=2)
+    for user_id in range(3):
+        recent.add(client_key(user_id=user_id), 1)
+    assert len(recent) == 2
+    assert not recent.seen(client_key(user_id=0), 1)
+
+
+def test_invalid_bits():
+    with pytest.raises(ValueError):
+        RecentMessages(bits=100)
+
+
+def test_choose_skips_seen_messages(clock):
+    recent = RecentMessages()
+    key = client_key(user_id=1)
+    recent.add(key, 1)
+    draws = iter([({"id": 1}, 2), ({"id": 2}, 2)])
+
+    message, selected_from = recent.choose(key, lambda: next(draws))
+
+    assert message == {"id": 2}
+    assert selected_from == 2
+    assert recent.seen(key, 2)
+
+
+def test_choose_returns_last_draw_when_all_seen(clock):
+    recent = RecentMessages()
+    key = client_key(user_id=1)
+    recent.add(key, 1)
+    calls = []
+
+    def draw():
+        calls.append(1)
+        return {"id": 1}, 1
+
+    assert recent.choose(key, draw, max_attempts=3) == ({"id": 1}, 1)
+    assert len(calls) == 3
+    assert recent.choose(key, lambda: (None, 0)) == (None, 0)
@@ -0,0 +1,31 @@
+"""검색 색인 백그라운드 구성 테스트 (버전이 연달아 바뀌어도 마지막 구성 하나만 대기)"""
+
+import threading
+
+from search_index import SearchIndexBuilder
+
+
+def test_refresh_coalesces_pending_builds():
+    builder = SearchIndexBuilder()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def snapshot_for(version, wait=False):
+        def snapshot():
+            calls.append(version)
+            if wait:
+                started.set()
+                release.wait(5)
+            return version, []
+        return snapshot
+
+    first = builder.refresh("v1", snapshot_for("v1", wait=True))
+    assert started.wait(5)
+    queued = [builder.refresh(version, snapshot_for(version)) for version in ("v2", "v3", "v4")]
+    release.set()
+
+    assert first.result(5) is not None
+    assert queued[0] is queued[1] is queued[2]
+    assert queued[0].result(5) is builder.current()
+    assert calls == ["v1", "v4"]
+    assert builder.refresh("v4", snapshot_for("v5")).result(5) is builder.current()
@@ -0,0 +1,112 @@
+"""일간 집계의 집계일 정의 테스트 (증분 갱신과 백필이 같은 날짜를 써야 한다)"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+import stats_rollup
+from access_log import write_history_rows
+from models_messages import CategoryDailyStat, DailyMessage, MessageDailyStat, VisitorSketch
+from stats_rollup import backfill_rollups, stats_day, stats_day_column, stats_day_start
+
+KST = timezone(timedelta(hours=9))
+
+
+class FakeBind:
+    class dialect:
+        name = "postgresql"
+
+
+class FakePostgresSession:
+    def get_bind(self):
+        return FakeBind()
+
+
+def _tables(db) -> tuple:
+    return (
+        sorted(db.execute(select(MessageDailyStat.day, MessageDailyStat.message_id, MessageDailyStat.reaction, MessageDailyStat.count)).all()),
+        sorted(db.execute(select(CategoryDailyStat.day, CategoryDailyStat.category, CategoryDailyStat.reaction, CategoryDailyStat.count)).all()),
+        sorted(db.execute(select(VisitorSketch.day, VisitorSketch.category)).all()),
+    )
+
+
+def test_incremental_matches_backfill_around_midnight(messages_db):
+    messages_db.add(DailyMessage(id=1, text="오늘도 힘내세요", author="익명", category="성공"))
+    messages_db.commit()
+
+    times = [
+        datetime(2026, 3, 1, 23, 30, tzinfo=KST),           # UTC 3월 1일
+        datetime(2026, 3, 2, 8, 59, 59, tzinfo=KST),        # UTC 3월 1일 23:59:59
+        datetime(2026, 3, 2, 0, 0, 1, tzinfo=timezone.utc),
+        datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc),
+    ]
+    write_history_rows(messages_db, [
+        {"message_id": 1, "user_ip": f"10.0.0.{i}", "user_agent": "ua", "reaction": None, "accessed_at": value, "category": "성공"}
+        for i, value in enumerate(times)
+    ])
+    messages_db.commit()
+    incremental = _tables(messages_db)
+
+    backfill_rollups(messages_db)
+    messages_db.commit()
+
+    assert _tables(messages_db) == incremental
+    assert [(day, count) for day, _, _, count in incremental[0]] == [(date(2026, 3, 1), 2), (date(2026, 3, 2), 2)]
+
+
+def test_partial_backfill_uses_day_boundaries(messages_db):
+    messages_db.add(DailyMessage(id=1, text="오늘도 힘내세요", author="익명", category="성공"))
+    write_history_rows(messages_db, [
+        {"message_id": 1, "user_ip": None, "user_agent": None, "reaction": "like", "accessed_at": value, "category": "성공"}
+        for value in (datetime(2026, 3, 1, 23, 59, tzinfo=timezone.utc), datetime(2026, 3, 2, 0, 1, tzinfo=timezone.utc))
+    ])
+    messages_db.commit()
+    incremental = _tables(messages_db)
+
+    backfill_rollups(messages_db, date(2026, 3, 2), date(2026, 3, 3))
+    messages_db.commit()
+
+    assert _tables(messages_db) == incremental
+
+
+def test_stats_day_in_configured_zone(monkeypatch):
+    monkeypatch.setattr(stats_rollup, "STATS_TIMEZONE", "Asia/Seoul")
+    db = FakePostgresSession()
+
+    assert stats_day(db, datetime(2026, 3, 1, 15, 0, tzinfo=timezone.utc)) == date(2026, 3, 2)
+    assert stats_day(db, datetime(2026, 3, 1, 14, 59, tzinfo=timezone.utc)) == date(2026, 3, 1)
+    assert stats_day_start(db, date(2026, 3, 2)) == datetime(2026, 3, 1, 15, 0, tzinfo=timezone.utc)
+
+    sql = str(stats_day_column(db, DailyMessage.created_at).compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+    assert sql == "date(timezone('Asia/Seoul', development.daily_messages.created_at))"
+
+
+def test_sqlite_uses_utc_days(messages_db):
+    assert stats_day(messages_db, datetime(2026, 3, 2, 8, 0, tzinfo=KST)) == date(2026, 3, 1)
+    assert stats_day(messages_db, datetime(2026, 3, 2, 0, 30)) == date(2026, 3, 2)
+
+
+def test_unscoped_backfill_keeps_pruned_days(messages_db):
+    messages_db.add(DailyMessage(id=1, text="오늘도 힘내세요", author="익명", category="성공"))
+    messages_db.add(MessageDailyStat(day=date(2026, 1, 5), message_id=1, category="성공", reaction="", count=7))
+    write_history_rows(messages_db, [
+        {"message_id": 1, "user_ip": None, "user_agent": None, "reaction": None,
+         "accessed_at": datetime(2026, 3, 2, 9, 0, tzinfo=timezone.utc), "category": "성공"}
+    ])
+    messages_db.commit()
+
+    assert backfill_rollups(messages_db) == date(2026, 3, 2)
+    messages_db.commit()
+
+    assert _tables(messages_db)[0] == [(date(2026, 1, 5), 1, "", 7), (date(2026, 3, 2), 1, "", 1)]
+
+
+def test_unscoped_backfill_without_history_keeps_stats(messages_db):
+    messages_db.add(MessageDailyStat(day=date(2026, 1, 5), message_id=1, category="성공", reaction="", count=7))
+    messages_db.commit()
+
+    assert backfill_rollups(messages_db) is None
+    assert len(_tables(messages_db)[0]) == 1
@@ -0,0 +1,203 @@
+"""사용자 통계 방문일/연속 방문 계산 테스트"""
+
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from database_async import DbSession
+import user_stats
+from models import Base, MessageHistory, User, UserFavorite, UserStats
+from user_stats import (
+    RECENT_DAYS_BITS, VISIT_FIELDS, _streaks, apply_visit, current_streak, increment_stats,
+    rebuild_user_stats, record_visit, reset_stats, visit_day
+)
+
+START = date(2026, 1, 1)
+
+
+def _days(*offsets: int):
+    return [START + timedelta(days=offset) for offset in offsets]
+
+
+def _stats(*offsets: int) -> UserStats:
+    stats = UserStats(total_days=0, current_streak=0, longest_streak=0, recent_days=0)
+    for day in _days(*offsets):
+        apply_visit(stats, day)
+    return stats
+
+
+def test_consecutive_visits():
+    stats = _stats(0, 1, 2)
+    assert (stats.total_days, stats.current_streak, stats.longest_streak) == (3, 3, 3)
+    assert stats.last_visit_day == START + timedelta(days=2)
+    assert stats.recent_days == 0b111
+
+
+def test_gap_resets_current_streak():
+    stats = _stats(0, 1, 2, 5, 6)
+    assert (stats.total_days, stats.current_streak, stats.longest_streak) == (5, 2, 3)
+
+
+def test_repeated_day_is_ignored():
+    stats = _stats(0, 1)
+    assert not apply_visit(stats, START + timedelta(days=1))
+    assert not apply_visit(stats, START)
+    assert stats.total_days == 2
+
+
+def test_late_visit_extends_current_streak():
+    stats = _stats(0, 1, 3)
+    assert apply_visit(stats, START + timedelta(days=2))
+    assert (stats.total_days, stats.current_streak, stats.longest_streak) == (4, 4, 4)
+    assert stats.last_visit_day == START + timedelta(days=3)
+
+
+def test_late_visit_joining_past_runs_updates_longest():
+    stats = _stats(0, 1, 3, 10, 11)
+    assert stats.longest_streak == 2
+
+    assert apply_visit(stats, START + timedelta(days=2))
+
+    assert (stats.total_days, stats.current_streak, stats.longest_streak) == (6, 2, 4)
+
+
+def test_late_visit_outside_bitmap_is_ignored():
+    stats = _stats(0, RECENT_DAYS_BITS + 5)
+    assert not apply_visit(stats, START + timedelta(days=3))
+    assert stats.total_days == 2
+
+
+def test_long_gap_clears_bitmap():
+    stats = _stats(0, 1, 200)
+    assert stats.recent_days == 1
+    assert (stats.current_streak, stats.longest_streak) == (1, 2)
+
+
+def test_late_visit_filling_whole_bitmap():
+    stats = _stats(*range(0, 100), 101, 102)
+    assert (stats.current_streak, stats.longest_streak) == (2, 100)
+
+    assert apply_visit(stats, START + timedelta(days=100))
+
+    # 비트맵 밖의 구간은 알 수 없으므로 최소한 비트맵 길이만큼은 이어진 것으로 본다
+    assert stats.current_streak == RECENT_DAYS_BITS
+    assert stats.longest_streak == 100
+    assert stats.total_days == 103
+
+
+@pytest.mark.parametrize("offsets", [(0, 1, 3, 10, 11, 2), (5, 3, 4, 1, 0), (9, 7, 8, 6, 2, 1, 0)])
+def test_out_of_order_matches_rebuild(offsets):
+    rebuilt = _streaks(_days(*offsets))
+    stats = _stats(*offsets)
+    assert (stats.total_days, stats.current_streak, stats.longest_streak) == (
+        rebuilt.total_days, rebuilt.current_streak, rebuilt.longest_streak
+    )
+
+
+def test_current_streak_expires_after_a_missed_day():
+    stats = _stats(0, 1, 2)
+    last = START + timedelta(days=2)
+    assert current_streak(stats, last) == 3
+    assert current_streak(stats, last + timedelta(days=1)) == 3
+    assert current_streak(stats, last + timedelta(days=2)) == 0
+    assert current_streak(UserStats(), last) == 0
+
+
+# ==================== 카운터 ====================
+
+@pytest.fixture
+def user_db():
+    """사용자 DB 세션 (메모리 SQLite, 사용자 1명)"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = Session(bind=engine)
+    session.add(User(id="u1", username="alice", hashed_password="x"))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+class RacingSession(DbSession):
+    """카운터 행이 없어 UPDATE 가 0건이 된 직후 다른 요청이 먼저 행을 만든 상황을 흉내 낸다"""
+
+    __slots__ = ("winner",)
+
+    def __init__(self, session, winner: dict):
+        super().__init__(session)
+        self.winner = winner
+
+    async def execute(self, statement, *args, **kwargs):
+        result = await super().execute(statement, *args, **kwargs)
+        if self.winner and statement.is_dml and statement.table.name == "user_stats" and result.rowcount == 0:
+            self.session.execute(insert(UserStats).values(user_id="u1", **self.winner))
+            self.winner = None
+        return result
+
+
+def _favorite(session: Session):
+    session.add(UserFavorite(user_id="u1", message_id="1", message_data={"id": 1}))
+
+
+def test_first_write_rebuilds_including_own_change(user_db):
+    _favorite(user_db)
+    asyncio.run(increment_stats(DbSession(user_db), "u1", total_favorites=1))
+    assert user_db.scalar(select(UserStats.total_favorites)) == 1
+
+
+def test_rebuild_reports_existing_row(user_db):
+    db = DbSession(user_db)
+    assert asyncio.run(rebuild_user_stats(db, "u1"))
+    assert not asyncio.run(rebuild_user_stats(db, "u1"))
+
+
+def test_concurrent_first_write_keeps_own_increment(user_db):
+    # 먼저 커밋한 요청의 집계에는 아직 커밋되지 않은 이번 즐겨찾기가 없다
+    user_db.add(UserFavorite(user_id="u1", message_id="0", message_data={"id": 0}))
+    user_db.flush()
+    _favorite(user_db)
+
+    asyncio.run(increment_stats(RacingSession(user_db, {"total_favorites": 1}), "u1", total_favorites=1))
+
+    assert user_db.scalar(select(UserStats.total_favorites)) == 2
+
+
+# ==================== 방문일 ====================
+
+def test_visit_day_in_configured_zone(monkeypatch):
+    monkeypatch.setattr(user_stats, "STATS_TIMEZONE", "Asia/Seoul")
+    viewed_at = datetime(2026, 3, 1, 15, 0, tzinfo=timezone.utc)
+
+    assert visit_day("postgresql", viewed_at) == date(2026, 3, 2)
+    assert visit_day("sqlite", viewed_at) == date(2026, 3, 1)
+    assert visit_day("sqlite", datetime(2026, 3, 1, 23, 59)) == date(2026, 3, 1)
+
+
+def test_rebuild_and_record_visit_share_day(user_db):
+    viewed_at = datetime(2026, 3, 1, 23, 59)
+    user_db.add(MessageHistory(user_id="u1", message_id="1", viewed_at=viewed_at))
+    db = DbSession(user_db)
+
+    asyncio.run(record_visit(db, "u1", visit_day(db.dialect_name, viewed_at)))
+
+    stats = user_db.scalar(select(UserStats))
+    assert (stats.total_days, stats.last_visit_day) == (1, date(2026, 3, 1))
+
+
+def test_reset_visit_fields(user_db):
+    db = DbSession(user_db)
+    asyncio.run(record_visit(db, "u1", date(2026, 3, 1)))
+    asyncio.run(record_visit(db, "u1", date(2026, 3, 2)))
+
+    asyncio.run(reset_stats(db, "u1", "total_history", *VISIT_FIELDS))
+
+    stats = user_db.scalar(select(UserStats))
+    assert (stats.total_days, stats.current_streak, stats.longest_streak, stats.recent_days) == (0, 0, 0, 0)
+    assert stats.last_visit_day is None
+    assert current_streak(stats, date(2026, 3, 2)) == 0
@@ -0,0 +1,241 @@
+"""
+사용자 통계 카운터
+즐겨찾기/히스토리/일기/목표/메시지 쓰기와 같은 트랜잭션에서 user_stats 카운터를 원자적으로 증감하고,
+방문일은 최근 63일 비트맵과 마지막 방문일로 연속 방문일을 O(1) 로 갱신한다.
+
+방문일은 STATS_TIMEZONE 기준 날짜이며, 방문 기록(visit_day), 재집계(visit_day_column),
+히스토리 압축이 같은 정의를 쓴다. SQLite 는 시간대 변환을 할 수 없으므로 UTC 날짜를 쓴다.
+
+카운터 행이 없는 기존 사용자는 처음 쓰거나 조회할 때 한 번만 원본 테이블을 집계해 만든다.
+"""
+
+import os
+from datetime import date, datetime, timezone, tzinfo
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, select, update, union
+
+from database_async import DbSession
+from database_config import dialect_insert
+from models import UserStats, UserFavorite, MessageHistory, UserHistoryDaily, JournalEntry, UserGoal, UserMessage
+
+COUNTER_FIELDS = (
+    "total_favorites", "total_history", "total_journal_entries",
+    "total_goals", "completed_goals", "total_user_messages"
+)
+# 방문 기록 필드 (조회 히스토리에서 다시 집계된다)
+VISIT_FIELDS = ("total_days", "current_streak", "longest_streak", "last_visit_day", "recent_days")
+
+# 방문일 기준 시간대 (익명 접근 로그의 일간 집계와 같은 설정)
+STATS_TIMEZONE = os.getenv("STATS_TIMEZONE", "UTC")
+
+# recent_days 비트맵 길이 (부호 있는 BIGINT 에 들어가도록 63비트)
+RECENT_DAYS_BITS = 63
+RECENT_DAYS_MASK = (1 << RECENT_DAYS_BITS) - 1
+
+
+# ==================== 방문일 ====================
+
+def visit_zone(dialect_name: str) -> tzinfo:
+    """방문일 기준 시간대"""
+    if dialect_name == "postgresql":
+        return ZoneInfo(STATS_TIMEZONE)
+    return timezone.utc
+
+
+def visit_day(dialect_name: str, viewed_at: datetime) -> date:
+    """조회 시각의 방문일 (SQL 쪽 visit_day_column 과 같은 정의)"""
+    if viewed_at.tzinfo is None:
+        # SQLite 는 시간대 없이 저장된 UTC 값을 돌려준다
+        viewed_at = viewed_at.replace(tzinfo=timezone.utc)
+    return viewed_at.astimezone(visit_zone(dialect_name)).date()
+
+
+def visit_day_column(dialect_name: str, column):
+    """조회 시각 컬럼의 방문일 SQL 식 (visit_day 와 같은 정의)"""
+    if dialect_name == "postgresql":
+        return func.date(func.timezone(STATS_TIMEZONE, column))
+    return func.date(column)
+
+
+def visit_day_start(dialect_name: str, day: date) -> datetime:
+    """방문일이 시작되는 시각"""
+    return datetime.combine(day, datetime.min.time(), tzinfo=visit_zone(dialect_name))
+
+
+def visit_today(dialect_name: str) -> date:
+    return visit_day(dialect_name, datetime.now(timezone.utc))
+
+
+def _as_date(value) -> date:
+    # SQLite 의 date() 는 문자열을 돌려준다
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _trailing_ones(value: int) -> int:
+    """최하위 비트부터 연속으로 켜진 비트 수"""
+    return (value ^ (value + 1)).bit_length() - 1
+
+
+def _run_through(value: int, offset: int) -> int:
+    """offset 비트를 포함해 연속으로 켜진 비트 수"""
+    older = _trailing_ones(value >> offset)
+    newer_mask = (1 << offset) - 1
+    newer = offset - (~value & newer_mask).bit_length()
+    return older + newer
+
+
+def apply_visit(stats: UserStats, day: date) -> bool:
+    """방문일 반영 (이미 기록된 날이면 False)"""
+    last = stats.last_visit_day
+    if last is None:
+        stats.last_visit_day = day
+        stats.recent_days = 1
+        stats.total_days = 1
+        stats.current_streak = 1
+    elif day > last:
+        gap = (day - last).days
+        stats.recent_days = ((stats.recent_days << gap) | 1) & RECENT_DAYS_MASK if gap < RECENT_DAYS_BITS else 1
+        stats.last_visit_day = day
+        stats.total_days += 1
+        stats.current_streak = stats.current_streak + 1 if gap == 1 else 1
+    else:
+        # 늦게 도착한 과거 방문 (비트맵 범위 안에서만 반영)
+        offset = (last - day).days
+        if offset >= RECENT_DAYS_BITS or stats.recent_days >> offset & 1:
+            return False
+        stats.recent_days |= 1 << offset
+        stats.total_days += 1
+        run = _trailing_ones(stats.recent_days)
+        # 비트맵이 모두 켜지면 그 이전 구간은 알 수 없으므로 알고 있는 최솟값을 쓴다
+        stats.current_streak = run if run < RECENT_DAYS_BITS else max(stats.current_streak, run)
+        # 빈 날을 채우면 앞뒤 연속 구간이 이어질 수 있다
+        stats.longest_streak = max(stats.longest_streak or 0, _run_through(stats.recent_days, offset))
+    stats.longest_streak = max(stats.longest_streak or 0, stats.current_streak)
+    return True
+
+
+def current_streak(stats: UserStats, today: date) -> int:
+    """오늘 기준 연속 방문일 (어제까지 방문했으면 아직 이어지는 것으로 본다)"""
+    if stats.last_visit_day is None or (today - stats.last_visit_day).days > 1:
+        return 0
+    return stats.current_streak
+
+
+def _streaks(days: Iterable[date]) -> UserStats:
+    """방문일 목록으로 방문 관련 필드를 계산한 UserStats"""
+    stats = UserStats(total_days=0, current_streak=0, longest_streak=0, recent_days=0)
+    for day in sorted(set(days)):
+        apply_visit(stats, day)
+    return stats
+
+
+async def rebuild_user_stats(db: DbSession, user_id: str) -> bool:
+    """원본 테이블을 집계해 카운터 행 생성 (이미 있으면 그대로 두고 False)
+
+    현재 트랜잭션에서 아직 기록하지 않은 변경도 포함되도록 먼저 flush 한다.
+    False 이면 다른 트랜잭션이 먼저 만든 행이므로 이번 트랜잭션의 변경은 들어 있지 않다.
+    """
+    await db.flush()
+
+    def count(model, *conditions):
+        return select(func.count()).select_from(model).where(
+            model.user_id == user_id, *conditions
+        ).scalar_subquery()
+
+    compacted_views = select(func.coalesce(func.sum(UserHistoryDaily.view_count), 0)).where(
+        UserHistoryDaily.user_id == user_id
+    ).scalar_subquery()
+
+    counts = (await db.execute(select(
+        count(UserFavorite),
+        count(MessageHistory) + compacted_views,
+        count(JournalEntry),
+        count(UserGoal),
+        count(UserGoal, UserGoal.is_completed == True),
+        count(UserMessage)
+    ))).one()
+
+    visit_days = union(
+        select(visit_day_column(db.dialect_name, MessageHistory.viewed_at)).where(MessageHistory.user_id == user_id),
+        select(UserHistoryDaily.day).where(UserHistoryDaily.user_id == user_id)
+    )
+    visits = _streaks(_as_date(day) for day in (await db.scalars(visit_days)).all() if day is not None)
+
+    values = dict(zip(COUNTER_FIELDS, counts))
+    values.update(
+        user_id=user_id,
+        total_days=visits.total_days,
+        current_streak=visits.current_streak,
+        longest_streak=visits.longest_streak,
+        last_visit_day=visits.last_visit_day,
+        recent_days=visits.recent_days
+    )
+    result = await db.execute(
+        dialect_insert(db.dialect_name, UserStats).values(**values).on_conflict_do_nothing(index_elements=["user_id"])
+    )
+    return result.rowcount > 0
+
+
+async def _lock_stats_row(db: DbSession, user_id: str) -> None:
+    await db.execute(select(UserStats.user_id).where(UserStats.user_id == user_id).with_for_update())
+
+
+async def increment_stats(db: DbSession, user_id: str, **deltas: int) -> None:
+    """카운터 증감 (커밋은 호출자가 담당), 예: increment_stats(db, user_id, total_favorites=1)
+
+    행이 없으면 현재 트랜잭션 상태로 다시 집계하므로 이번 변경은 따로 더하지 않는다.
+    동시에 다른 요청이 먼저 행을 만들었으면 그 집계에는 이번 변경이 없으므로 행을 잠그고 다시 더한다.
+    """
+    statement = update(UserStats).where(UserStats.user_id == user_id).values({
+        field: getattr(UserStats, field) + delta for field, delta in deltas.items()
+    })
+    result = await db.execute(statement)
+    if result.rowcount == 0 and not await rebuild_user_stats(db, user_id):
+        await _lock_stats_row(db, user_id)
+        await db.execute(statement)
+
+
+async def reset_stats(db: DbSession, user_id: str, *fields: str) -> None:
+    """카운터를 0으로 설정 (히스토리 전체 삭제 등, 마지막 방문일은 비운다)"""
+    statement = update(UserStats).where(UserStats.user_id == user_id).values({
+        field: None if field == "last_visit_day" else 0 for field in fields
+    })
+    result = await db.execute(statement)
+    if result.rowcount == 0 and not await rebuild_user_stats(db, user_id):
+        await _lock_stats_row(db, user_id)
+        await db.execute(statement)
+
+
+async def _locked_stats(db: DbSession, user_id: str) -> Optional[UserStats]:
+    return await db.scalar(
+        select(UserStats).where(UserStats.user_id == user_id).with_for_update()
+    )
+
+
+async def record_visit(db: DbSession, user_id: str, day: date) -> None:
+    """방문일 기록 (커밋은 호출자가 담당)"""
+    stats = await _locked_stats(db, user_id)
+    if stats is None:
+        # 다시 집계할 때 이번 방문도 포함된다
+        await rebuild_user_stats(db, user_id)
+        stats = await _locked_stats(db, user_id)
+    apply_visit(stats, day)
+
+
+async def load_user_stats(db: DbSession, user_id: str, today: date) -> dict:
+    """사용자 통계 (카운터 행 1건 조회)"""
+    stats = await db.scalar(select(UserStats).where(UserStats.user_id == user_id))
+    if stats is None:
+        await rebuild_user_stats(db, user_id)
+        await db.commit()
+        stats = await db.scalar(select(UserStats).where(UserStats.user_id == user_id))
+
+    result = {field: getattr(stats, field) for field in COUNTER_FIELDS}
+    result.update(
+        current_streak=current_streak(stats, today),
+        longest_streak=stats.longest_streak,
+        total_days=stats.total_days
+    )
+    return result
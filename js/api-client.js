@@ -99,6 +99,8 @@ class ApiClient {
             const params = new URLSearchParams();
             if (category && category !== 'all') params.append('category', category);
             if (timeOfDay && timeOfDay !== 'all') params.append('time_of_day', timeOfDay);
+            // 최근에 받은 메시지는 다시 받지 않음
+            params.append('no_repeat', 'true');
             
             const queryString = params.toString();
             const endpoint = `/api/messages/random${queryString ? '?' + queryString : ''}`;
@@ -144,6 +146,22 @@ class ApiClient {
         }
     }
     
+    /**
+     * 버전 토큰 이후 변경된 메시지 조회 (델타 동기화)
+     */
+    async getMessageChanges(since = null, limit = 500) {
+        try {
+            const params = new URLSearchParams({ limit });
+            if (since) params.append('since', since);
+            
+            const response = await this.request(`/api/messages/changes?${params.toString()}`);
+            return response;
+        } catch (error) {
+            ErrorHandler.handle(error, 'ApiClient.getMessageChanges');
+            throw error;
+        }
+    }
+    
     /**
      * 카테고리 목록 조회
      */
@@ -187,6 +205,9 @@ class ApiClient {
     }
 }
 
+// 델타 동기화로 유지하는 로컬 메시지 사본 저장 키
+const MESSAGE_CACHE_KEY = 'message_catalog_cache';
+
 /**
  * Fallback 메시지 (데이터베이스 연결 실패 시 사용)
  */
@@ -304,6 +325,56 @@ export class HybridMessageManager {
         return this.fallbackProvider.getMessages();
     }
     
+    /**
+     * 로컬 메시지 사본을 서버와 동기화 (변경분만 내려받음)
+     */
+    async syncMessages() {
+        await this.waitForInit();
+        
+        const cache = JSON.parse(localStorage.getItem(MESSAGE_CACHE_KEY) || 'null') || { version: null, messages: {} };
+        if (!this.useDatabase) {
+            return Object.values(cache.messages);
+        }
+        
+        try {
+            let response;
+            do {
+                try {
+                    response = await this.apiClient.getMessageChanges(cache.version);
+                } catch (error) {
+                    // 서버가 버전 토큰을 거절하면 (형식 변경 등) 처음부터 다시 받는다
+                    if (!cache.version || !String(error.message).startsWith('HTTP 400')) throw error;
+                    cache.version = null;
+                    response = await this.apiClient.getMessageChanges(null);
+                }
+                if (response.full) {
+                    cache.messages = {};
+                }
+                response.changes.forEach(message => {
+                    cache.messages[message.id] = message;
+                });
+                response.removed.forEach(id => {
+                    delete cache.messages[id];
+                });
+                cache.version = response.version;
+            } while (response.hasMore);
+            
+            localStorage.setItem(MESSAGE_CACHE_KEY, JSON.stringify(cache));
+        } catch (error) {
+            console.warn('Message sync failed, using cached messages:', error.message);
+        }
+        
+        return Object.values(cache.messages);
+    }
+    
+    /**
+     * 동기화된 로컬 사본 (없으면 빈 배열)
+     */
+    getCachedMessages() {
+        const cache = JSON.parse(localStorage.getItem(MESSAGE_CACHE_KEY) || 'null');
+        return cache ? Object.values(cache.messages) : [];
+    }
+    
     async getCategories() {
         await this.waitForInit();
         
@@ -350,36 +421,39 @@ export class HybridMessageManager {
      */
     async getFallbackMessage(category, timeOfDay) {
         try {
-            // 기존 로컬 JSON 파일 로드 시도
-            const response = await fetch('./messages.json');
-            if (response.ok) {
-                const data = await response.json();
-                const messages = data.messages || [];
-                
-                // 필터링 로직
-                let filteredMessages = messages.filter(msg => msg && msg.text);
-                
-                if (category && category !== 'all') {
-                    filteredMessages = filteredMessages.filter(msg => msg.category === category);
-                }
-                
-                if (timeOfDay && timeOfDay !== 'all') {
-                    filteredMessages = filteredMessages.filter(msg => 
-                        !msg.timeOfDay || msg.timeOfDay === '' || msg.timeOfDay === timeOfDay
-                    );
-                }
-                
-                if (filteredMessages.length > 0) {
-                    const randomMessage = filteredMessages[Math.floor(Math.random() * filteredMessages.length)];
-                    return {
-                        message: randomMessage,
-                        metadata: {
-                            source: 'local_json',
-                            selectedFrom: filteredMessages.length
-                        }
-                    };
+            // 동기화된 로컬 사본이 있으면 사용하고, 없으면 기존 로컬 JSON 파일 로드 시도
+            let messages = this.getCachedMessages();
+            if (messages.length === 0) {
+                const response = await fetch('./messages.json');
+                if (response.ok) {
+                    const data = await response.json();
+                    messages = data.messages || [];
                 }
             }
+            
+            // 필터링 로직
+            let filteredMessages = messages.filter(msg => msg && msg.text);
+            
+            if (category && category !== 'all') {
+                filteredMessages = filteredMessages.filter(msg => msg.category === category);
+            }
+            
+            if (timeOfDay && timeOfDay !== 'all') {
+                filteredMessages = filteredMessages.filter(msg => 
+                    !msg.timeOfDay || msg.timeOfDay === '' || msg.timeOfDay === timeOfDay
+                );
+            }
+            
+            if (filteredMessages.length > 0) {
+                const randomMessage = filteredMessages[Math.floor(Math.random() * filteredMessages.length)];
+                return {
+                    message: randomMessage,
+                    metadata: {
+                        source: 'local_json',
+                        selectedFrom: filteredMessages.length
+                    }
+                };
+            }
         } catch (error) {
             console.warn('Local JSON load failed:', error.message);
         }
@@ -5,6 +5,7 @@
 
 import { Security, DateUtils, Storage, DOM, ErrorHandler, Performance } from './utils.js';
 import { uiManager } from './ui-manager.js';
+import { messageManager as catalogSync } from './api-client.js';
 
 export class MessageManager {
     constructor() {
@@ -32,6 +33,9 @@ export class MessageManager {
             // 첫 메시지 표시
             this.showRandomMessage();
             
+            // 서버 변경분은 화면 표시를 막지 않도록 백그라운드에서 반영
+            this.syncMessages();
+            
             console.log('Message Manager initialized successfully');
         } catch (error) {
             ErrorHandler.handle(error, 'MessageManager.init', true);
@@ -48,19 +52,23 @@ export class MessageManager {
         uiManager.toggleLoading(true, '메시지를 불러오는 중...');
 
         try {
-            // 기본 메시지와 명언 모두 로드
+            // 동기화된 로컬 사본이 있으면 사용하고, 없을 때만 전체 messages.json 을 받는다
+            const syncedMessages = catalogSync.getCachedMessages();
             const [messagesResponse, quotesResponse] = await Promise.all([
-                fetch('./messages.json'),
+                syncedMessages.length > 0 ? null : fetch('./messages.json'),
                 fetch('./quotes.json').catch(() => ({ ok: false })) // quotes.json이 없어도 계속 진행
             ]);
 
-            if (!messagesResponse.ok) {
-                throw new Error('메시지를 불러올 수 없습니다.');
+            if (messagesResponse) {
+                if (!messagesResponse.ok) {
+                    throw new Error('메시지를 불러올 수 없습니다.');
+                }
+                const messagesData = await messagesResponse.json();
+                this.messages = messagesData.messages || [];
+            } else {
+                this.messages = syncedMessages;
             }
 
-            const messagesData = await messagesResponse.json();
-            this.messages = messagesData.messages || [];
-
             // quotes.json이 있다면 추가
             if (quotesResponse.ok) {
                 const quotesData = await quotesResponse.json();
@@ -80,15 +88,7 @@ export class MessageManager {
                 this.messages = [...this.messages, ...convertedQuotes];
             }
 
-            // 메시지 검증 및 정화
-            this.messages = this.messages
-                .filter(msg => msg && msg.text && msg.text.trim())
-                .map(msg => ({
-                    ...msg,
-                    text: Security.sanitizeInput(msg.text, 500),
-                    author: Security.sanitizeInput(msg.author || '익명', 50),
-                    category: Security.sanitizeInput(msg.category || '기타', 20)
-                }));
+            this.messages = this.sanitizeMessages(this.messages);
 
             console.log(`${this.messages.length}개의 메시지를 로드했습니다.`);
 
@@ -105,6 +105,37 @@ export class MessageManager {
         }
     }
 
+    /**
+     * 메시지 검증 및 정화
+     */
+    sanitizeMessages(messages) {
+        return messages
+            .filter(msg => msg && msg.text && msg.text.trim())
+            .map(msg => ({
+                ...msg,
+                text: Security.sanitizeInput(msg.text, 500),
+                author: Security.sanitizeInput(msg.author || '익명', 50),
+                category: Security.sanitizeInput(msg.category || '기타', 20)
+            }));
+    }
+
+    /**
+     * 서버 변경분만 받아 메시지 목록 갱신 (명언은 그대로 유지)
+     */
+    async syncMessages() {
+        try {
+            const synced = await catalogSync.syncMessages();
+            if (synced.length === 0) return;
+
+            const quotes = this.messages.filter(msg => String(msg.id).startsWith('quote_'));
+            this.messages = [...this.sanitizeMessages(synced), ...quotes];
+            this.updateUI();
+            console.log(`동기화 후 ${this.messages.length}개의 메시지를 사용합니다.`);
+        } catch (error) {
+            ErrorHandler.handle(error, 'MessageManager.syncMessages');
+        }
+    }
+
     /**
      * 폴백 메시지 (네트워크 오류 시 사용)
      */
@@ -1,6 +1,9 @@
 // 서비스 워커 버전 및 캐시 이름
 const CACHE_NAME = 'morning-app-v2';
 const RUNTIME_CACHE = 'runtime-cache-v2';
+// 메시지 카탈로그 스냅샷 캐시 (generate_snapshots.py 로 생성한 내용 해시 파일)
+const CATALOG_CACHE = 'catalog-cache-v1';
+const SNAPSHOT_MANIFEST = '/snapshots/manifest.json';
 
 // 캐시할 파일 목록
 const STATIC_FILES = [
@@ -43,7 +46,7 @@ self.addEventListener('activate', event => {
         caches.keys().then(cacheNames => {
             return Promise.all(
                 cacheNames.map(cacheName => {
-                    if (cacheName !== CACHE_NAME && cacheName !== RUNTIME_CACHE) {
+                    if (cacheName !== CACHE_NAME && cacheName !== RUNTIME_CACHE && cacheName !== CATALOG_CACHE) {
                         console.log('[서비스 워커] 오래된 캐시 삭제:', cacheName);
                         return caches.delete(cacheName);
                     }
@@ -90,6 +93,15 @@ self.addEventListener('fetch', event => {
         return;
     }
     
+    // 메시지 카탈로그 요청은 manifest 가 가리키는 최신 스냅샷으로 응답
+    if (url.origin === self.location.origin && url.pathname.endsWith('/messages.json')) {
+        event.respondWith(
+            getCatalogSnapshot()
+                .then(snapshot => snapshot || caches.match(request).then(cachedResponse => cachedResponse || fetch(request)))
+        );
+        return;
+    }
+    
     // 정적 파일에 대한 처리 (CSS, JS, JSON 등)
     if (STATIC_FILES.some(file => request.url.includes(file))) {
         event.respondWith(
@@ -148,6 +160,53 @@ self.addEventListener('fetch', event => {
     );
 });
 
+/**
+ * 최신 카탈로그 스냅샷 응답 (manifest 를 받을 수 없으면 마지막으로 캐시한 스냅샷)
+ * 스냅샷 파일 이름에 내용 해시가 들어 있으므로 같은 이름은 다시 받지 않는다.
+ */
+async function getCatalogSnapshot() {
+    const cache = await caches.open(CATALOG_CACHE);
+    
+    let manifest;
+    try {
+        const response = await fetch(SNAPSHOT_MANIFEST, { cache: 'no-store' });
+        if (!response.ok) {
+            throw new Error(`manifest ${response.status}`);
+        }
+        manifest = await response.json();
+    } catch (error) {
+        const cachedKeys = await cache.keys();
+        return cachedKeys.length > 0 ? cache.match(cachedKeys[cachedKeys.length - 1]) : null;
+    }
+    
+    const snapshotUrl = new URL(`/snapshots/${manifest.file}`, self.location.origin).href;
+    const cachedSnapshot = await cache.match(snapshotUrl);
+    if (cachedSnapshot) {
+        return cachedSnapshot;
+    }
+    
+    try {
+        const response = await fetch(snapshotUrl);
+        if (response.status !== 200) {
+            return null;
+        }
+        await cache.put(snapshotUrl, response.clone());
+        
+        // 이전 버전 스냅샷 정리
+        const cachedKeys = await cache.keys();
+        await Promise.all(
+            cachedKeys
+                .filter(key => key.url !== snapshotUrl)
+                .map(key => cache.delete(key))
+        );
+        console.log('[서비스 워커] 카탈로그 스냅샷 갱신:', manifest.version);
+        return response;
+    } catch (error) {
+        console.error('[서비스 워커] 카탈로그 스냅샷 로드 실패:', error);
+        return null;
+    }
+}
+
 // 백그라운드 동기화 (향후 확장 기능)
 self.addEventListener('sync', event => {
     console.log('[서비스 워커] 백그라운드 동기화:', event.tag);